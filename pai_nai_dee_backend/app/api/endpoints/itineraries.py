@@ -1,16 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List, Any
+from typing import Dict, List, Any, Literal, Optional, Sequence
 
-from ...schemas import Itinerary as ItinerarySchema, ItineraryCreate, ItineraryUpdate
+from ...schemas import (
+    Itinerary as ItinerarySchema,
+    ItineraryCreate,
+    ItineraryDetail,
+    ItineraryRoute,
+    ItineraryStopCreate,
+    ItinerarySummary,
+    ItineraryUpdate,
+)
 from ...crud import crud_place, crud_itinerary
 from ...db.database import get_db
 from ...models.user import User as UserModel
 from ...core.security import get_current_active_user
+from ...models.place import Place
+from ...services.itinerary_service import ItineraryService
 
 router = APIRouter()
 
 
+def _get_places_or_404(
+    db: Session, stops: Optional[Sequence[ItineraryStopCreate]]
+) -> Optional[Dict[int, Place]]:
+    """
+    The places of `stops` keyed by id, loaded in one query. Raises 404 listing
+    every place id that does not exist.
+    """
+    if stops is None:
+        return None
+    places = crud_place.get_places_by_ids(db, [stop.place_id for stop in stops])
+    missing = sorted({stop.place_id for stop in stops} - places.keys())
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Places with ids {missing} not found.",
+        )
+    return places
+
+
 @router.post("/", response_model=ItinerarySchema, status_code=status.HTTP_201_CREATED)
 def create_itinerary(
     *,
@@ -19,41 +48,59 @@ def create_itinerary(
     current_user: UserModel = Depends(get_current_active_user),  # Requires auth
 ) -> Any:
     """
-    Create new itinerary for the current authenticated user.
+    Create new itinerary for the current authenticated user. Its stops are
+    given in order, as `stops` (with an optional day and notes each) or as
+    `place_ids`.
     """
-    # Check if all place_ids exist
-    if itinerary_in.place_ids:
-        for place_id in itinerary_in.place_ids:
-            place = crud_place.get_place(db, place_id=place_id)
-            if not place:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Place with id {place_id} not found.",
-                )
+    # Check that all places exist, and reuse the loaded places
+    places = _get_places_or_404(db, itinerary_in.stop_list() or [])
 
     itinerary = crud_itinerary.create_itinerary(
-        db=db, itinerary_in=itinerary_in, user_id=current_user.id
+        db=db, itinerary_in=itinerary_in, user_id=current_user.id, places=places
     )
     return itinerary
 
 
-@router.get("/my-itineraries", response_model=List[ItinerarySchema])
+@router.get("/my-itineraries", response_model=List[ItinerarySummary])
 def read_my_itineraries(
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 20,
+    expand: Optional[Literal["places"]] = Query(
+        None, description="Embed the place of each stop"
+    ),
     current_user: UserModel = Depends(get_current_active_user),  # Requires auth
 ) -> Any:
     """
-    Get all itineraries for the current authenticated user.
+    Get all itineraries for the current authenticated user. With
+    `expand=places` each stop includes its place, loaded for all itineraries
+    at once; otherwise `place` is null.
     """
-    itineraries = crud_itinerary.get_itineraries_by_user(
-        db, user_id=current_user.id, skip=skip, limit=limit
+    return crud_itinerary.get_itineraries_by_user(
+        db,
+        user_id=current_user.id,
+        skip=skip,
+        limit=limit,
+        with_places=expand == "places",
     )
-    return itineraries
 
 
-@router.get("/{itinerary_id}", response_model=ItinerarySchema)
+@router.get("/templates", response_model=List[ItineraryDetail])
+def read_itinerary_templates(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get the public template itineraries, newest first, with the place of each
+    stop. Served from the in-process template cache when possible.
+    """
+    payload = crud_itinerary.get_templates_json(db, skip=skip, limit=limit)
+    # Already serialized with ItineraryDetail, skip response_model re-validation
+    return Response(content=payload, media_type="application/json")
+
+
+@router.get("/{itinerary_id}", response_model=ItineraryDetail)
 def read_itinerary_by_id(
     itinerary_id: int,
     db: Session = Depends(get_db),
@@ -62,10 +109,10 @@ def read_itinerary_by_id(
     ),  # Requires auth for permission check
 ) -> Any:
     """
-    Get a specific itinerary by id. User must be the owner.
-    (Admins could have broader access - to be implemented).
+    Get a specific itinerary by id, with the place of each stop. User must be
+    the owner. (Admins could have broader access - to be implemented).
     """
-    itinerary = crud_itinerary.get_itinerary(db, itinerary_id=itinerary_id)
+    itinerary = crud_itinerary.get_itinerary_detail(db, itinerary_id=itinerary_id)
     if not itinerary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Itinerary not found"
@@ -90,7 +137,8 @@ def update_itinerary(
     current_user: UserModel = Depends(get_current_active_user),  # Requires auth
 ) -> Any:
     """
-    Update an itinerary. User must be the owner.
+    Update an itinerary. User must be the owner. If `stops` or `place_ids`
+    are given, they replace the stops; only the stops that changed are written.
     """
     db_itinerary = crud_itinerary.get_itinerary(db, itinerary_id=itinerary_id)
     if not db_itinerary:
@@ -105,18 +153,11 @@ def update_itinerary(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
         )
 
-    # Check if all place_ids in the update exist (if provided)
-    if itinerary_in.place_ids is not None:  # Check if place_ids is part of the update
-        for place_id in itinerary_in.place_ids:
-            place = crud_place.get_place(db, place_id=place_id)
-            if not place:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Place with id {place_id} not found in update payload.",
-                )
+    # Check that all places in the update exist (if stops are part of it)
+    places = _get_places_or_404(db, itinerary_in.stop_list())
 
     itinerary = crud_itinerary.update_itinerary(
-        db=db, db_itinerary=db_itinerary, itinerary_in=itinerary_in
+        db=db, db_itinerary=db_itinerary, itinerary_in=itinerary_in, places=places
     )
     return itinerary
 
@@ -154,30 +195,90 @@ def delete_itinerary(
     return deleted_itinerary
 
 
-# Optional: Endpoints to manage places within an itinerary
-@router.post("/{itinerary_id}/places/{place_id}", response_model=ItinerarySchema)
-def add_place_to_itinerary_endpoint(
+@router.post(
+    "/{itinerary_id}/clone",
+    response_model=ItinerarySchema,
+    status_code=status.HTTP_201_CREATED,
+)
+def clone_itinerary(
     itinerary_id: int,
-    place_id: int,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user),
-):
+) -> Any:
+    """
+    Copy an itinerary with its stops into the current user's itineraries. It
+    must be the user's own itinerary or a template.
+    """
+    new_id = crud_itinerary.clone_itinerary(db, itinerary_id, user_id=current_user.id)
+    if new_id is None:
+        if not crud_itinerary.get_itinerary(db, itinerary_id=itinerary_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Itinerary not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+        )
+    return crud_itinerary.get_itinerary(db, itinerary_id=new_id)
+
+
+@router.post("/{itinerary_id}/optimize", response_model=ItineraryRoute)
+def optimize_itinerary(
+    itinerary_id: int,
+    keep_start: bool = Query(True, description="Keep each day's first stop first"),
+    save: bool = Query(True, description="Save the new order of the stops"),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user),
+) -> Any:
+    """
+    Reorder the stops of an itinerary into a short route, keeping the stops of
+    each day together. Returns the new order with the total distance before
+    and after. User must be the owner.
+    """
+    itinerary = crud_itinerary.get_itinerary(db, itinerary_id=itinerary_id)
+    if not itinerary:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Itinerary not found"
+        )
+    if itinerary.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+        )
+    return ItineraryService(db).optimize_stops(
+        itinerary_id, keep_start=keep_start, save=save
+    )
+
+
+# Optional: Endpoints to manage places within an itinerary
+def _explain_unchanged_stops(
+    db: Session, itinerary_id: int, place_id: int, current_user: UserModel
+) -> None:
+    # Raises why adding or removing a stop changed nothing, if it is an error;
+    # only called then, so the common path is the single write statement
     itinerary = crud_itinerary.get_itinerary(db, itinerary_id=itinerary_id)
     if not itinerary:
         raise HTTPException(status_code=404, detail="Itinerary not found")
     if itinerary.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-
-    place = crud_place.get_place(db, place_id=place_id)
-    if not place:
+    if not crud_place.get_place(db, place_id=place_id):
         raise HTTPException(status_code=404, detail="Place not found")
 
-    updated_itinerary = crud_itinerary.add_place_to_itinerary(
-        db, itinerary_id, place_id
-    )
-    if not updated_itinerary:  # Should not happen if checks above pass
-        raise HTTPException(status_code=500, detail="Could not add place to itinerary")
-    return updated_itinerary
+
+@router.post("/{itinerary_id}/places/{place_id}", response_model=ItinerarySchema)
+def add_place_to_itinerary_endpoint(
+    itinerary_id: int,
+    place_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user),
+):
+    """
+    Add a place as the last stop of an itinerary, unless it already is a stop.
+    User must be the owner.
+    """
+    if not crud_itinerary.add_place_to_itinerary(
+        db, itinerary_id, place_id, user_id=current_user.id
+    ):
+        _explain_unchanged_stops(db, itinerary_id, place_id, current_user)
+    return crud_itinerary.get_itinerary(db, itinerary_id=itinerary_id, with_stops=True)
 
 
 @router.delete("/{itinerary_id}/places/{place_id}", response_model=ItinerarySchema)
@@ -187,26 +288,12 @@ def remove_place_from_itinerary_endpoint(
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_active_user),
 ):
-    itinerary = crud_itinerary.get_itinerary(db, itinerary_id=itinerary_id)
-    if not itinerary:
-        raise HTTPException(status_code=404, detail="Itinerary not found")
-    if itinerary.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-
-    place = crud_place.get_place(db, place_id=place_id)
-    if (
-        not place
-    ):  # Technically, crud_itinerary.remove_place_from_itinerary handles this, but good to check early.
-        raise HTTPException(status_code=404, detail="Place not found to remove")
-
-    updated_itinerary = crud_itinerary.remove_place_from_itinerary(
-        db, itinerary_id, place_id
-    )
-    if not updated_itinerary:  # This might happen if place was not in itinerary.
-        # We could return 200 OK with the itinerary as is, or 404 if place wasn't part of it.
-        # The CRUD returns the itinerary even if place wasn't there.
-        # For consistency, let's ensure it's not None (which means itinerary itself wasn't found by CRUD)
-        raise HTTPException(
-            status_code=500, detail="Could not remove place from itinerary"
-        )
-    return updated_itinerary
+    """
+    Remove a place from the stops of an itinerary; the itinerary is returned
+    as it is if the place was not a stop. User must be the owner.
+    """
+    if not crud_itinerary.remove_place_from_itinerary(
+        db, itinerary_id, place_id, user_id=current_user.id
+    ):
+        _explain_unchanged_stops(db, itinerary_id, place_id, current_user)
+    return crud_itinerary.get_itinerary(db, itinerary_id=itinerary_id, with_stops=True)
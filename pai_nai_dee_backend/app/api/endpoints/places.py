@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Any, Optional
 
-from ...schemas import Place as PlaceSchema, PlaceCreate, PlaceUpdate
+from ...schemas import (
+    Place as PlaceSchema,
+    PlaceCreate,
+    PlaceUpdate,
+    PlaceSort,
+    PlaceSummary,
+)
 from ...crud import crud_place
 from ...db.database import get_db
 from ...core.security import get_current_active_user
 from ...models.user import User as UserModel
+from ...services.place_service import PlaceService
+from ...services.place_catalog import get_place_catalog
 
 router = APIRouter()
 
@@ -33,17 +41,56 @@ def read_places(
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = Query(
-        None, description="Filter places by category (case-insensitive partial match)"
+        None, description="Filter places by category (case-insensitive exact match)"
     ),
     min_rating: Optional[float] = Query(
         None, ge=0.0, le=5.0, description="Filter places by minimum average rating"
     ),
+    sort: Optional[PlaceSort] = Query(
+        None,
+        description="Sort order: best (Bayesian ranking score), rating (highest "
+        "average first), name, newest, or distance (nearest to lat/lng first). "
+        "Defaults to id order.",
+    ),
+    lat: Optional[float] = Query(None, ge=-90.0, le=90.0),
+    lng: Optional[float] = Query(None, ge=-180.0, le=180.0),
+    radius_km: Optional[float] = Query(
+        None, gt=0.0, description="Only places within this distance of lat/lng"
+    ),
 ) -> Any:
     """
-    Retrieve places with optional filtering by category and minimum rating.
+    Retrieve places with optional filtering by category and minimum rating,
+    sorted using the matching index on `places`, or from the place catalog
+    snapshot when one is configured.
     """
+    if (sort == "distance" or radius_km is not None) and (lat is None or lng is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="lat and lng are required for sort=distance or radius_km",
+        )
+    catalog = get_place_catalog()
+    if catalog is not None:
+        # Shared read-only snapshot, no database round-trip
+        return catalog.query(
+            skip=skip,
+            limit=limit,
+            category=category,
+            min_rating=min_rating,
+            sort=sort,
+            lat=lat,
+            lng=lng,
+            radius_km=radius_km,
+        )
     places = crud_place.get_places(
-        db, skip=skip, limit=limit, category=category, min_rating=min_rating
+        db,
+        skip=skip,
+        limit=limit,
+        category=category,
+        min_rating=min_rating,
+        sort=sort,
+        lat=lat,
+        lng=lng,
+        radius_km=radius_km,
     )
     return places
 
@@ -55,14 +102,39 @@ def read_place_by_id(
 ) -> Any:
     """
     Get a specific place by id.
+    Served from the in-process place cache when possible.
     """
-    place = crud_place.get_place(db, place_id=place_id)
-    if not place:
+    payload = crud_place.get_place_json(db, place_id=place_id)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Place not found",
         )
-    return place
+    # Already serialized with PlaceSchema, skip response_model re-validation
+    return Response(content=payload, media_type="application/json")
+
+
+@router.get("/{place_id}/summary", response_model=PlaceSummary)
+def read_place_summary(
+    place_id: int,
+    db: Session = Depends(get_db),
+    reviews_limit: int = Query(
+        5, ge=0, le=50, description="Number of latest reviews to include"
+    ),
+) -> Any:
+    """
+    Get a place together with its review count, rating histogram and latest
+    reviews (with author usernames), in a single call.
+    """
+    summary = PlaceService(db).get_place_summary(
+        place_id=place_id, reviews_limit=reviews_limit
+    )
+    if summary is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Place not found",
+        )
+    return summary
 
 
 @router.put("/{place_id}", response_model=PlaceSchema)
@@ -79,7 +151,7 @@ def update_place(
     Update a place. Requires authentication.
     TODO: Add ownership or admin role check.
     """
-    db_place = crud_place.get_place(db, place_id=place_id)
+    db_place = crud_place.get_place(db, place_id=place_id, coalesce=False)
     if not db_place:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -102,7 +174,7 @@ def delete_place(
     Delete a place. Requires authentication.
     TODO: Add ownership or admin role check.
     """
-    place_to_delete = crud_place.get_place(db, place_id=place_id)
+    place_to_delete = crud_place.get_place(db, place_id=place_id, coalesce=False)
     if not place_to_delete:
         raise HTTPException(status_code=404, detail="Place not found")
 
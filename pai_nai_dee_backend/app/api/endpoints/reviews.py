@@ -1,16 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, status  # Query removed
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Any  # Optional removed
+from typing import AsyncIterator, Callable, List, Any, Optional, Tuple
 
-from ...schemas import Review as ReviewSchema, ReviewCreate, ReviewUpdate
+from ...schemas import (
+    Review as ReviewSchema,
+    RecentReview,
+    ReviewBulkCreate,
+    ReviewBulkResult,
+    ReviewCreate,
+    ReviewUpdate,
+    ReviewUpsert,
+)
 from ...crud import crud_place, crud_review, crud_user
 from ...db.database import get_db
 from ...models.user import User as UserModel
-from ...core.security import get_current_active_user
+from ...core.config import settings
+from ...core.security import get_current_active_superuser, get_current_active_user
+from ...crud.crud_review import DuplicateReviewError, review_events
+from ...utils.pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    decode_rank_cursor,
+    encode_cursor,
+    encode_rank_cursor,
+)
 
 router = APIRouter()
 
 
+def _decode_cursor(
+    cursor: Optional[str], decode: Callable[[str], Tuple[Any, int]] = decode_cursor
+) -> Optional[Tuple[Any, int]]:
+    if cursor is None:
+        return None
+    try:
+        return decode(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+def _paginate(reviews: List[Any], limit: int, response: Response) -> List[Any]:
+    # One extra row was fetched to find out whether there is a next page
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        last = reviews[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return reviews
+
+
+def _near_duplicate_error() -> HTTPException:
+    # REVIEW_DUPLICATE_ACTION="reject"; the matched review is not disclosed
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail="The comment is too similar to an existing review.",
+    )
+
+
 @router.post("/", response_model=ReviewSchema, status_code=status.HTTP_201_CREATED)
 def create_review(
     *,
@@ -20,52 +69,230 @@ def create_review(
 ) -> Any:
     """
     Create new review for a place. User must be authenticated.
+    Each user can review a place once; see `PUT /reviews/place/{place_id}`.
     """
     # Check if the place exists
-    place = crud_place.get_place(db, place_id=review_in.place_id)
+    place = crud_place.get_place(db, place_id=review_in.place_id, coalesce=False)
     if not place:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Place not found"
         )
 
-    review = crud_review.create_review(
-        db=db, review_in=review_in, user_id=current_user.id
-    )
-    # Here, we might trigger an update for place's average_rating
-    # crud_place.update_place_average_rating(db, place_id=review.place_id) # Example
+    try:
+        review = crud_review.create_review(
+            db=db, review_in=review_in, user_id=current_user.id
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="You have already reviewed this place; "
+            "use PUT /reviews/place/{place_id} to change your review.",
+        )
+    except DuplicateReviewError:
+        db.rollback()
+        raise _near_duplicate_error()
     return review
 
 
+@router.post("/bulk", response_model=List[ReviewBulkResult])
+def create_reviews_bulk(
+    *,
+    db: Session = Depends(get_db),
+    bulk_in: ReviewBulkCreate,
+    current_user: UserModel = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    Import up to 1000 reviews from a partner platform in one request, each by
+    its author there (a user of its own, created on first import). Superusers
+    only. Returns one result per item, in request order: `created` (with
+    `review_id`), `conflict` (the author already reviewed the place) or
+    `place_not_found`.
+    """
+    return crud_review.create_reviews_bulk(
+        db, source=bulk_in.source, reviews_in=bulk_in.reviews
+    )
+
+
+@router.get("/search", response_model=List[ReviewSchema])
+def search_reviews(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find"),
+    place_id: Optional[int] = Query(None, description="Only reviews of this place"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Full-text search of review comments, best match first. A review matches
+    if its comment contains every word of `q`; Thai text also matches inside
+    longer words. If there are more results, the `X-Next-Cursor` response
+    header holds the `cursor` to pass for the next page.
+    """
+    results = crud_review.search_reviews(
+        db,
+        query=q,
+        place_id=place_id,
+        limit=limit + 1,
+        after=_decode_cursor(cursor, decode_rank_cursor),
+    )
+    if len(results) > limit:
+        results = results[:limit]
+        last, rank = results[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_rank_cursor(rank, last.id)
+    return [review for review, _ in results]
+
+
+@router.get("/recent", response_model=List[RecentReview])
+def read_recent_reviews(
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[str] = Query(
+        None, description="Only reviews of places in this category (case-insensitive)"
+    ),
+    lat: Optional[float] = Query(None, ge=-90.0, le=90.0),
+    lng: Optional[float] = Query(None, ge=-180.0, le=180.0),
+    radius_km: Optional[float] = Query(
+        None, gt=0.0, description="Only reviews of places within this distance"
+    ),
+) -> Any:
+    """
+    Get the newest reviews across all places, served from memory without a
+    database query. The feed holds the last RECENT_REVIEWS_CAPACITY reviews
+    and long comments are truncated.
+    """
+    if radius_km is not None and (lat is None or lng is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="lat and lng are required for radius_km",
+        )
+    return crud_review.get_recent_reviews(
+        limit=limit, category=category, lat=lat, lng=lng, radius_km=radius_km
+    )
+
+
 @router.get("/place/{place_id}", response_model=List[ReviewSchema])
 def read_reviews_for_place(
-    place_id: int, db: Session = Depends(get_db), skip: int = 0, limit: int = 20
+    place_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    skip: int = Query(
+        0, ge=0, deprecated=True, description="Ignored when `cursor` is given"
+    ),
 ) -> Any:
     """
-    Get all reviews for a specific place.
+    Get the reviews of a specific place, newest first.
+    If there are more, the `X-Next-Cursor` response header holds the `cursor`
+    to pass for the next page. `skip` is deprecated: without a `cursor` it
+    still skips that many reviews, but deep pages get slower.
     """
-    place = crud_place.get_place(db, place_id=place_id)
+    place = crud_place.get_place(db, place_id=place_id, coalesce=False)
     if not place:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Place not found"
         )
     reviews = crud_review.get_reviews_by_place(
-        db, place_id=place_id, skip=skip, limit=limit
+        db,
+        place_id=place_id,
+        limit=limit + 1,
+        before=_decode_cursor(cursor),
+        skip=skip,
     )
-    return reviews
+    return _paginate(reviews, limit, response)
+
+
+async def _review_event_stream(place_id: int) -> AsyncIterator[str]:
+    subscription = review_events.subscribe(place_id)
+    try:
+        # Clients reconnect after 3 s if the stream ends or the connection drops
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.get(), settings.REVIEW_STREAM_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                return  # Fell too far behind and was dropped
+            yield message
+    finally:
+        review_events.unsubscribe(subscription)
+
+
+@router.get("/place/{place_id}/stream", response_class=StreamingResponse)
+async def stream_reviews_for_place(place_id: int, db: Session = Depends(get_db)):
+    """
+    Server-Sent Events stream of the review writes of a place:
+    `review_created`, `review_updated` and `review_deleted` events whose data
+    is the review as JSON, instead of polling `GET /reviews/place/{place_id}`.
+    A client that cannot keep up is disconnected; after reconnecting it should
+    re-read the reviews it may have missed.
+    """
+    place = await run_in_threadpool(crud_place.get_place, db, place_id=place_id)
+    if not place:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Place not found"
+        )
+    # Give the connection back to the pool, the stream may stay open for hours
+    await run_in_threadpool(db.close)
+    return StreamingResponse(
+        _review_event_stream(place_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.put("/place/{place_id}", response_model=ReviewSchema)
+def upsert_review_for_place(
+    *,
+    db: Session = Depends(get_db),
+    place_id: int,
+    review_in: ReviewUpsert,
+    response: Response,
+    current_user: UserModel = Depends(get_current_active_user),  # Requires auth
+) -> Any:
+    """
+    Create the current user's review of a place, or replace the rating and
+    comment of the one they already wrote. Responds 201 if the review was
+    created and 200 if it was updated; safe to retry.
+    """
+    try:
+        result = crud_review.upsert_review(
+            db, place_id=place_id, review_in=review_in, user_id=current_user.id
+        )
+    except DuplicateReviewError:
+        db.rollback()
+        raise _near_duplicate_error()
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Place not found"
+        )
+    review, created = result
+    if created:
+        response.status_code = status.HTTP_201_CREATED
+    return review
 
 
 @router.get("/user/{user_id}", response_model=List[ReviewSchema])
 def read_reviews_by_user(
     user_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    skip: int = Query(
+        0, ge=0, deprecated=True, description="Ignored when `cursor` is given"
+    ),
     current_user: UserModel = Depends(
         get_current_active_user
     ),  # Auth: only user themselves or admin
 ) -> Any:
     """
-    Get all reviews written by a specific user.
+    Get the reviews written by a specific user, newest first, paginated like
+    the reviews of a place.
     (Protected by auth in a real app - user can see their own, admin can see all)
     """
     user = crud_user.get_user(db, user_id=user_id)
@@ -79,9 +306,13 @@ def read_reviews_by_user(
     #     raise HTTPException(status_code=403, detail="Not enough permissions")
 
     reviews = crud_review.get_reviews_by_user(
-        db, user_id=user_id, skip=skip, limit=limit
+        db,
+        user_id=user_id,
+        limit=limit + 1,
+        before=_decode_cursor(cursor),
+        skip=skip,
     )
-    return reviews
+    return _paginate(reviews, limit, response)
 
 
 @router.get("/{review_id}", response_model=ReviewSchema)
@@ -108,7 +339,7 @@ def update_review(
     """
     Update a review. User must be the author of the review.
     """
-    db_review = crud_review.get_review(db, review_id=review_id)
+    db_review = crud_review.get_review(db, review_id=review_id, coalesce=False)
     if not db_review:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Review not found"
@@ -122,8 +353,17 @@ def update_review(
             detail="Not enough permissions to update this review",
         )
 
-    review = crud_review.update_review(db=db, db_review=db_review, review_in=review_in)
-    # crud_place.update_place_average_rating(db, place_id=review.place_id) # Example
+    try:
+        review = crud_review.update_review(
+            db=db, db_review=db_review, review_in=review_in
+        )
+    except DuplicateReviewError:
+        db.rollback()
+        raise _near_duplicate_error()
+    if review is None:  # Deleted since it was read
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Review not found"
+        )
     return review
 
 
@@ -137,7 +377,7 @@ def delete_review(
     """
     Delete a review. User must be the author or an admin.
     """
-    db_review = crud_review.get_review(db, review_id=review_id)
+    db_review = crud_review.get_review(db, review_id=review_id, coalesce=False)
     if not db_review:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Review not found"
@@ -162,6 +402,4 @@ def delete_review(
         raise HTTPException(
             status_code=404, detail="Review not found during delete operation"
         )
-
-    # crud_place.update_place_average_rating(db, place_id=deleted_review.place_id) # Example
     return deleted_review
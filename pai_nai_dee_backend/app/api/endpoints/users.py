@@ -2,11 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Any
 
-from ...schemas import User as UserSchema, UserCreate, UserUpdate
+from ...schemas import User as UserSchema, UserCreate, UserProfile, UserUpdate
 from ...crud import crud_user
 from ...db.database import get_db
 from ...core.security import get_current_active_user
 from ...models.user import User as UserModel
+from ...services.user_service import UserService
 
 router = APIRouter()
 
@@ -78,6 +79,24 @@ def read_user_by_id(
     return user
 
 
+@router.get("/{user_id}/profile", response_model=UserProfile)
+def read_user_profile(
+    user_id: int,
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get a user's public profile: review and itinerary counts and the average
+    rating they have given.
+    """
+    profile = UserService(db).get_user_profile_details(user_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The user with this id does not exist in the system",
+        )
+    return profile
+
+
 @router.put("/{user_id}", response_model=UserSchema)
 def update_user(
     *,
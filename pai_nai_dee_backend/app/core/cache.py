@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class LRUTTLCache:
+    """
+    Thread-safe in-process LRU cache with a per-entry TTL and a size limit in bytes.
+
+    Values are stored already serialized (``bytes``) so the memory footprint of each
+    entry is known exactly and cache hits can be written straight to the response.
+    The cache is local to one worker process: invalidations are not broadcast to
+    other workers, whose copies go stale for at most ``ttl_seconds``.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, float]]" = OrderedDict()
+        self._current_bytes = 0
+        self._generation = 0  # Bumped on every invalidation, see `set`
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self) -> int:
+        """
+        Returns the current invalidation generation. Take it before loading a value
+        from the database and pass it to `set`, so a load that raced with a write
+        cannot put the stale value back into the cache.
+        """
+        with self._lock:
+            return self._generation
+
+    def set(
+        self, key: Hashable, value: bytes, generation: Optional[int] = None
+    ) -> bool:
+        size = len(value)
+        if size > self.max_bytes:
+            return False  # Would evict everything else, not worth caching
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            if key in self._entries:
+                self._remove(key)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        # Caller must hold the lock
+        value, _ = self._entries.pop(key)
+        self._current_bytes -= len(value)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import model_validator  # Moved to top-level
 
 
@@ -69,6 +69,69 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30  # 30 minutes
     ALGORITHM: str = "HS256"
 
+    # Place detail cache (per worker process, see app.core.cache.LRUTTLCache)
+    PLACE_CACHE_MAX_BYTES: int = 16 * 1024 * 1024  # 16 MiB of serialized places
+    PLACE_CACHE_TTL_SECONDS: float = 60.0  # Upper bound on staleness across workers
+
+    # Memory-mapped place catalog snapshot (see app.services.place_catalog).
+    # When set, GET /places listings are served from the snapshot file.
+    PLACE_CATALOG_PATH: Optional[str] = None
+    PLACE_CATALOG_RELOAD_SECONDS: float = 30.0  # How often to check for a rebuilt file
+
+    # Write-behind rating aggregates (see crud_place.apply_rating_change). When on,
+    # review writes insert their rating deltas into place_rating_deltas and a
+    # background flusher applies the summed deltas per place every
+    # RATING_FLUSH_INTERVAL_MS.
+    RATING_WRITE_BEHIND: bool = False
+    RATING_FLUSH_INTERVAL_MS: int = 200
+
+    # Bayesian ranking score of places (sort=best), see crud_place.ranking_score_expression.
+    # The global mean rating (the prior) is refreshed in the background.
+    RANKING_PRIOR_WEIGHT: float = 10.0  # Weight of the global mean, in reviews
+    RANKING_PRIOR_DEFAULT_MEAN: float = 3.0  # Used until the first refresh
+    RANKING_PRIOR_REFRESH_SECONDS: float = 3600.0
+    RANKING_PRIOR_MIN_CHANGE: float = 0.01  # Rescore all places only past this drift
+
+    # Recent reviews feed (GET /reviews/recent), kept in an in-process ring buffer
+    # (see crud_review.recent_reviews). Reviews written through other workers show
+    # up after the next reload from the database.
+    RECENT_REVIEWS_CAPACITY: int = 1000  # Reviews kept per worker process
+    RECENT_REVIEWS_COMMENT_CHARS: int = 280  # Longer comments are truncated
+    RECENT_REVIEWS_RELOAD_SECONDS: float = 30.0
+
+    # Live review stream of a place (GET /reviews/place/{id}/stream, Server-Sent
+    # Events). Events come from review writes handled by the same worker process.
+    REVIEW_STREAM_QUEUE_SIZE: int = 64  # Pending events before a client is dropped
+    REVIEW_STREAM_KEEPALIVE_SECONDS: float = 15.0  # Comment line to keep proxies open
+
+    # Rows per INSERT statement of POST /reviews/bulk
+    REVIEW_BULK_INSERT_BATCH_SIZE: int = 200
+
+    # Near-duplicate review comments (see crud_review.review_fingerprints, an
+    # in-process MinHash LSH index rebuilt from the database in the background).
+    # "flag" stores the matched review in Review.duplicate_of_id, "reject" refuses
+    # the review, "off" disables the check and the index.
+    REVIEW_DUPLICATE_ACTION: Literal["off", "flag", "reject"] = "flag"
+    REVIEW_DUPLICATE_THRESHOLD: float = 0.7  # Estimated Jaccard similarity
+    REVIEW_DUPLICATE_MIN_CHARS: int = 30  # Shorter comments are never compared
+    REVIEW_DUPLICATE_REBUILD_SECONDS: float = 6 * 3600.0
+
+    # Stop reordering of POST /itineraries/{id}/optimize (see
+    # ItineraryService.optimize_stops). Past the budget, the best route found so
+    # far is returned; 200 stops fit in it (scripts/bench_route_optimizer.py).
+    ITINERARY_OPTIMIZE_TIME_BUDGET_MS: int = 250
+
+    # Template itinerary listing (GET /itineraries/templates), cached per worker
+    # process (see crud_itinerary.template_cache). Template edits clear it; the
+    # embedded places may be up to the TTL out of date.
+    ITINERARY_TEMPLATE_CACHE_MAX_BYTES: int = 4 * 1024 * 1024
+    ITINERARY_TEMPLATE_CACHE_TTL_SECONDS: float = 300.0
+
+    # Distances between places, cached per worker process for route optimization
+    # (see crud_place.place_distances). Holds the most recently used places; the
+    # matrix takes up to 4 * max_places ** 2 bytes (16 MiB for 2048); 0 turns it off.
+    PLACE_DISTANCE_CACHE_MAX_PLACES: int = 2048
+
     # CORS settings (example)
     # BACKEND_CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:8080"] # Example for frontend
 
@@ -0,0 +1,205 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.geo import haversine_km
+
+_INITIAL_CAPACITY = 64
+
+
+def _same(a: float, b: float) -> bool:
+    return a == b or (a != a and b != b)  # NaN for unknown coordinates
+
+
+class DistanceMatrix:
+    """
+    Thread-safe in-process cache of the distances between pairs of places,
+    keeping the `max_places` most recently used places.
+
+    Each cached place gets a slot, and the distance between two places is the
+    cell of their two slots in one dense float32 matrix (NaN until computed),
+    so a block of pairs is read with NumPy gathers instead of a lookup per
+    pair. Each distance is written to both cells of its pair, and only counts
+    as cached while neither is NaN. Callers ask for whole blocks, rows of
+    places against columns of places given with their coordinates; the
+    missing pairs are computed at once with `compute`, a NumPy function
+    broadcasting like `haversine_km` (the default). Pairs with a missing (NaN)
+    coordinate are never cached.
+
+    The coordinates of each cached place are kept, and a block giving other
+    coordinates for a place drops its distances first, so a place moved
+    through another worker process is picked up too. `invalidate` drops them
+    at once, e.g. when a place is updated or deleted.
+
+    The matrix grows by doubling and takes at most 4 * max_places ** 2 bytes
+    (16 MiB for 2048 places).
+
+    With haversine_km this mostly saves time when the same places are asked
+    for again, e.g. an itinerary optimized once more: recomputing a block with
+    NumPy is about as fast as gathering it (see scripts/bench_distance_matrix.py).
+    The cache pays off with costlier `compute` functions, such as travel times.
+    """
+
+    def __init__(
+        self,
+        max_places: int,
+        compute: Callable[..., np.ndarray] = haversine_km,
+    ):
+        self.max_places = max_places
+        self.compute = compute
+        # Slot and coordinates of each cached place, least recently used first
+        self._places: "OrderedDict[int, Tuple[int, float, float]]" = OrderedDict()
+        self._free: List[int] = []
+        capacity = min(_INITIAL_CAPACITY, max_places)
+        self._distances = np.full((capacity, capacity), np.nan, dtype=np.float32)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def block(
+        self,
+        row_ids: Sequence[int],
+        row_latitudes: Sequence[float],
+        row_longitudes: Sequence[float],
+        column_ids: Sequence[int],
+        column_latitudes: Sequence[float],
+        column_longitudes: Sequence[float],
+    ) -> np.ndarray:
+        """
+        Distances from each row place to each column place, as a
+        (len(row_ids), len(column_ids)) array, e.g. from the last stop of an
+        itinerary to candidate next stops.
+        """
+        row_lat, row_lng, column_lat, column_lng = (
+            np.asarray(v, dtype=np.float64)
+            for v in (
+                row_latitudes,
+                row_longitudes,
+                column_latitudes,
+                column_longitudes,
+            )
+        )
+        if len({*row_ids, *column_ids}) > self.max_places:
+            # Would evict its own places, not worth caching
+            return self.compute(
+                row_lat[:, None], row_lng[:, None], column_lat[None], column_lng[None]
+            )
+
+        with self._lock:
+            rows = self._slots_of(row_ids, row_lat, row_lng)
+            if column_ids is row_ids:
+                columns = rows
+            else:
+                columns = self._slots_of(column_ids, column_lat, column_lng)
+            distances = self._distances[np.ix_(rows, columns)].astype(np.float64)
+            if columns is rows:
+                backward = distances.T
+            else:
+                backward = self._distances[np.ix_(columns, rows)].T
+            missing = np.isnan(distances) | np.isnan(backward)
+            i, j = np.nonzero(missing)
+            self.hits += missing.size - len(i)
+            self.misses += len(i)
+            if len(i):
+                # Rounded as stored, so results do not depend on what was cached
+                computed = self.compute(
+                    row_lat[i], row_lng[i], column_lat[j], column_lng[j]
+                ).astype(np.float32)
+                distances[i, j] = computed
+                self._distances[rows[i], columns[j]] = computed
+                self._distances[columns[j], rows[i]] = computed
+        return distances
+
+    def matrix(
+        self,
+        place_ids: Sequence[int],
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+    ) -> np.ndarray:
+        """Square matrix of the distances between all the given places."""
+        return self.block(
+            place_ids, latitudes, longitudes, place_ids, latitudes, longitudes
+        )
+
+    def invalidate(self, place_id: int) -> None:
+        """Drops every cached distance to the place, e.g. after it moved."""
+        with self._lock:
+            entry = self._places.pop(place_id, None)
+            if entry is not None:
+                self._release(entry[0])
+                self._free.append(entry[0])
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._places.clear()
+            self._free.clear()
+            self._distances.fill(np.nan)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "places": len(self._places),
+                "max_places": self.max_places,
+                "bytes": self._distances.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._places)
+
+    def _slots_of(
+        self, place_ids: Sequence[int], latitudes: np.ndarray, longitudes: np.ndarray
+    ) -> np.ndarray:
+        # Caller must hold the lock. Slots of the places, marking them as the
+        # most recently used and taking new slots for places not cached yet
+        slots = np.empty(len(place_ids), dtype=np.intp)
+        for i, (place_id, lat, lng) in enumerate(
+            zip(place_ids, latitudes.tolist(), longitudes.tolist())
+        ):
+            entry = self._places.get(place_id)
+            if entry is None:
+                slot = self._take_slot()
+            else:
+                slot = entry[0]
+                self._places.move_to_end(place_id)
+                if not (_same(entry[1], lat) and _same(entry[2], lng)):
+                    self._release(slot)  # Moved: same slot, distances dropped
+                    self.invalidations += 1
+            self._places[place_id] = (slot, lat, lng)
+            slots[i] = slot
+        return slots
+
+    def _take_slot(self) -> int:
+        # Caller must hold the lock
+        if self._free:
+            return self._free.pop()
+        used = len(self._places)  # Slots 0 .. used - 1 are all taken
+        capacity = len(self._distances)
+        if used < capacity:
+            return used
+        if capacity < self.max_places:
+            grown = min(capacity * 2, self.max_places)
+            distances = np.full((grown, grown), np.nan, dtype=np.float32)
+            distances[:capacity, :capacity] = self._distances
+            self._distances = distances
+            return used
+        _, (slot, _, _) = self._places.popitem(last=False)
+        self._release(slot)
+        self.evictions += 1
+        return slot
+
+    def _release(self, slot: int) -> None:
+        # Caller must hold the lock. Forgets the distances of the slot's place:
+        # clearing its row (contiguous, unlike its column) leaves one of the two
+        # cells of each of its pairs NaN
+        self._distances[slot] = np.nan
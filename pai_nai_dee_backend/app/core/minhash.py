@@ -0,0 +1,258 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+_SHINGLE_BASE = np.uint64(0x100000001B3)
+_SHIFT = np.uint64(32)
+_MASK = np.uint64(0xFFFFFFFF)
+_FNV_PRIME = np.uint32(0x01000193)
+# Whitespace and ASCII punctuation; other characters (e.g. Thai letters and
+# their combining vowel and tone marks) are kept as they are
+_SEPARATORS = re.compile(r"[\s!-/:-@\[-`{-~]+")
+
+
+def normalize(text: str) -> str:
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+class MinHashLSH:
+    """
+    Thread-safe in-process index of texts for finding near-duplicates: texts
+    whose sets of `shingle_size`-character shingles have a high Jaccard
+    similarity, such as the same comment with a few words changed. Character
+    shingles also work for scripts written without spaces, like Thai.
+
+    Each text is reduced to a MinHash signature of `num_perm` values, split
+    into `bands` bands. Texts sharing any band are candidates; a query only
+    looks up its own bands (binary searches, independent of the index size)
+    and estimates the similarity of the few candidates from their signatures.
+    With the defaults a pair at similarity 0.7 becomes a candidate with
+    probability 0.99 (0.9998 at 0.8), and a pair at 0.3 with about 0.12.
+
+    Texts are identified by integer keys (e.g. review ids). The bulk of the
+    index is a set of compact NumPy arrays built by `rebuild` (about 270 bytes
+    per text with the defaults); `add` and `remove` change a small overlay on
+    top of it until the next rebuild.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        min_chars: int = 0,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_chars = min_chars
+        generator = np.random.default_rng(seed)
+        # Multiply-shift hashing of 32-bit values, (a * h + b) mod 2**64 >> 32,
+        # needs random 64-bit a (odd) and b
+        self._a = generator.integers(0, 1 << 64, num_perm, dtype=np.uint64) | 1
+        self._b = generator.integers(0, 1 << 64, num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        # Base index built by `rebuild`: keys, signatures (truncated to 16 bits,
+        # enough to estimate similarities) and, per band, the sorted band hashes
+        # with the positions of their texts
+        self._keys = np.empty(0, dtype=np.int64)
+        self._signatures = np.empty((0, num_perm), dtype=np.uint16)
+        self._band_hashes = np.empty((bands, 0), dtype=np.uint32)
+        self._band_positions = np.empty((bands, 0), dtype=np.int32)
+        # Overlay of writes since: added texts, and keys whose base entry is
+        # gone (removed or re-added); values are write sequence numbers
+        self._added: Dict[int, Tuple[np.ndarray, int]] = {}
+        self._added_buckets: List[Dict[int, Set[int]]] = [{} for _ in range(bands)]
+        self._removed: Dict[int, int] = {}
+        self._writes = 0
+
+    def signatures(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        MinHash signatures of `texts` as a (len(texts), num_perm) array, and a
+        mask of the texts that have any (not shorter than `min_chars`).
+        """
+        size = self.shingle_size
+        normalized = [normalize(text) for text in texts]
+        valid = np.fromiter(
+            (len(text) >= max(self.min_chars, 1) for text in normalized),
+            dtype=bool,
+            count=len(normalized),
+        )
+        signatures = np.full((len(texts), self.num_perm), 0xFFFFFFFF, dtype=np.uint32)
+        if not valid.any():
+            return signatures, valid
+
+        # Texts shorter than a shingle are one shingle, padded with NULs
+        kept = [text.ljust(size, "\0") for text, ok in zip(normalized, valid) if ok]
+        lengths = np.fromiter(map(len, kept), dtype=np.int64, count=len(kept))
+        codepoints = np.frombuffer(
+            "".join(kept).encode("utf-32-le"), dtype=np.uint32
+        ).astype(np.uint64)
+        # Polynomial hash of every run of `size` characters, then only the runs
+        # within one text (the shingles), each folded to 32 bits
+        n_runs = len(codepoints) - size + 1
+        hashes = np.zeros(n_runs, dtype=np.uint64)
+        for j in range(size):
+            hashes = hashes * _SHINGLE_BASE + codepoints[j : n_runs + j]
+        counts = lengths - size + 1
+        shingle_starts = np.cumsum(counts) - counts
+        text_starts = np.cumsum(lengths) - lengths
+        shingles = np.arange(counts.sum()) + np.repeat(
+            text_starts - shingle_starts, counts
+        )
+        hashes = hashes[shingles]
+        hashes = (hashes ^ (hashes >> _SHIFT)) & _MASK
+
+        # One multiply-shift hash function per permutation, minimum per text
+        permuted = (self._a[:, None] * hashes + self._b[:, None]) >> _SHIFT
+        minima = np.minimum.reduceat(permuted, shingle_starts, axis=1)
+        signatures[valid] = minima.T
+        return signatures, valid
+
+    def _bands_of(self, signatures: np.ndarray) -> np.ndarray:
+        # FNV-1a over the rows of each band: (n, bands) uint32 band hashes
+        rows = signatures.reshape(len(signatures), self.bands, self.rows)
+        hashes = np.full(rows.shape[:2], 0x811C9DC5, dtype=np.uint32)
+        for j in range(self.rows):
+            hashes = (hashes ^ rows[:, :, j]) * _FNV_PRIME
+        return hashes
+
+    def add(self, key: int, text: str) -> bool:
+        """Indexes (or re-indexes) `text` under `key`; False if it is too short."""
+        signatures, valid = self.signatures([text])
+        with self._lock:
+            self._remove_locked(key)
+            if not valid[0]:
+                return False
+            self._added[key] = (signatures[0], self._writes)
+            for band, band_hash in enumerate(self._bands_of(signatures)[0]):
+                self._added_buckets[band].setdefault(int(band_hash), set()).add(key)
+            return True
+
+    def remove(self, key: int) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: int) -> None:
+        self._writes += 1
+        self._removed[key] = self._writes
+        entry = self._added.pop(key, None)
+        if entry is not None:
+            for band, band_hash in enumerate(self._bands_of(entry[0][None, :])[0]):
+                bucket = self._added_buckets[band][int(band_hash)]
+                bucket.discard(key)
+                if not bucket:
+                    del self._added_buckets[band][int(band_hash)]
+
+    def query(
+        self, text: str, threshold: float, exclude: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Indexed texts with an estimated similarity to `text` of at least
+        `threshold`, as (key, similarity) pairs, most similar first.
+        """
+        signatures, valid = self.signatures([text])
+        if not valid[0]:
+            return []
+        signature = signatures[0]
+        band_hashes = self._bands_of(signatures)[0]
+        matches = []
+        with self._lock:
+            positions = []
+            for band, band_hash in enumerate(band_hashes):
+                hashes = self._band_hashes[band]
+                lo = np.searchsorted(hashes, band_hash, "left")
+                hi = np.searchsorted(hashes, band_hash, "right")
+                positions.append(self._band_positions[band, lo:hi])
+            candidates = np.unique(np.concatenate(positions))
+            similarities = (
+                self._signatures[candidates] == signature.astype(np.uint16)
+            ).mean(axis=1)
+            keys = self._keys[candidates].tolist()
+            for key, similarity in zip(keys, similarities.tolist()):
+                if similarity >= threshold and key not in self._removed:
+                    matches.append((key, similarity))
+
+            added: Set[int] = set()
+            for band, band_hash in enumerate(band_hashes.tolist()):
+                added.update(self._added_buckets[band].get(band_hash, ()))
+            for key in added:
+                similarity = float((self._added[key][0] == signature).mean())
+                if similarity >= threshold:
+                    matches.append((key, similarity))
+        matches = [m for m in matches if m[0] != exclude]
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def rebuild(self, items: Iterable[Tuple[int, str]], chunk_size: int = 512) -> int:
+        """
+        Replaces the index with `items` ((key, text) pairs), e.g. every review
+        comment streamed from the database, hashing `chunk_size` texts at a
+        time. Queries keep being served from the old index meanwhile, and adds
+        and removes made during the rebuild are kept on top of the new one.
+        Returns the number of texts indexed.
+        """
+        with self._lock:
+            started_at = self._writes
+        key_chunks = []
+        signature_chunks = []
+        chunk: List[Tuple[int, str]] = []
+
+        def hash_chunk():
+            signatures, valid = self.signatures([text for _, text in chunk])
+            keys = np.fromiter(
+                (key for key, _ in chunk), dtype=np.int64, count=len(chunk)
+            )
+            key_chunks.append(keys[valid])
+            signature_chunks.append(signatures[valid])
+            chunk.clear()
+
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                hash_chunk()
+        hash_chunk()
+
+        keys = np.concatenate(key_chunks)
+        signatures = np.concatenate(signature_chunks)
+        band_hashes = self._bands_of(signatures).T  # (bands, n)
+        band_positions = np.argsort(band_hashes, axis=1, kind="stable").astype(np.int32)
+        band_hashes = np.take_along_axis(band_hashes, band_positions, axis=1)
+
+        with self._lock:
+            self._keys = keys
+            self._signatures = signatures.astype(np.uint16)
+            self._band_hashes = band_hashes
+            self._band_positions = band_positions
+            # Only writes made while rebuilding can differ from what was loaded
+            self._removed = {
+                key: seq for key, seq in self._removed.items() if seq > started_at
+            }
+            for key, (_, seq) in list(self._added.items()):
+                if seq > started_at:
+                    self._removed.setdefault(key, seq)  # Shadow its loaded copy
+                else:
+                    self._remove_locked(key)
+                    del self._removed[key]
+        return len(keys)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the base index arrays."""
+        return (
+            self._keys.nbytes
+            + self._signatures.nbytes
+            + self._band_hashes.nbytes
+            + self._band_positions.nbytes
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            shadowed = np.isin(self._keys, list(self._removed)).sum()
+            return int(len(self._keys) - shadowed) + len(self._added)
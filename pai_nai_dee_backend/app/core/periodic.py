@@ -0,0 +1,55 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Background thread calling `fn()` every `interval_seconds` until stopped.
+    With `run_at_start` the first call happens right away, and with `run_on_stop`
+    `stop` makes one last call (e.g. a final flush on shutdown).
+    Exceptions are logged and the task keeps running.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[], object],
+        interval_seconds: float,
+        name: str = "periodic-task",
+        run_at_start: bool = False,
+        run_on_stop: bool = False,
+    ):
+        self.fn = fn
+        self.interval_seconds = interval_seconds
+        self.name = name
+        self.run_at_start = run_at_start
+        self.run_on_stop = run_on_stop
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.run_on_stop:
+            self._run_once()
+
+    def _run(self) -> None:
+        if self.run_at_start:
+            self._run_once()
+        while not self._stopped.wait(self.interval_seconds):
+            self._run_once()
+
+    def _run_once(self) -> None:
+        try:
+            self.fn()
+        except Exception:
+            logger.exception(f"Background task {self.name} failed")
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from typing import Dict, Generic, Hashable, List, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+
+class Subscription(Generic[T]):
+    """
+    One subscriber's bounded queue of messages on a topic, bound to the event
+    loop it was created on. `get` returns None once the subscription was dropped
+    for falling behind.
+    """
+
+    def __init__(
+        self, topic: Hashable, max_queue: int, loop: asyncio.AbstractEventLoop
+    ):
+        self.topic = topic
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[T]]" = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False
+
+    async def get(self) -> Optional[T]:
+        return await self.queue.get()
+
+
+class PubSub(Generic[T]):
+    """
+    In-process publish/subscribe fan-out from any thread to asyncio subscribers.
+
+    `publish` is cheap for the publisher: it hands the message to each event
+    loop with subscribers on the topic (one `call_soon_threadsafe` per loop, not
+    per subscriber), and the loop puts it into the subscribers' queues. A
+    subscriber whose queue is full is dropped instead of buffering without
+    bound or slowing down everyone else; it receives None and must resubscribe
+    (and catch up some other way). Idle subscribers cost one queue each.
+    Subscribers only see messages published in this process.
+    """
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._topics: Dict[Hashable, Set[Subscription[T]]] = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def subscribe(self, topic: Hashable) -> Subscription[T]:
+        """Subscribes to `topic`; must be called from the subscriber's event loop."""
+        subscription: Subscription[T] = Subscription(
+            topic, self.max_queue, asyncio.get_running_loop()
+        )
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription[T]) -> None:
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def subscriber_count(self, topic: Hashable) -> int:
+        with self._lock:
+            return len(self._topics.get(topic, ()))
+
+    def publish(self, topic: Hashable, message: T) -> int:
+        """Sends `message` to the subscribers of `topic`; returns how many there were."""
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        by_loop: Dict[asyncio.AbstractEventLoop, List[Subscription[T]]] = {}
+        for subscription in subscribers:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, loop_subscribers in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._deliver, loop_subscribers, message)
+            except RuntimeError:  # Loop closed, its subscribers are gone
+                for subscription in loop_subscribers:
+                    self.unsubscribe(subscription)
+        return len(subscribers)
+
+    def _deliver(self, subscribers: List[Subscription[T]], message: T) -> None:
+        # Runs on the subscribers' event loop
+        for subscription in subscribers:
+            if subscription.dropped:
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription[T]) -> None:
+        subscription.dropped = True
+        self.unsubscribe(subscription)
+        self.dropped += 1
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
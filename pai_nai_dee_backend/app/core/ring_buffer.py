@@ -0,0 +1,118 @@
+import threading
+from itertools import islice
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RingBuffer(Generic[T]):
+    """
+    Thread-safe in-process buffer of the `capacity` most recently appended items,
+    read newest first. Appending is O(1) and overwrites the oldest item once
+    full, so the memory footprint is bounded by `capacity` items.
+
+    Items are identified by `key(item)`, which must grow with insertion order
+    (e.g. an autoincrement id); `reload` relies on it to merge a fresh load from
+    the database with items appended while that load was running. An index from
+    keys to slots makes `replace` and `remove` O(1) too. A removed item leaves
+    its slot empty until appending wraps around to it.
+    """
+
+    def __init__(self, capacity: int, key: Callable[[T], Hashable]):
+        self.capacity = capacity
+        self.key = key
+        self._slots: List[Optional[T]] = [None] * capacity
+        self._next = 0  # Slot of the next append, i.e. of the oldest item
+        self._index: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def append(self, item: T) -> None:
+        with self._lock:
+            self._put(item)
+
+    def replace(self, item: T) -> bool:
+        """Swaps in `item` for the buffered item with the same key, if any."""
+        with self._lock:
+            slot = self._index.get(self.key(item))
+            if slot is None:
+                return False
+            self._slots[slot] = item
+            return True
+
+    def remove(self, key: Hashable) -> bool:
+        with self._lock:
+            slot = self._index.pop(key, None)
+            if slot is None:
+                return False
+            self._slots[slot] = None
+            return True
+
+    def newest(
+        self,
+        limit: Optional[int] = None,
+        predicate: Optional[Callable[[T], bool]] = None,
+    ) -> List[T]:
+        """
+        Up to `limit` items (all if None), newest first, optionally only those
+        matching `predicate`. Without a predicate or removed items this is
+        O(limit); otherwise it scans until `limit` matches are found, at most
+        the whole buffer.
+        """
+        with self._lock:
+            slots = (
+                self._slots[(self._next - i) % self.capacity]
+                for i in range(1, self.capacity + 1)
+            )
+            items: Iterable[T] = (item for item in slots if item is not None)
+            if predicate is not None:
+                items = filter(predicate, items)
+            return list(islice(items, limit))
+
+    def reload(self, items: Iterable[T]) -> None:
+        """
+        Replaces the contents with `items` (oldest first). Buffered items with a
+        key above every loaded one were appended after the load read the
+        database and are kept.
+        """
+        loaded = list(items)
+        with self._lock:
+            buffered = self._oldest_first()
+            if loaded:
+                last_key = max(self.key(item) for item in loaded)
+                newer = [item for item in buffered if self.key(item) > last_key]
+            else:
+                newer = buffered
+            self._reset()
+            for item in (loaded + newer)[-self.capacity :]:
+                self._put(item)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    def _put(self, item: T) -> None:
+        # Caller must hold the lock
+        if not self.capacity:
+            return
+        slot = self._next
+        evicted = self._slots[slot]
+        if evicted is not None and self._index.get(self.key(evicted)) == slot:
+            del self._index[self.key(evicted)]
+        self._slots[slot] = item
+        self._index[self.key(item)] = slot
+        self._next = (slot + 1) % self.capacity
+
+    def _oldest_first(self) -> List[T]:
+        # Caller must hold the lock
+        slots = self._slots[self._next :] + self._slots[: self._next]
+        return [item for item in slots if item is not None]
+
+    def _reset(self) -> None:
+        # Caller must hold the lock
+        self._slots = [None] * self.capacity
+        self._next = 0
+        self._index.clear()
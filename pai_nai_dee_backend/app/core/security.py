@@ -81,12 +81,12 @@ async def get_current_active_user(
     return current_user
 
 
-# Optional: For superuser checks (if roles/superuser status is implemented)
-# async def get_current_active_superuser(
-#     current_user: UserModel = Depends(get_current_active_user),
-# ) -> UserModel:
-#     if not crud_user.is_superuser(current_user): # Requires is_superuser method/property
-#         raise HTTPException(
-#             status_code=status.HTTP_403_FORBIDDEN, detail="The user doesn't have enough privileges"
-#         )
-#     return current_user
+async def get_current_active_superuser(
+    current_user: UserModel = Depends(get_current_active_user),
+) -> UserModel:
+    if not crud_user.is_superuser(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges",
+        )
+    return current_user
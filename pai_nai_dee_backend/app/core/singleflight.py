@@ -0,0 +1,144 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+# Key of `Connection.info` set once the connection's transaction has written
+_WROTE = "singleflight_wrote"
+
+
+@event.listens_for(Engine, "begin")
+def _forget_writes(conn) -> None:
+    conn.info.pop(_WROTE, None)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _note_write(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Anything but a plain SELECT counts as a write, so raw SQL errs on the
+    # side of not coalescing
+    if (
+        context is None
+        or context.isinsert
+        or context.isupdate
+        or context.isdelete
+        or statement.lstrip()[:6].upper() != "SELECT"
+    ):
+        conn.info[_WROTE] = True
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it is in flight wait for it and receive the same result (or exception).
+    Nothing is remembered once the call finishes, so this only removes duplicate
+    work between overlapping requests, it is not a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Runs `fn` once for all concurrent callers with the same `key`.
+        Returns `(result, shared)`, where `shared` is True for followers that
+        received the leader's result instead of running `fn` themselves.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def query(self, db: Session, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Like `do`, for functions returning ORM objects (or a list of them).
+        Only the loaded column values are shared between sessions: followers
+        get fresh instances of their own session built from the leader's
+        snapshot, so no ORM instance is ever used from two threads.
+
+        Not meant for loading objects that are then modified. A session with
+        pending changes, or whose transaction has already written, runs `fn`
+        on its own: its results could show uncommitted rows to other
+        sessions. Objects the session already holds are returned as they are
+        rather than overwritten with a snapshot, like a regular query does.
+        """
+        if db.new or db.dirty or db.deleted or _has_written(db):
+            return fn()
+
+        def load() -> Tuple[Any, Any]:
+            result = fn()
+            if isinstance(result, list):
+                return result, [_snapshot(obj) for obj in result]
+            return result, None if result is None else _snapshot(result)
+
+        (result, snapshot), shared = self.do(key, load)
+        if not shared or snapshot is None:
+            return result
+        if isinstance(snapshot, list):
+            return [_restore(db, values) for values in snapshot]
+        return _restore(db, snapshot)
+
+
+def _has_written(db: Session) -> bool:
+    # Whether the session's transaction has flushed or executed a write
+    if not db.in_transaction():
+        return False
+    return bool(db.connection().info.get(_WROTE))
+
+
+def _snapshot(obj: Any) -> Tuple[type, Dict[str, Any]]:
+    # Loaded column values of a persistent object, safe to share between threads
+    state = inspect(obj)
+    values = {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+    return type(obj), values
+
+
+def _restore(db: Session, snapshot: Tuple[type, Dict[str, Any]]) -> Any:
+    # A clean instance with the snapshot's values, attached to `db` without
+    # querying (the session's own instance if it already has that identity)
+    cls, values = snapshot
+    obj = inspect(cls).class_manager.new_instance()
+    for name, value in values.items():
+        set_committed_value(obj, name, value)
+    make_transient_to_detached(obj)
+    own = db.identity_map.get(inspect(obj).key)
+    if own is not None:
+        return own
+    return db.merge(obj, load=False)
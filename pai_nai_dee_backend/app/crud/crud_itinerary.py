@@ -1,61 +1,236 @@
-from sqlalchemy.orm import Session
-from typing import Optional, List
+import threading
+from bisect import bisect_left
+from pydantic import TypeAdapter
+from sqlalchemy import delete, exists, func, insert, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, selectinload
+from typing import Dict, Optional, List, Sequence, Set, Tuple
 
-from ..models.itinerary import Itinerary
+from ..core.cache import LRUTTLCache
+from ..core.config import settings
+from ..core.singleflight import SingleFlight
+from ..models.itinerary import Itinerary, ItineraryStop
 from ..models.place import Place  # Needed to fetch Place objects for association
-from ..schemas.itinerary import ItineraryCreate, ItineraryUpdate
+from ..models.place import itinerary_place_association
+from ..schemas.itinerary import (
+    ItineraryCreate,
+    ItineraryDetail,
+    ItineraryStopCreate,
+    ItineraryUpdate,
+)
+from .crud_place import place as crud_place
+from .crud_user import user as crud_user
+
+# Gap between the positions of consecutive stops when they are (re)numbered
+POSITION_STEP = 1024
+
+# Serialized pages of the template listing keyed by (skip, limit), shared by
+# all requests in this process
+template_cache = LRUTTLCache(
+    max_bytes=settings.ITINERARY_TEMPLATE_CACHE_MAX_BYTES,
+    ttl_seconds=settings.ITINERARY_TEMPLATE_CACHE_TTL_SECONDS,
+)
+# Coalesces concurrent misses of the same page (e.g. right after a template
+# edit) into one query
+template_reads = SingleFlight()
+# Ids of the templates on cached pages, to tell which writes invalidate them.
+# The lock keeps them in step with template_cache: ids are recorded together
+# with the page that holds them, and cleared together with the cache.
+_cached_template_ids: Set[int] = set()
+_template_lock = threading.Lock()
+_template_list = TypeAdapter(List[ItineraryDetail])
+
+
+def _insert_stop(db: Session):
+    """INSERT into itinerary_place_association with the dialect's ON CONFLICT support."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(itinerary_place_association)
+
+
+def _longest_increasing(items: Sequence[Tuple[int, int]]) -> Set[int]:
+    """Keys of a longest subsequence of (key, value) `items` with increasing values."""
+    tails: List[int] = []  # Per length, the run ending with the smallest value
+    tail_values: List[int] = []
+    parents: List[Optional[int]] = []
+    for i, (_, value) in enumerate(items):
+        length = bisect_left(tail_values, value)
+        parents.append(tails[length - 1] if length else None)
+        if length == len(tails):
+            tails.append(i)
+            tail_values.append(value)
+        else:
+            tails[length] = i
+            tail_values[length] = value
+    kept = set()
+    i = tails[-1] if tails else None
+    while i is not None:
+        kept.add(items[i][0])
+        i = parents[i]
+    return kept
+
+
+def _spread(low: Optional[int], high: Optional[int], n: int) -> Optional[List[int]]:
+    # n increasing positions between low and high (either may be open), or None
+    # if they do not fit
+    if low is None and high is None:
+        return [i * POSITION_STEP for i in range(n)]
+    if high is None:
+        return [low + (i + 1) * POSITION_STEP for i in range(n)]
+    if low is None:
+        return [high - (n - i) * POSITION_STEP for i in range(n)]
+    if high - low <= n:
+        return None
+    return [low + (high - low) * (i + 1) // (n + 1) for i in range(n)]
+
+
+def plan_positions(current: Dict[int, int], place_ids: Sequence[int]) -> Dict[int, int]:
+    """
+    Positions for stops at `place_ids`, in this order, given the `current`
+    positions of an itinerary's stops (place id -> position). The largest set
+    of stops that are already in the right order relative to each other keep
+    their positions, and the others get positions in the gaps between them.
+    Only if a gap is too small are all stops renumbered.
+    """
+    kept = _longest_increasing(
+        [(place_id, current[place_id]) for place_id in place_ids if place_id in current]
+    )
+    positions = {place_id: current[place_id] for place_id in kept}
+    run: List[int] = []  # Stops since the last kept one
+    previous = None
+    for place_id in [*place_ids, None]:
+        if place_id is not None and place_id not in kept:
+            run.append(place_id)
+            continue
+        following = None if place_id is None else positions[place_id]
+        if run:
+            spread = _spread(previous, following, len(run))
+            if spread is None:
+                return {p: i * POSITION_STEP for i, p in enumerate(place_ids)}
+            positions.update(zip(run, spread))
+            run = []
+        previous = following
+    return positions
 
 
 class CRUDItinerary:
-    def get_itinerary(self, db: Session, itinerary_id: int) -> Optional[Itinerary]:
-        return db.query(Itinerary).filter(Itinerary.id == itinerary_id).first()
+    def get_itinerary(
+        self, db: Session, itinerary_id: int, with_stops: bool = False
+    ) -> Optional[Itinerary]:
+        """
+        The itinerary, with its stops loaded in a second query if `with_stops`
+        (instead of lazily, on first access).
+        """
+        query = db.query(Itinerary).filter(Itinerary.id == itinerary_id)
+        if with_stops:
+            query = query.options(selectinload(Itinerary.stops))
+        return query.first()
+
+    def get_itinerary_detail(
+        self, db: Session, itinerary_id: int
+    ) -> Optional[Itinerary]:
+        """The itinerary with its stops and their places: three queries."""
+        return (
+            db.query(Itinerary)
+            .filter(Itinerary.id == itinerary_id)
+            .options(selectinload(Itinerary.stops).selectinload(ItineraryStop.place))
+            .first()
+        )
 
     def get_itineraries_by_user(
-        self, db: Session, user_id: int, skip: int = 0, limit: int = 20
+        self,
+        db: Session,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 20,
+        with_places: bool = False,
     ) -> List[Itinerary]:
+        """
+        The user's itineraries with their stops, and with the stops' places if
+        `with_places`. Each is loaded for all itineraries at once (selectinload),
+        so this takes two or three queries however many itineraries there are.
+        Without `with_places` the stops' place is left None instead of being
+        loaded lazily.
+        """
+        stops = selectinload(Itinerary.stops)
+        if with_places:
+            stops = stops.selectinload(ItineraryStop.place)
+        else:
+            stops = stops.noload(ItineraryStop.place)
         return (
             db.query(Itinerary)
             .filter(Itinerary.user_id == user_id)
+            .options(stops)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
     def create_itinerary(
-        self, db: Session, *, itinerary_in: ItineraryCreate, user_id: int
+        self,
+        db: Session,
+        *,
+        itinerary_in: ItineraryCreate,
+        user_id: int,
+        places: Optional[Dict[int, Place]] = None,
     ) -> Itinerary:
+        """
+        `places` are the already loaded places of the itinerary's stops, keyed
+        by id (e.g. from crud_place.get_places_by_ids); without them they are
+        queried here. Stops at places that do not exist are left out.
+        """
         db_itinerary = Itinerary(
             name=itinerary_in.name,
             description=itinerary_in.description,
+            is_template=itinerary_in.is_template,
             user_id=user_id,
         )
 
-        # Handle places_ids to populate the many-to-many relationship
-        if itinerary_in.place_ids:
-            places = db.query(Place).filter(Place.id.in_(itinerary_in.place_ids)).all()
-            db_itinerary.places_in_itinerary.extend(places)
+        # Handle the stops to populate the many-to-many relationship
+        stops = itinerary_in.stop_list() or []
+        if places is None:
+            places = crud_place.get_places_by_ids(db, [s.place_id for s in stops])
+        stops = [stop for stop in stops if stop.place_id in places]
+        db_itinerary.stops = [
+            ItineraryStop(
+                place=places[stop.place_id],
+                position=i * POSITION_STEP,
+                day=stop.day,
+                notes=stop.notes,
+            )
+            for i, stop in enumerate(stops)
+        ]
 
         db.add(db_itinerary)
+        crud_user.add_contributions(db, user_id, itineraries=1)
         db.commit()
         db.refresh(db_itinerary)
+        self.invalidate_templates(db_itinerary.id, db_itinerary.is_template)
         return db_itinerary
 
     def update_itinerary(
-        self, db: Session, *, db_itinerary: Itinerary, itinerary_in: ItineraryUpdate
+        self,
+        db: Session,
+        *,
+        db_itinerary: Itinerary,
+        itinerary_in: ItineraryUpdate,
+        places: Optional[Dict[int, Place]] = None,
     ) -> Itinerary:
+        """
+        If `itinerary_in` has place_ids or stops, they replace the stops (see
+        set_stops); `places` as for create_itinerary.
+        """
+        was_template = db_itinerary.is_template
         update_data = itinerary_in.model_dump(exclude_unset=True)
+        update_data.pop("place_ids", None)  # Stops are handled separately
+        update_data.pop("stops", None)
 
-        if "place_ids" in update_data:
-            place_ids = update_data.pop("place_ids")  # Handle place_ids separately
-            if (
-                place_ids is not None
-            ):  # Check if it's None, meaning no change, or empty list to clear
-                # Fetch Place objects for the new list of IDs
-                places = db.query(Place).filter(Place.id.in_(place_ids)).all()
-                db_itinerary.places_in_itinerary = (
-                    places  # Replace existing places with the new list
-                )
-            # If place_ids is not in update_data, don't touch the places_in_itinerary relationship
+        stops = itinerary_in.stop_list()
+        # If neither place_ids nor stops is given, don't touch the stops
+        if stops is not None:
+            if places is None:
+                places = crud_place.get_places_by_ids(db, [s.place_id for s in stops])
+            stops = [stop for stop in stops if stop.place_id in places]
+            self.set_stops(db, db_itinerary.id, stops)
 
         for field, value in update_data.items():
             setattr(db_itinerary, field, value)
@@ -63,45 +238,221 @@ class CRUDItinerary:
         db.add(db_itinerary)
         db.commit()
         db.refresh(db_itinerary)
+        self.invalidate_templates(
+            db_itinerary.id, was_template or db_itinerary.is_template
+        )
         return db_itinerary
 
+    def set_stops(
+        self, db: Session, itinerary_id: int, stops: Sequence[ItineraryStopCreate]
+    ) -> None:
+        """
+        Makes `stops` the stops of the itinerary, in this order, by applying
+        only the difference from its current stops: one DELETE of the stops
+        that are gone, one INSERT of the new ones and one executemany UPDATE of
+        those whose position, day or notes changed. Moving one stop elsewhere
+        updates one row (see plan_positions). Does not commit.
+        """
+        table = itinerary_place_association
+        current = {
+            row.place_id: row
+            for row in db.execute(
+                select(
+                    table.c.place_id, table.c.position, table.c.day, table.c.notes
+                ).where(table.c.itinerary_id == itinerary_id)
+            )
+        }
+        positions = plan_positions(
+            {place_id: row.position for place_id, row in current.items()},
+            [stop.place_id for stop in stops],
+        )
+        removed = current.keys() - positions.keys()
+        added, changed = [], []
+        for stop in stops:
+            values = {
+                "itinerary_id": itinerary_id,
+                "place_id": stop.place_id,
+                "position": positions[stop.place_id],
+                "day": stop.day,
+                "notes": stop.notes,
+            }
+            row = current.get(stop.place_id)
+            if row is None:
+                added.append(values)
+            elif (row.position, row.day, row.notes) != (
+                values["position"],
+                stop.day,
+                stop.notes,
+            ):
+                changed.append(values)
+
+        if removed:
+            db.execute(
+                delete(ItineraryStop)
+                .where(
+                    ItineraryStop.itinerary_id == itinerary_id,
+                    ItineraryStop.place_id.in_(removed),
+                )
+                .execution_options(synchronize_session=False)
+            )
+        if added:
+            db.execute(insert(ItineraryStop), added)
+        if changed:
+            db.execute(update(ItineraryStop), changed)
+
     def delete_itinerary(self, db: Session, itinerary_id: int) -> Optional[Itinerary]:
         itinerary = db.query(Itinerary).get(itinerary_id)
         if itinerary:
-            # Many-to-many associations are typically handled by SQLAlchemy if cascade is set,
-            # or they might need to be cleared manually if not using cascade delete-orphan on the relationship items.
-            # For itinerary_place_association, default cascade behavior on the association proxy
-            # usually means deleting the Itinerary will remove its entries from the association table.
+            # The itinerary's stops (its rows of itinerary_place_association)
+            # are deleted with it through the cascade on Itinerary.stops.
+            was_template = itinerary.is_template
             db.delete(itinerary)
+            crud_user.add_contributions(db, itinerary.user_id, itineraries=-1)
             db.commit()
+            self.invalidate_templates(itinerary_id, was_template)
         return itinerary
 
+    def clone_itinerary(
+        self, db: Session, itinerary_id: int, *, user_id: int
+    ) -> Optional[int]:
+        """
+        Copies the itinerary and its stops for `user_id` with one INSERT ...
+        SELECT statement each, whatever the number of stops, if it is the
+        user's own or a template. Returns the id of the copy (not a template),
+        or None if the itinerary does not exist or the user may not copy it.
+        """
+        table = Itinerary.__table__
+        source = select(table.c.name, table.c.description, literal(user_id)).where(
+            table.c.id == itinerary_id,
+            or_(table.c.user_id == user_id, table.c.is_template),
+        )
+        new_id = db.execute(
+            insert(table)
+            .from_select(["name", "description", "user_id"], source)
+            .returning(table.c.id)
+        ).scalar_one_or_none()
+        if new_id is None:
+            return None
+        stops = itinerary_place_association
+        db.execute(
+            insert(stops).from_select(
+                ["itinerary_id", "place_id", "position", "day", "notes"],
+                select(
+                    literal(new_id),
+                    stops.c.place_id,
+                    stops.c.position,
+                    stops.c.day,
+                    stops.c.notes,
+                ).where(stops.c.itinerary_id == itinerary_id),
+            )
+        )
+        crud_user.add_contributions(db, user_id, itineraries=1)
+        db.commit()
+        return new_id
+
+    def get_templates_json(self, db: Session, skip: int = 0, limit: int = 20) -> bytes:
+        """
+        Read-through cache in front of the template listing: template
+        itineraries, newest first, with their stops and places, as JSON.
+        """
+        key = (skip, limit)
+        cached = template_cache.get(key)
+        if cached is not None:
+            return cached
+
+        def load() -> bytes:
+            generation = template_cache.generation()
+            templates = (
+                db.query(Itinerary)
+                .filter(Itinerary.is_template)
+                .options(
+                    selectinload(Itinerary.stops).selectinload(ItineraryStop.place)
+                )
+                .order_by(Itinerary.id.desc())
+                .offset(skip)
+                .limit(limit)
+                .all()
+            )
+            payload = _template_list.dump_json(
+                _template_list.validate_python(templates, from_attributes=True)
+            )
+            with _template_lock:
+                if template_cache.set(key, payload, generation=generation):
+                    _cached_template_ids.update(t.id for t in templates)
+            return payload
+
+        payload, _ = template_reads.do(("templates", key), load)
+        return payload
+
+    def invalidate_templates(
+        self, itinerary_id: int, is_template: bool = False
+    ) -> None:
+        """
+        Clears the template listing cache if the itinerary is a template
+        (`is_template`, e.g. before or after an update) or is on a cached page.
+        Must be called after any committed change to a template or its stops.
+        """
+        with _template_lock:
+            if is_template or itinerary_id in _cached_template_ids:
+                _cached_template_ids.clear()
+                template_cache.clear()
+
     # Helper methods for managing places in an itinerary (optional additions)
     def add_place_to_itinerary(
-        self, db: Session, itinerary_id: int, place_id: int
-    ) -> Optional[Itinerary]:
-        itinerary = self.get_itinerary(db, itinerary_id)
-        place = db.query(Place).get(place_id)
-        if itinerary and place:
-            if place not in itinerary.places_in_itinerary:
-                itinerary.places_in_itinerary.append(place)
-                db.commit()
-                db.refresh(itinerary)
-            return itinerary
-        return None
+        self, db: Session, itinerary_id: int, place_id: int, *, user_id: int
+    ) -> bool:
+        """
+        Appends the place as the last stop of the itinerary with one INSERT ...
+        SELECT ... ON CONFLICT DO NOTHING statement, whatever the itinerary's
+        size. Returns whether a stop was added: nothing is added if the place
+        already is a stop, if the itinerary does not belong to `user_id`, or if
+        the itinerary or the place does not exist (the SELECT finds no row).
+        """
+        table = itinerary_place_association
+        last = (
+            select(func.max(table.c.position))
+            .where(table.c.itinerary_id == Itinerary.id)
+            .scalar_subquery()
+        )
+        new_row = select(
+            Itinerary.id,
+            literal(place_id),
+            func.coalesce(last + POSITION_STEP, 0),
+        ).where(
+            Itinerary.id == itinerary_id,
+            Itinerary.user_id == user_id,
+            exists().where(Place.id == place_id),
+        )
+        statement = (
+            _insert_stop(db)
+            .from_select(["itinerary_id", "place_id", "position"], new_row)
+            .on_conflict_do_nothing(index_elements=["itinerary_id", "place_id"])
+            .returning(table.c.place_id)
+        )
+        added = db.execute(statement).scalar_one_or_none() is not None
+        db.commit()
+        if added:
+            self.invalidate_templates(itinerary_id)
+        return added
 
     def remove_place_from_itinerary(
-        self, db: Session, itinerary_id: int, place_id: int
-    ) -> Optional[Itinerary]:
-        itinerary = self.get_itinerary(db, itinerary_id)
-        place = db.query(Place).get(place_id)
-        if itinerary and place:
-            if place in itinerary.places_in_itinerary:
-                itinerary.places_in_itinerary.remove(place)
-                db.commit()
-                db.refresh(itinerary)
-            return itinerary
-        return None
+        self, db: Session, itinerary_id: int, place_id: int, *, user_id: int
+    ) -> bool:
+        """
+        Removes the place from the itinerary's stops with one DELETE statement,
+        if the itinerary belongs to `user_id`. Returns whether a stop was removed.
+        """
+        table = itinerary_place_association
+        statement = delete(table).where(
+            table.c.itinerary_id == itinerary_id,
+            table.c.place_id == place_id,
+            exists().where(Itinerary.id == itinerary_id, Itinerary.user_id == user_id),
+        )
+        removed = db.execute(statement).rowcount > 0
+        db.commit()
+        if removed:
+            self.invalidate_templates(itinerary_id)
+        return removed
 
 
 itinerary = CRUDItinerary()
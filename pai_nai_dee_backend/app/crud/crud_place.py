@@ -1,30 +1,197 @@
-from sqlalchemy.orm import Session
-from typing import Optional, List
+import math
 
-from ..models.place import Place
-from ..schemas.place import PlaceCreate, PlaceUpdate
+from sqlalchemy import (
+    ColumnElement,
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.orm import Session, Query
+from typing import Any, Dict, Iterable, Optional, List, Sequence, Tuple
+
+from ..core.cache import LRUTTLCache
+from ..core.config import settings
+from ..core.distance_matrix import DistanceMatrix
+from ..core.singleflight import SingleFlight
+from ..models.place import (
+    Place,
+    PlaceRankingPrior,
+    PlaceRatingDelta,
+    RATING_HISTOGRAM_COLUMNS,
+)
+from ..schemas.place import Place as PlaceSchema, PlaceCreate, PlaceUpdate, PlaceSort
+from ..utils.geo import KM_PER_DEGREE_LAT
+from ..utils.ratings import rating_bucket
+
+# Serialized place details keyed by place id, shared by all requests in this process
+place_cache = LRUTTLCache(
+    max_bytes=settings.PLACE_CACHE_MAX_BYTES,
+    ttl_seconds=settings.PLACE_CACHE_TTL_SECONDS,
+)
+# Coalesces identical concurrent reads (e.g. a trending place) into one query
+place_reads = SingleFlight()
+# Pairwise distances between recently used places, e.g. itinerary stops
+place_distances = DistanceMatrix(max_places=settings.PLACE_DISTANCE_CACHE_MAX_PLACES)
+
+
+def ranking_score_expression(rating_sum: Any, rating_count: Any) -> ColumnElement:
+    """
+    SQL expression for the Bayesian average of a place's ratings: its reviews
+    plus RANKING_PRIOR_WEIGHT virtual reviews at the global mean rating, read
+    from place_ranking_prior. A few enthusiastic reviews barely move a place
+    away from the mean; thousands of reviews outweigh the prior.
+    """
+    prior_mean = func.coalesce(
+        select(PlaceRankingPrior.mean_rating)
+        .where(PlaceRankingPrior.id == 1)
+        .scalar_subquery(),
+        settings.RANKING_PRIOR_DEFAULT_MEAN,
+    )
+    weight = settings.RANKING_PRIOR_WEIGHT
+    return (prior_mean * weight + rating_sum) / (rating_count + weight)
 
 
 class CRUDPlace:
-    def get_place(self, db: Session, place_id: int) -> Optional[Place]:
-        return db.query(Place).filter(Place.id == place_id).first()
+    def get_place(
+        self, db: Session, place_id: int, coalesce: bool = True
+    ) -> Optional[Place]:
+        """
+        The place, or None. Concurrent reads of the same place share one query
+        (see `place_reads`); callers loading the place to modify it pass
+        `coalesce=False` to read it with their own query.
+        """
+        query = db.query(Place).filter(Place.id == place_id)
+        if not coalesce:
+            return query.first()
+        return place_reads.query(db, ("place", place_id), query.first)
 
-    def get_places(
+    def get_places_by_ids(
+        self, db: Session, place_ids: Iterable[int]
+    ) -> Dict[int, Place]:
+        """The places with any of `place_ids` (one query), keyed by id."""
+        place_ids = set(place_ids)
+        if not place_ids:
+            return {}
+        places = db.query(Place).filter(Place.id.in_(place_ids)).all()
+        return {place.id: place for place in places}
+
+    def get_place_json(self, db: Session, place_id: int) -> Optional[bytes]:
+        """
+        Read-through cache in front of `get_place`.
+        Returns the place serialized as JSON, or None if it does not exist.
+        """
+        cached = place_cache.get(place_id)
+        if cached is not None:
+            return cached
+
+        def load() -> Optional[bytes]:
+            generation = place_cache.generation()
+            db_place = db.query(Place).filter(Place.id == place_id).first()
+            if db_place is None:
+                return None
+            payload = PlaceSchema.model_validate(db_place).model_dump_json().encode()
+            place_cache.set(place_id, payload, generation=generation)
+            return payload
+
+        # Concurrent misses for the same place share one query and serialization
+        payload, _ = place_reads.do(("place_json", place_id), load)
+        return payload
+
+    def invalidate_cached_place(self, place_id: int) -> None:
+        """
+        Drops a place from the detail cache. Must be called after any committed
+        change to the place row, including rating changes caused by reviews.
+        """
+        place_cache.invalidate(place_id)
+
+    def build_places_query(
         self,
         db: Session,
-        skip: int = 0,
-        limit: int = 100,
         category: Optional[str] = None,
         min_rating: Optional[float] = None,
-    ) -> List[Place]:
+        sort: Optional[PlaceSort] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        radius_km: Optional[float] = None,
+    ) -> Query:
+        """
+        Builds the filtered and ordered (but not paginated) places query.
+        Every ORDER BY matches one of the composite indexes on `places`, with the
+        category filter as the leading equality column (see models/place.py).
+        """
         query = db.query(Place)
         if category:
-            query = query.filter(
-                Place.category.ilike(f"%{category}%")
-            )  # Case-insensitive search
+            # Case-insensitive exact match, served by the lower(category) indexes
+            query = query.filter(func.lower(Place.category) == category.lower())
         if min_rating is not None:  # Ensure min_rating can be 0.0
             query = query.filter(Place.average_rating >= min_rating)
-        return query.offset(skip).limit(limit).all()
+
+        if sort == "distance" or radius_km is not None:
+            if lat is None or lng is None:
+                raise ValueError(
+                    "lat and lng are required to sort or filter by distance"
+                )
+            # Equirectangular approximation, accurate enough for ordering nearby
+            # places (utils.geo.equirectangular_sq_degrees, for the place catalog)
+            lng_scale = math.cos(math.radians(lat))
+            dy = Place.latitude - lat
+            dx = (Place.longitude - lng) * lng_scale
+            squared_distance = dx * dx + dy * dy
+            query = query.filter(
+                Place.latitude.isnot(None), Place.longitude.isnot(None)
+            )
+            if radius_km is not None:
+                lat_delta = radius_km / KM_PER_DEGREE_LAT
+                lng_delta = lat_delta / max(lng_scale, 1e-6)
+                query = query.filter(
+                    Place.latitude.between(lat - lat_delta, lat + lat_delta),
+                    Place.longitude.between(lng - lng_delta, lng + lng_delta),
+                    squared_distance <= lat_delta * lat_delta,
+                )
+
+        if sort == "best":
+            query = query.order_by(Place.ranking_score.desc(), Place.id)
+        elif sort == "rating":
+            query = query.order_by(Place.average_rating.desc(), Place.id)
+        elif sort == "name":
+            query = query.order_by(Place.name, Place.id)
+        elif sort == "newest":
+            query = query.order_by(Place.created_at.desc(), Place.id.desc())
+        elif sort == "distance":
+            query = query.order_by(squared_distance, Place.id)
+        else:
+            query = query.order_by(Place.id)  # Stable pages by primary key
+        return query
+
+    def get_places(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        category: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        sort: Optional[PlaceSort] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        radius_km: Optional[float] = None,
+    ) -> List[Place]:
+        query = self.build_places_query(
+            db,
+            category=category,
+            min_rating=min_rating,
+            sort=sort,
+            lat=lat,
+            lng=lng,
+            radius_km=radius_km,
+        )
+        query = query.offset(skip).limit(limit)
+        key = ("places", skip, limit, category, min_rating, sort, lat, lng, radius_km)
+        return place_reads.query(db, key, query.all)
 
     def create_place(self, db: Session, *, place_in: PlaceCreate) -> Place:
         db_place = Place(
@@ -35,10 +202,12 @@ class CRUDPlace:
             longitude=place_in.longitude,
             address=place_in.address,
             # average_rating is not set on creation, defaults to 0.0 or handled by a trigger/service
+            ranking_score=ranking_score_expression(0.0, 0),  # Just the prior
         )
         db.add(db_place)
         db.commit()
         db.refresh(db_place)
+        self.invalidate_cached_place(db_place.id)
         return db_place
 
     def update_place(
@@ -55,6 +224,9 @@ class CRUDPlace:
         db.add(db_place)
         db.commit()
         db.refresh(db_place)
+        self.invalidate_cached_place(db_place.id)
+        if "latitude" in update_data or "longitude" in update_data:
+            place_distances.invalidate(db_place.id)
         return db_place
 
     def delete_place(self, db: Session, place_id: int) -> Optional[Place]:
@@ -62,24 +234,233 @@ class CRUDPlace:
         if place:
             db.delete(place)
             db.commit()
+            self.invalidate_cached_place(place_id)
+            place_distances.invalidate(place_id)
         return place
 
-    # Future: update_place_rating (e.g. called when a review is added/updated/deleted)
-    # def update_place_average_rating(self, db: Session, place_id: int) -> Place:
-    #     place = self.get_place(db, place_id)
-    #     if not place:
-    #         # Handle error or return None
-    #         return None
-    #     # Calculate average from place.reviews
-    #     if place.reviews:
-    #         new_avg_rating = sum(r.rating for r in place.reviews) / len(place.reviews)
-    #         place.average_rating = new_avg_rating
-    #     else:
-    #         place.average_rating = 0.0
-    #     db.add(place)
-    #     db.commit()
-    #     db.refresh(place)
-    #     return place
+    def apply_rating_change(
+        self,
+        db: Session,
+        place_id: int,
+        old_rating: Optional[float] = None,
+        new_rating: Optional[float] = None,
+    ) -> None:
+        """
+        Moves a review's rating from `old_rating` to `new_rating` in the place's
+        aggregates: pass only `new_rating` for a new review and only `old_rating`
+        for a deleted one.
+        """
+        rating_delta = 0.0
+        count_delta = 0
+        histogram_delta = [0] * len(RATING_HISTOGRAM_COLUMNS)
+        if old_rating is not None:
+            rating_delta -= old_rating
+            count_delta -= 1
+            histogram_delta[rating_bucket(old_rating)] -= 1
+        if new_rating is not None:
+            rating_delta += new_rating
+            count_delta += 1
+            histogram_delta[rating_bucket(new_rating)] += 1
+        if not (rating_delta or count_delta or any(histogram_delta)):
+            return
+        if settings.RATING_WRITE_BEHIND:
+            # Applied by flush_rating_deltas after the review write commits
+            self.stage_rating_deltas(
+                db, {place_id: [rating_delta, count_delta, *histogram_delta]}
+            )
+        else:
+            self.apply_rating_delta(
+                db, place_id, rating_delta, count_delta, histogram_delta
+            )
+
+    def apply_rating_delta(
+        self,
+        db: Session,
+        place_id: int,
+        rating_delta: float,
+        count_delta: int,
+        histogram_delta: Sequence[int] = (),
+    ) -> None:
+        """
+        Adds summed review changes to a place's rating aggregates and histogram
+        in a single UPDATE, so concurrent review writes never lose an update.
+        Runs in the caller's transaction: commit it together with the review
+        change, then call `invalidate_cached_place`.
+        """
+        new_sum = Place.rating_sum + rating_delta
+        new_count = Place.rating_count + count_delta
+        values = {
+            "rating_sum": new_sum,
+            "rating_count": new_count,
+            "average_rating": case((new_count > 0, new_sum / new_count), else_=0.0),
+            "ranking_score": ranking_score_expression(new_sum, new_count),
+        }
+        for column, delta in zip(RATING_HISTOGRAM_COLUMNS, histogram_delta):
+            if delta:
+                values[column] = getattr(Place, column) + delta
+        db.execute(
+            update(Place)
+            .where(Place.id == place_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    def apply_rating_deltas(
+        self, db: Session, deltas: Dict[int, Sequence[float]]
+    ) -> None:
+        """
+        `apply_rating_delta` for many places at once: `deltas` maps place ids to
+        [rating_sum, rating_count, *histogram] deltas, applied by a single UPDATE
+        statement executed for every place (executemany). Places are updated
+        in id order so that concurrent callers lock their rows in one order.
+        """
+        if not deltas:
+            return
+        table = Place.__table__
+        new_sum = table.c.rating_sum + bindparam("d_rating_sum")
+        new_count = table.c.rating_count + bindparam("d_rating_count")
+        values = {
+            "rating_sum": new_sum,
+            "rating_count": new_count,
+            "average_rating": case((new_count > 0, new_sum / new_count), else_=0.0),
+            "ranking_score": ranking_score_expression(new_sum, new_count),
+        }
+        for column in RATING_HISTOGRAM_COLUMNS:
+            values[column] = table.c[column] + bindparam(f"d_{column}")
+        params = []
+        for place_id in sorted(deltas):
+            rating_delta, count_delta, *histogram_delta = deltas[place_id]
+            row = {
+                "place_id": place_id,
+                "d_rating_sum": float(rating_delta),
+                "d_rating_count": int(count_delta),
+            }
+            for column, delta in zip(RATING_HISTOGRAM_COLUMNS, histogram_delta):
+                row[f"d_{column}"] = int(delta)
+            params.append(row)
+        db.connection().execute(
+            update(table).where(table.c.id == bindparam("place_id")).values(values),
+            params,
+        )
+
+    def add_new_ratings(
+        self, db: Session, ratings: Iterable[Tuple[int, float]]
+    ) -> None:
+        """
+        Adds the ratings of new reviews, given as (place_id, rating) pairs, to
+        their places' aggregates with one summed delta per place, e.g. for a
+        bulk import. Like `apply_rating_change`, buffered in write-behind mode.
+        """
+        deltas: Dict[int, List[float]] = {}
+        for place_id, rating in ratings:
+            delta = deltas.setdefault(
+                place_id, [0.0, 0] + [0] * len(RATING_HISTOGRAM_COLUMNS)
+            )
+            delta[0] += rating
+            delta[1] += 1
+            delta[2 + rating_bucket(rating)] += 1
+        if settings.RATING_WRITE_BEHIND:
+            self.stage_rating_deltas(db, deltas)
+        else:
+            self.apply_rating_deltas(db, deltas)
+
+    def stage_rating_deltas(
+        self, db: Session, deltas: Dict[int, Sequence[float]]
+    ) -> None:
+        """
+        Records [rating_sum, rating_count, *histogram] deltas per place in
+        place_rating_deltas, in the caller's transaction, for
+        `flush_rating_deltas` to apply once it commits (write-behind mode).
+        """
+        db.execute(
+            insert(PlaceRatingDelta),
+            [
+                {
+                    "place_id": place_id,
+                    "rating_sum": float(rating_delta),
+                    "rating_count": int(count_delta),
+                    **dict(zip(RATING_HISTOGRAM_COLUMNS, map(int, histogram_delta))),
+                }
+                for place_id, (rating_delta, count_delta, *histogram_delta) in (
+                    deltas.items()
+                )
+            ],
+        )
+
+    def pending_rating_deltas(
+        self, db: Session, first_place_id: int, last_place_id: int
+    ) -> Dict[int, List[float]]:
+        """
+        Sums of the not yet applied deltas of the places in the id range, as
+        [rating_sum, rating_count, *histogram] per place that has any.
+        """
+        table = PlaceRatingDelta.__table__
+        columns = ["rating_sum", "rating_count", *RATING_HISTOGRAM_COLUMNS]
+        rows = db.execute(
+            select(table.c.place_id, *(func.sum(table.c[c]) for c in columns))
+            .where(table.c.place_id.between(first_place_id, last_place_id))
+            .group_by(table.c.place_id)
+        )
+        return {place_id: list(sums) for place_id, *sums in rows}
+
+    def discard_rating_deltas(
+        self, db: Session, place_ids: Optional[Iterable[int]] = None
+    ) -> None:
+        """
+        Deletes the pending deltas of `place_ids` (of every place by default),
+        in the caller's transaction. For repairs that write the places'
+        aggregates from `reviews`, which already count those review changes;
+        call `lock_rating_deltas` first.
+        """
+        statement = delete(PlaceRatingDelta)
+        if place_ids is not None:
+            statement = statement.where(PlaceRatingDelta.place_id.in_(place_ids))
+        db.execute(statement)
+
+    def lock_rating_deltas(self, db: Session) -> None:
+        """
+        On PostgreSQL, locks place_rating_deltas against writes until the end of
+        the transaction, waiting for the review writes and flushes in progress.
+        A repair then sees each review change either in `reviews` and as a
+        pending delta, or in neither, and no flush applies a delta under it.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE place_rating_deltas IN EXCLUSIVE MODE"))
+
+    def flush_rating_deltas(self, db: Session) -> int:
+        """
+        Applies the rating deltas pending in place_rating_deltas (write-behind
+        mode): deletes them and adds their sum per place with one UPDATE per
+        place, in one transaction, so a failed flush leaves them for the next
+        one. Concurrent flushers from several worker processes never apply a
+        delta twice (the second waits on the deleted rows and skips them), and
+        the id order of `apply_rating_deltas` keeps them from deadlocking.
+        Returns the number of places updated.
+        """
+        table = PlaceRatingDelta.__table__
+        columns = ["rating_sum", "rating_count", *RATING_HISTOGRAM_COLUMNS]
+        try:
+            rows = db.execute(
+                delete(table).returning(
+                    table.c.place_id, *(table.c[c] for c in columns)
+                )
+            ).all()
+            deltas: Dict[int, List[float]] = {}
+            for place_id, *delta in rows:
+                total = deltas.get(place_id)
+                if total is None:
+                    deltas[place_id] = delta
+                else:
+                    for i, value in enumerate(delta):
+                        total[i] += value
+            self.apply_rating_deltas(db, deltas)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        for place_id in deltas:
+            self.invalidate_cached_place(place_id)
+        return len(deltas)
 
 
 place = CRUDPlace()
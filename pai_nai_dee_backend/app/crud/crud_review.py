@@ -1,83 +1,672 @@
-from sqlalchemy.orm import Session
-from typing import Optional, List
+from datetime import datetime
+from operator import attrgetter
+from sqlalchemy import (
+    Float,
+    cast,
+    column,
+    delete,
+    func,
+    literal,
+    literal_column,
+    select,
+    table,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Query, Session, joinedload
+from sqlalchemy.orm.util import identity_key
+from typing import Optional, List, Tuple
 
-from ..models.review import Review
-from ..schemas.review import ReviewCreate, ReviewUpdate
+import numpy as np
 
-# from .crud_place import place as crud_place # For updating place average rating
+from ..core.config import settings
+from ..core.minhash import MinHashLSH
+from ..core.pubsub import PubSub
+from ..core.ring_buffer import RingBuffer
+from ..core.singleflight import SingleFlight
+from ..models.place import Place
+from ..models.review import SEARCH_CONFIG, Review
+from ..schemas.review import (
+    RecentReview,
+    Review as ReviewSchema,
+    ReviewBulkItem,
+    ReviewBulkResult,
+    ReviewCreate,
+    ReviewUpdate,
+    ReviewUpsert,
+)
+from ..utils.geo import haversine_km
+from ..utils.text_search import search_tokens, tokenize
+
+from .crud_place import place as crud_place
+from .crud_user import user as crud_user
+
+# Coalesces identical concurrent review reads into one query
+review_reads = SingleFlight()
+
+# Newest reviews across all places, for GET /reviews/recent (per worker process)
+recent_reviews: RingBuffer[RecentReview] = RingBuffer(
+    settings.RECENT_REVIEWS_CAPACITY, key=attrgetter("id")
+)
+
+# Review writes of each place as Server-Sent Events messages, for
+# GET /reviews/place/{place_id}/stream (per worker process)
+review_events: PubSub[str] = PubSub(max_queue=settings.REVIEW_STREAM_QUEUE_SIZE)
+
+
+# Fingerprints of review comments, for near-duplicate detection (per worker
+# process, rebuilt from the database every REVIEW_DUPLICATE_REBUILD_SECONDS)
+review_fingerprints = MinHashLSH(min_chars=settings.REVIEW_DUPLICATE_MIN_CHARS)
+
+
+class DuplicateReviewError(ValueError):
+    """A review comment nearly duplicates another one, in "reject" mode."""
+
+    def __init__(self, duplicate_of_id: int):
+        super().__init__(f"Comment is a near-duplicate of review {duplicate_of_id}")
+        self.duplicate_of_id = duplicate_of_id
+
+
+def _duplicate_of(
+    db: Session, comment: Optional[str], exclude: Optional[int] = None
+) -> Optional[int]:
+    """
+    Id of the review whose comment is most similar to `comment`, if that one
+    is a near-duplicate (REVIEW_DUPLICATE_THRESHOLD). In "reject" mode raises
+    DuplicateReviewError instead; the caller rolls back what it wrote.
+    """
+    if settings.REVIEW_DUPLICATE_ACTION == "off" or not comment:
+        return None
+    matches = review_fingerprints.query(
+        comment, settings.REVIEW_DUPLICATE_THRESHOLD, exclude=exclude
+    )
+    for review_id, _ in matches:
+        # Reviews deleted through other workers stay indexed until the rebuild
+        if db.get(Review, review_id) is None:
+            review_fingerprints.remove(review_id)
+            continue
+        if settings.REVIEW_DUPLICATE_ACTION == "reject":
+            raise DuplicateReviewError(review_id)
+        return review_id
+    return None
+
+
+def _index_comment(review_id: int, comment: Optional[str]) -> None:
+    if settings.REVIEW_DUPLICATE_ACTION == "off":
+        return
+    if comment:
+        review_fingerprints.add(review_id, comment)
+    else:
+        review_fingerprints.remove(review_id)
+
+
+def _review_event(event: str, review: Review) -> Optional[str]:
+    """
+    The SSE message announcing `event` for `review`, or None if nobody is
+    subscribed to its place (then it is not worth serializing).
+    """
+    if not review_events.subscriber_count(review.place_id):
+        return None
+    data = ReviewSchema.model_validate(review).model_dump_json()
+    return f"event: {event}\nid: {review.id}\ndata: {data}\n\n"
+
+
+def _publish_review_event(place_id: int, message: Optional[str]) -> None:
+    if message is not None:
+        review_events.publish(place_id, message)
+
+
+def _insert(db: Session):
+    """INSERT into reviews with the dialect's ON CONFLICT support."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(Review)
+
+
+def _reload_for_feed(db: Session, review_id: int) -> Review:
+    """
+    Reloads a review after committing a write to it, with its place and author
+    in the same query, so building its `_recent_entry` needs no lazy loads.
+    """
+    return (
+        db.query(Review)
+        .options(joinedload(Review.place), joinedload(Review.user))
+        .populate_existing()
+        .filter(Review.id == review_id)
+        .one()
+    )
+
+
+def _recent_entry(review: Review) -> RecentReview:
+    """
+    Feed entry of a review; reads `review.place` and `review.user` (loaded by
+    `_reload_for_feed` after writes).
+    """
+    comment = review.comment
+    if comment is not None and len(comment) > settings.RECENT_REVIEWS_COMMENT_CHARS:
+        comment = comment[: settings.RECENT_REVIEWS_COMMENT_CHARS - 1] + "…"
+    place = review.place
+    return RecentReview(
+        id=review.id,
+        rating=review.rating,
+        comment=comment,
+        user_id=review.user_id,
+        place_id=review.place_id,
+        created_at=review.created_at,
+        updated_at=review.updated_at,
+        duplicate_of_id=review.duplicate_of_id,
+        author_username=review.author_username,
+        place_name=place.name,
+        place_category=place.category,
+        place_latitude=place.latitude,
+        place_longitude=place.longitude,
+    )
 
 
 class CRUDReview:
-    def get_review(self, db: Session, review_id: int) -> Optional[Review]:
-        return db.query(Review).filter(Review.id == review_id).first()
+    def get_review(
+        self, db: Session, review_id: int, coalesce: bool = True
+    ) -> Optional[Review]:
+        """
+        The review, or None. Concurrent reads of the same review share one
+        query (see `review_reads`); callers loading the review to modify it
+        pass `coalesce=False` to read it with their own query.
+        """
+        query = db.query(Review).filter(Review.id == review_id)
+        if not coalesce:
+            return query.first()
+        return review_reads.query(db, ("review", review_id), query.first)
+
+    def _newest_first(
+        self, query: Query, before: Optional[Tuple[datetime, int]]
+    ) -> Query:
+        """
+        Orders by (created_at DESC, id DESC) and, given the sort key of the last
+        row of the previous page, continues right after it. The row-value
+        comparison is an index range scan, so every page costs the same.
+        """
+        if before is not None:
+            query = query.filter(tuple_(Review.created_at, Review.id) < tuple_(*before))
+        return query.order_by(Review.created_at.desc(), Review.id.desc())
 
     def get_reviews_by_place(
-        self, db: Session, place_id: int, skip: int = 0, limit: int = 20
+        self,
+        db: Session,
+        place_id: int,
+        limit: int = 20,
+        before: Optional[Tuple[datetime, int]] = None,
+        skip: int = 0,
     ) -> List[Review]:
-        return (
-            db.query(Review)
-            .filter(Review.place_id == place_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        """
+        Newest reviews of a place first, `limit` at a time (see `_newest_first`).
+        `skip` (OFFSET, deprecated) only applies without `before`.
+        """
+        query = db.query(Review).filter(Review.place_id == place_id)
+        query = self._newest_first(query, before)
+        if before is None and skip:
+            query = query.offset(skip)
+        query = query.limit(limit)
+        return review_reads.query(
+            db, ("reviews_by_place", place_id, limit, before, skip), query.all
         )
 
     def get_reviews_by_user(
-        self, db: Session, user_id: int, skip: int = 0, limit: int = 20
+        self,
+        db: Session,
+        user_id: int,
+        limit: int = 20,
+        before: Optional[Tuple[datetime, int]] = None,
+        skip: int = 0,
     ) -> List[Review]:
-        return (
+        """
+        Newest reviews of a user first, `limit` at a time (see `_newest_first`).
+        `skip` (OFFSET, deprecated) only applies without `before`.
+        """
+        query = db.query(Review).filter(Review.user_id == user_id)
+        query = self._newest_first(query, before)
+        if before is None and skip:
+            query = query.offset(skip)
+        query = query.limit(limit)
+        return review_reads.query(
+            db, ("reviews_by_user", user_id, limit, before, skip), query.all
+        )
+
+    def get_recent_reviews(
+        self,
+        limit: int = 20,
+        category: Optional[str] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        radius_km: Optional[float] = None,
+    ) -> List[RecentReview]:
+        """
+        Newest reviews across all places from the in-process feed, optionally
+        only of places in `category` (case-insensitive) or within `radius_km` of
+        lat/lng. Never touches the database.
+        """
+
+        def in_category(entry: RecentReview) -> bool:
+            return (entry.place_category or "").lower() == category.lower()
+
+        predicate = in_category if category is not None else None
+        if radius_km is None:
+            return recent_reviews.newest(limit, predicate)
+
+        candidates = [
+            r
+            for r in recent_reviews.newest(None, predicate)
+            if r.place_latitude is not None and r.place_longitude is not None
+        ]
+        if not candidates:
+            return []
+        distances = haversine_km(
+            lat,
+            lng,
+            [r.place_latitude for r in candidates],
+            [r.place_longitude for r in candidates],
+        )
+        nearby = np.flatnonzero(distances <= radius_km)[:limit]
+        return [candidates[i] for i in nearby]
+
+    def search_reviews(
+        self,
+        db: Session,
+        *,
+        query: str,
+        place_id: Optional[int] = None,
+        limit: int = 20,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> List[Tuple[Review, float]]:
+        """
+        Reviews whose comment contains every word of `query` (for Thai, every
+        three-character run of it), optionally of one place, as (review, rank)
+        pairs ordered by (rank DESC, id DESC). Pages continue `after` the
+        (rank, id) of the previous page's last result.
+
+        PostgreSQL matches with the GIN index on the comments' tsvector and
+        ranks with ts_rank_cd; SQLite uses the reviews_fts FTS5 table and bm25.
+        Paging on SQLite is approximate: bm25 depends on statistics of the
+        whole index, so the ranks shift when reviews are written between
+        pages, and a page can then repeat or skip results. ts_rank_cd only
+        depends on the review itself.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        if db.get_bind().dialect.name == "postgresql":
+            vector = func.to_tsvector(SEARCH_CONFIG, Review.search_tokens)
+            tsquery = func.plainto_tsquery(SEARCH_CONFIG, " ".join(tokens))
+            # As float8, so that the rank round-trips through the cursor exactly
+            rank = cast(func.ts_rank_cd(vector, tsquery), Float)
+            statement = select(Review, rank).where(vector.bool_op("@@")(tsquery))
+        else:
+            fts = table("reviews_fts", column("rowid"))
+            match = " ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+            rank = -func.bm25(literal_column("reviews_fts"))
+            statement = (
+                select(Review, rank)
+                .join(fts, fts.c.rowid == Review.id)
+                .where(literal_column("reviews_fts").op("MATCH")(match))
+            )
+        if place_id is not None:
+            statement = statement.where(Review.place_id == place_id)
+        if after is not None:
+            statement = statement.where(tuple_(rank, Review.id) < tuple_(*after))
+        statement = statement.order_by(rank.desc(), Review.id.desc()).limit(limit)
+        return [(review, rank) for review, rank in db.execute(statement)]
+
+    def reindex_search_tokens(self, db: Session, batch_size: int = 1000) -> int:
+        """
+        Fills in the search tokens of reviews that have a comment but none,
+        e.g. written before full-text search existed, in batches. Returns the
+        number of reviews updated.
+        """
+        updated = 0
+        while True:
+            rows = db.execute(
+                select(Review.id, Review.comment)
+                .where(Review.search_tokens.is_(None), Review.comment.is_not(None))
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return updated
+            db.execute(
+                update(Review),
+                [{"id": id, "search_tokens": search_tokens(c)} for id, c in rows],
+            )
+            db.commit()
+            updated += len(rows)
+
+    def load_recent_reviews(self, db: Session) -> int:
+        """
+        (Re)fills the recent reviews feed with the newest reviews in the
+        database, which also brings in reviews written through other worker
+        processes. Returns the number of reviews loaded.
+        """
+        reviews = (
             db.query(Review)
-            .filter(Review.user_id == user_id)
-            .offset(skip)
-            .limit(limit)
+            .options(joinedload(Review.place), joinedload(Review.user))
+            .order_by(Review.id.desc())
+            .limit(recent_reviews.capacity)
             .all()
         )
+        recent_reviews.reload(_recent_entry(r) for r in reversed(reviews))
+        return len(reviews)
+
+    def load_review_fingerprints(self, db: Session, batch_size: int = 10_000) -> int:
+        """
+        Rebuilds the near-duplicate index from every review comment in the
+        database, which also brings in reviews written through other worker
+        processes. Returns the number of comments indexed.
+        """
+        comments = db.execute(
+            select(Review.id, Review.comment)
+            .where(Review.comment.is_not(None))
+            .execution_options(yield_per=batch_size)
+        )
+        return review_fingerprints.rebuild(comments)
 
     def create_review(
         self, db: Session, *, review_in: ReviewCreate, user_id: int
     ) -> Review:
+        """
+        Creates a review. Raises DuplicateReviewError if its comment nearly
+        duplicates an existing one and REVIEW_DUPLICATE_ACTION is "reject".
+        """
         db_review = Review(
             rating=review_in.rating,
             comment=review_in.comment,
             place_id=review_in.place_id,
             user_id=user_id,  # Set by the system from authenticated user
+            duplicate_of_id=_duplicate_of(db, review_in.comment),
         )
         db.add(db_review)
+        db.flush()
+        review_id = db_review.id
+        crud_place.apply_rating_change(
+            db, db_review.place_id, new_rating=db_review.rating
+        )
+        crud_user.add_contributions(db, user_id, reviews=1, rating_sum=db_review.rating)
         db.commit()
-        db.refresh(db_review)
-
-        # After creating a review, you might want to update the place's average rating.
-        # This could be done here, or via a database trigger, or a background task/event.
-        # For now, let's assume a service layer or a subsequent call handles this.
-        # Example: crud_place.update_place_average_rating(db, place_id=db_review.place_id)
+        db_review = _reload_for_feed(db, review_id)
+        crud_place.invalidate_cached_place(db_review.place_id)
+        recent_reviews.append(_recent_entry(db_review))
+        _index_comment(db_review.id, db_review.comment)
+        _publish_review_event(
+            db_review.place_id, _review_event("review_created", db_review)
+        )
 
         return db_review
 
+    def create_reviews_bulk(
+        self, db: Session, *, source: str, reviews_in: List[ReviewBulkItem]
+    ) -> List[ReviewBulkResult]:
+        """
+        Creates many reviews imported from a partner platform (`source`) in one
+        transaction, each by the user standing for its author there (see
+        `crud_user.get_or_create_external_users`), and reports the outcome of
+        each item: `place_not_found`, `conflict` (the author already reviewed
+        the place, it appears earlier in `reviews_in`, or the author's user
+        name is taken) or `created`. Importing the same reviews again creates
+        nothing.
+
+        The places are checked with one query, the authors are resolved with
+        one INSERT and one SELECT, the reviews are inserted with multi-row
+        INSERT ... ON CONFLICT DO NOTHING statements, and the rating aggregates
+        and contribution counters get one delta per place and per author.
+        Bulk-created reviews are not announced to review streams, reach the
+        recent reviews feed with its next reload, and are not checked for
+        near-duplicate comments (but are indexed, so later reviews are checked
+        against them).
+        """
+        place_ids = {review_in.place_id for review_in in reviews_in}
+        existing = set(db.scalars(select(Place.id).where(Place.id.in_(place_ids))))
+        authors = crud_user.get_or_create_external_users(
+            db,
+            source=source,
+            external_ids=(
+                review_in.author_id
+                for review_in in reviews_in
+                if review_in.place_id in existing
+            ),
+        )
+
+        results = [
+            ReviewBulkResult(index=i, status="conflict") for i in range(len(reviews_in))
+        ]
+        to_insert = {}  # (user_id, place_id) -> index of its first item
+        for i, review_in in enumerate(reviews_in):
+            if review_in.place_id not in existing:
+                results[i].status = "place_not_found"
+            elif review_in.author_id in authors:
+                to_insert.setdefault(
+                    (authors[review_in.author_id], review_in.place_id), i
+                )
+
+        rows = [
+            {
+                "rating": reviews_in[i].rating,
+                "comment": reviews_in[i].comment,
+                "search_tokens": search_tokens(reviews_in[i].comment),
+                "place_id": place_id,
+                "user_id": user_id,
+            }
+            for (user_id, place_id), i in to_insert.items()
+        ]
+        created = {}  # index of the item -> review id
+        batch_size = settings.REVIEW_BULK_INSERT_BATCH_SIZE
+        for start in range(0, len(rows), batch_size):
+            statement = (
+                _insert(db)
+                .values(rows[start : start + batch_size])
+                .on_conflict_do_nothing(index_elements=["user_id", "place_id"])
+                .returning(Review.id, Review.user_id, Review.place_id)
+            )
+            created.update(
+                (to_insert[user_id, place_id], review_id)
+                for review_id, user_id, place_id in db.execute(statement)
+            )
+
+        crud_place.add_new_ratings(
+            db,
+            ((reviews_in[i].place_id, reviews_in[i].rating) for i in created),
+        )
+        contributions = {}  # user_id -> (reviews, rating_sum)
+        for i in created:
+            user_id = authors[reviews_in[i].author_id]
+            reviews, rating_sum = contributions.get(user_id, (0, 0.0))
+            contributions[user_id] = (reviews + 1, rating_sum + reviews_in[i].rating)
+        crud_user.add_many_contributions(db, contributions)
+        db.commit()
+        for i, review_id in created.items():
+            results[i].status, results[i].review_id = "created", review_id
+            crud_place.invalidate_cached_place(reviews_in[i].place_id)
+            _index_comment(review_id, reviews_in[i].comment)
+        return results
+
+    def _insert_if_absent(
+        self, db: Session, *, place_id: int, review_in: ReviewUpsert, user_id: int
+    ) -> Optional[int]:
+        """
+        Inserts the review with one INSERT ... SELECT ... ON CONFLICT DO NOTHING
+        statement and returns its id. Returns None without inserting if the user
+        already reviewed the place (the unique constraint arbitrates concurrent
+        inserts, a loser waits for the winner to commit) or the place does not
+        exist (the SELECT finds no place row).
+        """
+        new_row = select(
+            literal(review_in.rating),
+            literal(review_in.comment),
+            literal(search_tokens(review_in.comment)),
+            Place.id,
+            literal(user_id),
+        ).where(Place.id == place_id)
+        columns = ["rating", "comment", "search_tokens", "place_id", "user_id"]
+        statement = (
+            _insert(db)
+            .from_select(columns, new_row)
+            .on_conflict_do_nothing(index_elements=["user_id", "place_id"])
+            .returning(Review.id)
+        )
+        return db.execute(statement).scalar_one_or_none()
+
+    def upsert_review(
+        self, db: Session, *, place_id: int, review_in: ReviewUpsert, user_id: int
+    ) -> Optional[Tuple[Review, bool]]:
+        """
+        Creates the user's review of a place, or replaces the rating and comment
+        of the one they already wrote. Returns the review and whether it was
+        created, or None if the place does not exist.
+
+        An existing review is locked (SELECT ... FOR UPDATE) before its old
+        rating is read, so the delta applied to the place's rating aggregates
+        is exact even when the same review is submitted twice at once.
+        Raises DuplicateReviewError like `create_review`; the caller then rolls
+        back.
+        """
+        while True:
+            review_id = self._insert_if_absent(
+                db, place_id=place_id, review_in=review_in, user_id=user_id
+            )
+            if review_id is not None:
+                duplicate_of_id = _duplicate_of(db, review_in.comment)
+                if duplicate_of_id is not None:
+                    db.execute(
+                        update(Review)
+                        .where(Review.id == review_id)
+                        .values(duplicate_of_id=duplicate_of_id)
+                    )
+                crud_place.apply_rating_change(
+                    db, place_id, new_rating=review_in.rating
+                )
+                crud_user.add_contributions(
+                    db, user_id, reviews=1, rating_sum=review_in.rating
+                )
+                db.commit()
+                crud_place.invalidate_cached_place(place_id)
+                db_review = _reload_for_feed(db, review_id)
+                recent_reviews.append(_recent_entry(db_review))
+                _index_comment(review_id, db_review.comment)
+                _publish_review_event(
+                    place_id, _review_event("review_created", db_review)
+                )
+                return db_review, True
+
+            db_review = (
+                db.query(Review)
+                .filter(Review.user_id == user_id, Review.place_id == place_id)
+                .populate_existing()
+                .with_for_update()
+                .one_or_none()
+            )
+            if db_review is not None:
+                break
+            if db.get(Place, place_id) is None:
+                return None
+            # Deleted since the INSERT saw it, try inserting again
+
+        old_rating = db_review.rating
+        if review_in.comment != db_review.comment:
+            db_review.duplicate_of_id = _duplicate_of(
+                db, review_in.comment, exclude=db_review.id
+            )
+        db_review.rating = review_in.rating
+        db_review.comment = review_in.comment
+        if db_review.rating != old_rating:
+            crud_place.apply_rating_change(
+                db, place_id, old_rating=old_rating, new_rating=db_review.rating
+            )
+            crud_user.add_contributions(
+                db, user_id, rating_sum=db_review.rating - old_rating
+            )
+        review_id = db_review.id
+        db.commit()
+        db_review = _reload_for_feed(db, review_id)
+        crud_place.invalidate_cached_place(place_id)
+        recent_reviews.replace(_recent_entry(db_review))
+        _index_comment(db_review.id, db_review.comment)
+        _publish_review_event(place_id, _review_event("review_updated", db_review))
+        return db_review, False
+
     def update_review(
         self, db: Session, *, db_review: Review, review_in: ReviewUpdate
-    ) -> Review:
+    ) -> Optional[Review]:
+        """
+        Updates a review's rating and/or comment. A changed comment is checked
+        for near-duplicates like in `create_review`.
+
+        The review row is locked and re-read first, so that concurrent edits
+        of the review move the place's aggregates from the rating each of them
+        replaces. Returns None if the review was deleted in the meantime.
+        """
         update_data = review_in.model_dump(exclude_unset=True)
+        db_review = (
+            db.query(Review)
+            .filter(Review.id == db_review.id)
+            .populate_existing()
+            .with_for_update()
+            .one_or_none()
+        )
+        if db_review is None:
+            return None
+        old_rating = db_review.rating
+        if "comment" in update_data and update_data["comment"] != db_review.comment:
+            db_review.duplicate_of_id = _duplicate_of(
+                db, update_data["comment"], exclude=db_review.id
+            )
 
         for field, value in update_data.items():
             setattr(db_review, field, value)
 
         db.add(db_review)
+        if db_review.rating != old_rating:
+            crud_place.apply_rating_change(
+                db,
+                db_review.place_id,
+                old_rating=old_rating,
+                new_rating=db_review.rating,
+            )
+            crud_user.add_contributions(
+                db, db_review.user_id, rating_sum=db_review.rating - old_rating
+            )
+        review_id = db_review.id
         db.commit()
-        db.refresh(db_review)
-
-        # Similar to create, updating a review might require recalculating the place's average rating.
-        # Example: crud_place.update_place_average_rating(db, place_id=db_review.place_id)
+        db_review = _reload_for_feed(db, review_id)
+        crud_place.invalidate_cached_place(db_review.place_id)
+        recent_reviews.replace(_recent_entry(db_review))
+        _index_comment(db_review.id, db_review.comment)
+        _publish_review_event(
+            db_review.place_id, _review_event("review_updated", db_review)
+        )
 
         return db_review
 
     def delete_review(self, db: Session, review_id: int) -> Optional[Review]:
-        review = db.query(Review).get(review_id)
-        if review:
-            # place_id = review.place_id # Store before deleting for rating update
-            db.delete(review)
-            db.commit()
-            # After deleting a review, update the place's average rating.
-            # Example: crud_place.update_place_average_rating(db, place_id=place_id)
+        """
+        Deletes a review with one DELETE ... RETURNING and returns it (detached),
+        or None if it does not exist. The aggregates of its place and author are
+        only updated by the request whose DELETE removed the row, so concurrent
+        deletes of the same review subtract its rating once.
+        """
+        reviews = Review.__table__
+        row = db.execute(
+            delete(reviews).where(reviews.c.id == review_id).returning(*reviews.c)
+        ).first()
+        if row is None:
+            return None
+        stale = db.identity_map.get(identity_key(Review, review_id))
+        if stale is not None:
+            db.expunge(stale)
+        review = Review(**row._mapping)
+        crud_place.apply_rating_change(db, review.place_id, old_rating=review.rating)
+        crud_user.add_contributions(
+            db, review.user_id, reviews=-1, rating_sum=-review.rating
+        )
+        db.commit()
+        crud_place.invalidate_cached_place(review.place_id)
+        recent_reviews.remove(review.id)
+        _index_comment(review.id, None)
+        _publish_review_event(review.place_id, _review_event("review_deleted", review))
         return review
 
 
@@ -1,5 +1,9 @@
+import secrets
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Dict, Iterable, Optional, List, Tuple
 
 from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate
@@ -16,6 +20,102 @@ class CRUDUser:
     def get_user_by_email(self, db: Session, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
 
+    def add_contributions(
+        self,
+        db: Session,
+        user_id: int,
+        reviews: int = 0,
+        rating_sum: float = 0.0,
+        itineraries: int = 0,
+    ) -> None:
+        """
+        Adds to a user's contribution counters in a single UPDATE, so concurrent
+        writes never lose an update. Runs in the caller's transaction: commit it
+        together with the review or itinerary change.
+        """
+        if not (reviews or rating_sum or itineraries):
+            return
+        db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                review_count=User.review_count + reviews,
+                review_rating_sum=User.review_rating_sum + rating_sum,
+                itinerary_count=User.itinerary_count + itineraries,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def add_many_contributions(
+        self, db: Session, contributions: Dict[int, Tuple[int, float]]
+    ) -> None:
+        """
+        `add_contributions` of reviews for many users at once: `contributions`
+        maps user ids to (reviews, rating_sum) deltas, applied by a single UPDATE
+        statement executed for every user (executemany), in user id order.
+        """
+        if not contributions:
+            return
+        table = User.__table__
+        db.connection().execute(
+            update(table)
+            .where(table.c.id == bindparam("user_id"))
+            .values(
+                review_count=table.c.review_count + bindparam("d_reviews"),
+                review_rating_sum=table.c.review_rating_sum + bindparam("d_rating_sum"),
+            ),
+            [
+                {
+                    "user_id": user_id,
+                    "d_reviews": reviews,
+                    "d_rating_sum": float(rating_sum),
+                }
+                for user_id, (reviews, rating_sum) in sorted(contributions.items())
+            ],
+        )
+
+    def get_or_create_external_users(
+        self, db: Session, *, source: str, external_ids: Iterable[str]
+    ) -> Dict[str, int]:
+        """
+        Ids of the users standing for authors from a partner platform, keyed by
+        their id on `source`, creating the missing ones (named
+        "<source>:<external id>", without a usable password) with one
+        INSERT ... ON CONFLICT DO NOTHING. Runs in the caller's transaction.
+        An author whose name is already taken by another user is left out.
+        """
+        external_ids = set(external_ids)
+        if not external_ids:
+            return {}
+        # Nobody knows the password, and one hash serves all the new users
+        hashed_password = get_password_hash(secrets.token_urlsafe(32))
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        db.execute(
+            dialect.insert(User)
+            .values(
+                [
+                    {
+                        "username": f"{source}:{external_id}",
+                        "hashed_password": hashed_password,
+                        "source": source,
+                        "external_id": external_id,
+                    }
+                    for external_id in sorted(external_ids)
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+        return dict(
+            db.execute(
+                select(User.external_id, User.id).where(
+                    User.source == source, User.external_id.in_(external_ids)
+                )
+            ).all()
+        )
+
+    def is_superuser(self, user: User) -> bool:
+        return user.is_superuser
+
     def get_users(self, db: Session, skip: int = 0, limit: int = 100) -> List[User]:
         return db.query(User).offset(skip).limit(limit).all()
 
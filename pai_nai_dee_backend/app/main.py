@@ -1,20 +1,89 @@
 from fastapi import FastAPI, Request, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import (
     RequestValidationError,
     HTTPException as StarletteHTTPException,
 )
 import logging  # Moved import to the top
+from contextlib import asynccontextmanager
 
 from .core.logging import setup_logging  # Import logging setup
 
 # Call logging setup at the application's entry point
 setup_logging()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Starts and stops the background jobs of this worker process."""
+    from .core.config import settings
+    from .core.periodic import PeriodicTask
+    from .crud.crud_place import place as crud_place
+    from .crud.crud_review import review as crud_review
+    from .db.database import SessionLocal
+    from .services.place_service import PlaceService
+
+    def flush_rating_deltas():
+        with SessionLocal() as db:
+            crud_place.flush_rating_deltas(db)
+
+    def refresh_ranking_prior():
+        with SessionLocal() as db:
+            PlaceService(db).refresh_ranking_prior()
+
+    def load_recent_reviews():
+        with SessionLocal() as db:
+            crud_review.load_recent_reviews(db)
+
+    def load_review_fingerprints():
+        with SessionLocal() as db:
+            crud_review.load_review_fingerprints(db)
+
+    tasks = [
+        PeriodicTask(
+            refresh_ranking_prior,
+            settings.RANKING_PRIOR_REFRESH_SECONDS,
+            name="ranking-prior-refresh",
+            run_at_start=True,
+        ),
+        PeriodicTask(
+            load_recent_reviews,
+            settings.RECENT_REVIEWS_RELOAD_SECONDS,
+            name="recent-reviews-reload",
+            run_at_start=True,
+        ),
+    ]
+    if settings.REVIEW_DUPLICATE_ACTION != "off":
+        tasks.append(
+            PeriodicTask(
+                load_review_fingerprints,
+                settings.REVIEW_DUPLICATE_REBUILD_SECONDS,
+                name="review-fingerprints-rebuild",
+                run_at_start=True,
+            )
+        )
+    if settings.RATING_WRITE_BEHIND:
+        tasks.append(
+            PeriodicTask(
+                flush_rating_deltas,
+                settings.RATING_FLUSH_INTERVAL_MS / 1000,
+                name="rating-write-behind",
+                run_on_stop=True,
+            )
+        )
+    for task in tasks:
+        task.start()
+    yield
+    for task in tasks:
+        task.stop()
+
+
 app = FastAPI(
     title="Pai Nai Dee API",
     description="API for the Pai Nai Dee travel planning application.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 
@@ -59,7 +128,10 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     # Provide a user-friendly message and the detailed errors
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={"detail": "Validation Error", "errors": exc.errors()},
+        # jsonable_encoder, as errors of custom validators carry the exception
+        content=jsonable_encoder(
+            {"detail": "Validation Error", "errors": exc.errors()}
+        ),
     )
 
 
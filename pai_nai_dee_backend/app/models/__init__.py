@@ -5,9 +5,23 @@
 # or when Alembic generates migrations.
 
 from .user import User
-from .place import Place, itinerary_place_association
+from .place import (
+    Place,
+    PlaceRankingPrior,
+    PlaceRatingDelta,
+    itinerary_place_association,
+)
 from .review import Review
-from .itinerary import Itinerary
+from .itinerary import Itinerary, ItineraryStop
 
 # You can also define __all__ if you want to control what 'from app.models import *' imports
-__all__ = ["User", "Place", "Review", "Itinerary", "itinerary_place_association"]
+__all__ = [
+    "User",
+    "Place",
+    "PlaceRankingPrior",
+    "PlaceRatingDelta",
+    "Review",
+    "Itinerary",
+    "ItineraryStop",
+    "itinerary_place_association",
+]
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func
 
 from ..db.database import Base
 from .place import itinerary_place_association  # Import the association table
@@ -12,6 +12,8 @@ class Itinerary(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
+    # Listed publicly (GET /itineraries/templates), and anyone can clone it
+    is_template = Column(Boolean, default=False, server_default=false(), nullable=False)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -20,17 +22,46 @@ class Itinerary(Base):
         Integer, ForeignKey("users.id"), nullable=False
     )  # User who owns the itinerary
 
+    __table_args__ = (
+        # Template listing, newest first; only templates are indexed
+        Index(
+            "ix_itineraries_templates",
+            id.desc(),
+            postgresql_where=is_template,
+            sqlite_where=is_template,
+        ),
+    )
+
     # Relationships
     user = relationship("User", back_populates="itineraries")
 
-    # Many-to-many relationship with Place
+    # Stops in order; they are written through this relationship (or directly
+    # to the association table), places_in_itinerary only reads them
+    stops = relationship(
+        "ItineraryStop",
+        order_by="ItineraryStop.position",
+        cascade="all, delete-orphan",
+        overlaps="itineraries_featuring,places_in_itinerary",
+    )
+
+    # Many-to-many relationship with Place, in stop order
     places_in_itinerary = relationship(
         "Place",
         secondary=itinerary_place_association,
+        order_by=itinerary_place_association.c.position,
         back_populates="itineraries_featuring",  # This back_populates needs to be defined in Place model
+        viewonly=True,
     )
 
 
+class ItineraryStop(Base):
+    """A place in an itinerary, at a position, optionally on a day and with notes."""
+
+    __table__ = itinerary_place_association
+
+    place = relationship("Place", overlaps="itineraries_featuring,places_in_itinerary")
+
+
 # Now, I need to go back and add the `itineraries_featuring` back_populates in `place.py`
 # The `Place` model currently has:
 # itineraries_featuring = relationship("Itinerary", secondary=itinerary_place_association, back_populates="places_in_itinerary")
@@ -1,16 +1,42 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Float,
+    ForeignKey,
+    Table,
+    DateTime,
+    Index,
+)
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from typing import Dict
 
 # from sqlalchemy.dialects.postgresql import JSONB # If needed for complex types
 
 from ..db.database import Base
+from ..utils.ratings import RATING_BUCKETS
+
+# Histogram columns on `places`, one per half-star bucket of RATING_BUCKETS:
+# rating_hist_0_5, rating_hist_1_0, ..., rating_hist_5_0
+RATING_HISTOGRAM_COLUMNS = [
+    "rating_hist_" + bucket.replace(".", "_") for bucket in RATING_BUCKETS
+]
 
-# Association table for many-to-many relationship between itineraries and places
+# Association table for many-to-many relationship between itineraries and places:
+# the stops of an itinerary (mapped as models.itinerary.ItineraryStop), ordered
+# by position. Positions are sparse, so that a stop can move between two others
+# without renumbering the rest
 itinerary_place_association = Table(
     "itinerary_place_association",
     Base.metadata,
     Column("itinerary_id", Integer, ForeignKey("itineraries.id"), primary_key=True),
     Column("place_id", Integer, ForeignKey("places.id"), primary_key=True),
+    Column("position", Integer, nullable=False, server_default="0"),
+    Column("day", Integer, nullable=True),  # Day of the trip, from 1
+    Column("notes", String, nullable=True),
+    # Stops in order, and the last position when a stop is appended
+    Index("ix_itinerary_stops_position", "itinerary_id", "position"),
 )
 
 
@@ -18,21 +44,71 @@ class Place(Base):
     __tablename__ = "places"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True, nullable=False)
+    name = Column(String, nullable=False)  # Indexed by ix_places_name below
     description = Column(String, nullable=True)
     category = Column(
-        String, index=True, nullable=True
-    )  # e.g., "Temple", "Market", "Restaurant"
+        String, nullable=True
+    )  # e.g., "Temple", "Market", "Restaurant". Matched case-insensitively.
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
     address = Column(String, nullable=True)
 
-    # Average rating - could be calculated or stored denormalized
-    # For now, let's assume it's updated by a service layer when new reviews come in.
+    # Denormalized rating aggregates, kept in step with the reviews table by the
+    # review CRUD writes (see crud_place.apply_rating_delta).
+    # average_rating == rating_sum / rating_count, or 0.0 without reviews.
+    rating_sum = Column(Float, default=0.0, server_default="0", nullable=False)
+    rating_count = Column(Integer, default=0, server_default="0", nullable=False)
     average_rating = Column(Float, default=0.0, nullable=False)
+    # Number of reviews per half-star rating, maintained the same way
+    rating_hist_0_5 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_hist_1_0 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_hist_1_5 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_hist_2_0 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_hist_2_5 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_hist_3_0 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_hist_3_5 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_hist_4_0 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_hist_4_5 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_hist_5_0 = Column(Integer, default=0, server_default="0", nullable=False)
     # To store things like opening hours, price range etc. a JSONB field could be useful.
     # details = Column(JSONB, nullable=True)
 
+    # Bayesian average rating, what sort=best orders by. Kept in step with the
+    # aggregates above (see crud_place.ranking_score_expression).
+    ranking_score = Column(Float, default=0.0, server_default="0", nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # One index per `sort` option of GET /places, with and without a category filter,
+    # each ending in `id` so sorted pages are read straight from the index.
+    __table_args__ = (
+        Index("ix_places_rating", average_rating.desc(), id),
+        Index(
+            "ix_places_category_rating",
+            func.lower(category),
+            average_rating.desc(),
+            id,
+        ),
+        Index("ix_places_best", ranking_score.desc(), id),
+        Index(
+            "ix_places_category_best",
+            func.lower(category),
+            ranking_score.desc(),
+            id,
+        ),
+        Index("ix_places_name", name, id),
+        Index("ix_places_category_name", func.lower(category), name, id),
+        Index("ix_places_newest", created_at.desc(), id.desc()),
+        Index(
+            "ix_places_category_newest",
+            func.lower(category),
+            created_at.desc(),
+            id.desc(),
+        ),
+        # Bounding-box prefilter for sort=distance / radius searches
+        Index("ix_places_lat_lng", latitude, longitude),
+    )
+
     # Relationships
     reviews = relationship(
         "Review", back_populates="place", cascade="all, delete-orphan"
@@ -43,12 +119,67 @@ class Place(Base):
         "Itinerary",
         secondary=itinerary_place_association,
         back_populates="places_in_itinerary",
+        overlaps="stops,place",
     )
 
+    @property
+    def rating_histogram(self) -> Dict[str, int]:
+        """Review counts keyed by half-star bucket, "0.5" .. "5.0"."""
+        return {
+            bucket: getattr(self, column) or 0
+            for bucket, column in zip(RATING_BUCKETS, RATING_HISTOGRAM_COLUMNS)
+        }
+
     # If we implement a "bookmarks" feature:
     # bookmarked_by_users = relationship("User", secondary="user_bookmarks_place", back_populates="bookmarked_places")
 
 
+class PlaceRankingPrior(Base):
+    """
+    Single row (id 1) holding the global mean rating, the prior of every
+    Place.ranking_score. Refreshed periodically by PlaceService.
+    """
+
+    __tablename__ = "place_ranking_prior"
+
+    id = Column(Integer, primary_key=True)
+    mean_rating = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class PlaceRatingDelta(Base):
+    """
+    Rating change of a committed review write not yet applied to its place's
+    aggregates, in write-behind mode (RATING_WRITE_BEHIND). Inserted in the
+    review's transaction, so review writes never wait on the place row, and
+    deleted by the transaction that applies it: crud_place.flush_rating_deltas,
+    or a repair that rewrites the place's aggregates from `reviews`.
+    """
+
+    __tablename__ = "place_rating_deltas"
+
+    id = Column(Integer, primary_key=True)
+    place_id = Column(
+        Integer, ForeignKey("places.id", ondelete="CASCADE"), nullable=False
+    )
+    rating_sum = Column(Float, nullable=False)
+    rating_count = Column(Integer, nullable=False)
+    # Changes of the RATING_HISTOGRAM_COLUMNS of the place
+    rating_hist_0_5 = Column(Integer, default=0, nullable=False)
+    rating_hist_1_0 = Column(Integer, default=0, nullable=False)
+    rating_hist_1_5 = Column(Integer, default=0, nullable=False)
+    rating_hist_2_0 = Column(Integer, default=0, nullable=False)
+    rating_hist_2_5 = Column(Integer, default=0, nullable=False)
+    rating_hist_3_0 = Column(Integer, default=0, nullable=False)
+    rating_hist_3_5 = Column(Integer, default=0, nullable=False)
+    rating_hist_4_0 = Column(Integer, default=0, nullable=False)
+    rating_hist_4_5 = Column(Integer, default=0, nullable=False)
+    rating_hist_5_0 = Column(Integer, default=0, nullable=False)
+
+    # Pending deltas of a range of places, for a repair batch
+    __table_args__ = (Index("ix_place_rating_deltas_place", place_id, id),)
+
+
 # If we implement user bookmarks (many-to-many between User and Place)
 # user_bookmarks_place = Table(
 #     'user_bookmarks_place', Base.metadata,
@@ -1,8 +1,28 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    DDL,
+    Column,
+    Integer,
+    String,
+    Text,
+    Float,
+    ForeignKey,
+    DateTime,
+    Index,
+    UniqueConstraint,
+    event,
+    literal_column,
+)
+from sqlalchemy.dialects import postgresql  # noqa: F401 (types func.to_tsvector)
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func  # For default timestamp
 
 from ..db.database import Base
+from ..utils.text_search import search_tokens as comment_search_tokens
+
+# Text search configuration of the PostgreSQL search index; queries must use
+# the same one for the index to apply. No stemming or stop words: the tokens
+# are already normalized, and reviews are written in several languages.
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
 
 
 class Review(Base):
@@ -11,6 +31,9 @@ class Review(Base):
     id = Column(Integer, primary_key=True, index=True)
     rating = Column(Float, nullable=False)  # e.g., 1.0 to 5.0
     comment = Column(String, nullable=True)
+    # Tokens of the comment for GET /reviews/search (see app.utils.text_search),
+    # set whenever `comment` is; Core INSERTs must set it themselves
+    search_tokens = Column(Text, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -19,7 +42,71 @@ class Review(Base):
     user_id = Column(
         Integer, ForeignKey("users.id"), nullable=False
     )  # User who wrote the review
+    # Earlier review whose comment this one nearly duplicates (possible spam),
+    # set on write when REVIEW_DUPLICATE_ACTION is "flag"
+    duplicate_of_id = Column(
+        Integer, ForeignKey("reviews.id", ondelete="SET NULL"), nullable=True
+    )
+
+    __table_args__ = (
+        # One review per user and place; PUT /reviews/place/{id} upserts on it
+        UniqueConstraint(user_id, place_id, name="uq_reviews_user_place"),
+        # Covers per-place rating aggregation, e.g. the rating reconciliation job
+        Index("ix_reviews_place_rating", place_id, rating),
+        # Newest-first keyset pagination of a place's / a user's reviews
+        Index("ix_reviews_place_newest", place_id, created_at.desc(), id.desc()),
+        Index("ix_reviews_user_newest", user_id, created_at.desc(), id.desc()),
+        # Full-text search; SQLite uses the reviews_fts table created below
+        Index(
+            "ix_reviews_search",
+            func.to_tsvector(SEARCH_CONFIG, search_tokens),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
 
     # Relationships
     place = relationship("Place", back_populates="reviews")
     user = relationship("User", back_populates="reviews")
+
+    @validates("comment")
+    def _set_search_tokens(self, key, comment):
+        self.search_tokens = comment_search_tokens(comment)
+        return comment
+
+    @property
+    def author_username(self) -> str:
+        # Eager-load `user` (e.g. joinedload(Review.user)) when reading this in bulk
+        return self.user.username
+
+
+# SQLite fallback of the full-text search index: an FTS5 table over
+# reviews.search_tokens, kept in sync by triggers
+_sqlite_search_ddl = [
+    """CREATE VIRTUAL TABLE reviews_fts USING fts5(
+        search_tokens, content='reviews', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 0')""",
+    """CREATE TRIGGER reviews_fts_insert AFTER INSERT ON reviews BEGIN
+        INSERT INTO reviews_fts(rowid, search_tokens)
+        VALUES (new.id, new.search_tokens);
+    END""",
+    """CREATE TRIGGER reviews_fts_delete AFTER DELETE ON reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, search_tokens)
+        VALUES ('delete', old.id, old.search_tokens);
+    END""",
+    """CREATE TRIGGER reviews_fts_update AFTER UPDATE OF search_tokens ON reviews
+    BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, search_tokens)
+        VALUES ('delete', old.id, old.search_tokens);
+        INSERT INTO reviews_fts(rowid, search_tokens)
+        VALUES (new.id, new.search_tokens);
+    END""",
+]
+for _statement in _sqlite_search_ddl:
+    event.listen(
+        Review.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    Review.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS reviews_fts").execute_if(dialect="sqlite"),
+)
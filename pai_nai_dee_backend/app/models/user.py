@@ -1,5 +1,14 @@
-from sqlalchemy import Column, Integer, String  # Table, ForeignKey removed
+from sqlalchemy import (  # Table, ForeignKey removed
+    Boolean,
+    Column,
+    Float,
+    Integer,
+    String,
+    UniqueConstraint,
+    false,
+)
 from sqlalchemy.orm import relationship
+from typing import Optional
 
 # JSONB import removed as it's unused in this file
 # from sqlalchemy.dialects.postgresql import (
@@ -28,6 +37,26 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=True)  # Added email
     hashed_password = Column(String, nullable=False)  # For authentication
+    # May import reviews for other users (POST /reviews/bulk)
+    is_superuser = Column(
+        Boolean, default=False, server_default=false(), nullable=False
+    )
+
+    # Authors of reviews imported from a partner platform (POST /reviews/bulk)
+    # get a user of their own, identified by the platform and its id there;
+    # both are NULL for users who signed up
+    source = Column(String, nullable=True)
+    external_id = Column(String, nullable=True)
+
+    # Denormalized contribution counters for profile pages, kept in step by the
+    # review and itinerary CRUD writes (see crud_user.add_contributions)
+    review_count = Column(Integer, default=0, server_default="0", nullable=False)
+    review_rating_sum = Column(Float, default=0.0, server_default="0", nullable=False)
+    itinerary_count = Column(Integer, default=0, server_default="0", nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(source, external_id, name="uq_users_source_external_id"),
+    )
 
     # interests: Column(String) # Example: "food,travel,history" - needs parsing
     # Or using JSON for databases that support it well:
@@ -40,5 +69,11 @@ class User(Base):
     reviews = relationship("Review", back_populates="user")
     itineraries = relationship("Itinerary", back_populates="user")
 
+    @property
+    def average_rating_given(self) -> Optional[float]:
+        if not self.review_count:
+            return None
+        return self.review_rating_sum / self.review_count
+
     # If we implement a "bookmarks" feature:
     # bookmarked_places = relationship("Place", secondary="user_bookmarks_place", back_populates="bookmarked_by_users")
@@ -1,10 +1,41 @@
 # This file makes 'schemas' a Python package.
 
 # Import all your schemas here for easier access, e.g., from app.schemas import User, Place
-from .user import User, UserCreate, UserUpdate, UserInDBBase, UserInDB
-from .place import Place, PlaceCreate, PlaceUpdate, PlaceInDBBase, PlaceInDB
-from .review import Review, ReviewCreate, ReviewUpdate, ReviewInDBBase
-from .itinerary import Itinerary, ItineraryCreate, ItineraryUpdate, ItineraryInDBBase
+from .user import User, UserCreate, UserUpdate, UserInDBBase, UserInDB, UserProfile
+from .place import (
+    Place,
+    PlaceCreate,
+    PlaceUpdate,
+    PlaceInDBBase,
+    PlaceInDB,
+    PlaceSort,
+    PlaceSummary,
+)
+from .review import (
+    Review,
+    ReviewCreate,
+    ReviewBulkCreate,
+    ReviewBulkItem,
+    ReviewBulkResult,
+    ReviewUpdate,
+    ReviewUpsert,
+    ReviewInDBBase,
+    ReviewWithAuthor,
+    RecentReview,
+)
+from .itinerary import (
+    Itinerary,
+    ItineraryCreate,
+    ItineraryDetail,
+    ItineraryUpdate,
+    ItineraryInDBBase,
+    ItineraryRoute,
+    ItineraryStop,
+    ItineraryStopCreate,
+    ItineraryStopWithOptionalPlace,
+    ItineraryStopWithPlace,
+    ItinerarySummary,
+)
 from .token import Token, TokenData  # Correctly import from token.py
 
 # You can also define __all__ to specify what 'from app.schemas import *' imports
@@ -14,19 +45,35 @@ __all__ = [
     "UserUpdate",
     "UserInDBBase",
     "UserInDB",
+    "UserProfile",
     "Place",
     "PlaceCreate",
     "PlaceUpdate",
     "PlaceInDBBase",
     "PlaceInDB",
+    "PlaceSort",
+    "PlaceSummary",
     "Review",
     "ReviewCreate",
+    "ReviewBulkCreate",
+    "ReviewBulkItem",
+    "ReviewBulkResult",
     "ReviewUpdate",
+    "ReviewUpsert",
     "ReviewInDBBase",
+    "ReviewWithAuthor",
+    "RecentReview",
     "Itinerary",
     "ItineraryCreate",
+    "ItineraryDetail",
     "ItineraryUpdate",
     "ItineraryInDBBase",
+    "ItineraryRoute",
+    "ItineraryStop",
+    "ItineraryStopCreate",
+    "ItineraryStopWithOptionalPlace",
+    "ItineraryStopWithPlace",
+    "ItinerarySummary",
     "Token",
     "TokenData",
 ]
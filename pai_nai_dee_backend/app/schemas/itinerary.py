@@ -1,25 +1,96 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 from datetime import datetime
 
-# Forward declaration for Place schema if it's included here for nested responses.
-# from .place import Place # Example
+from .place import Place
+
+# Most stops an itinerary can have
+MAX_ITINERARY_STOPS = 500
+
+
+# A stop of an itinerary; its position is its index in the list of stops
+class ItineraryStopBase(BaseModel):
+    place_id: int
+    day: Optional[int] = Field(None, ge=1, description="Day of the trip, from 1")
+    notes: Optional[str] = Field(None, max_length=2000)
+
+
+class ItineraryStopCreate(ItineraryStopBase):
+    pass
+
+
+class ItineraryStop(ItineraryStopBase):
+    class Config:
+        from_attributes = True
+
+
+class ItineraryStopWithPlace(ItineraryStop):
+    place: Place
+
+
+# A stop whose place is only included when asked for (null otherwise)
+class ItineraryStopWithOptionalPlace(ItineraryStop):
+    place: Optional[Place] = None
+
+
+# Result of POST /itineraries/{id}/optimize
+class ItineraryRoute(BaseModel):
+    stops: List[ItineraryStop]
+    total_distance_km: float
+    previous_distance_km: float  # Of the stops in their order before
+    converged: bool  # False if the time budget ran out before the route was final
 
 
 # Shared properties
 class ItineraryBase(BaseModel):
     name: str
     description: Optional[str] = None
+    is_template: bool = Field(
+        False, description="List it publicly as a template anyone can clone"
+    )
+
+
+class _ItineraryStopsIn(BaseModel):
+    """
+    The stops of an itinerary as `stops`, or as plain `place_ids` (stops
+    without a day or notes, repeats ignored), but not both.
+    """
+
+    place_ids: Optional[List[int]] = Field(None, max_length=MAX_ITINERARY_STOPS)
+    stops: Optional[List[ItineraryStopCreate]] = Field(
+        None, max_length=MAX_ITINERARY_STOPS
+    )
+
+    @model_validator(mode="after")
+    def _check_stops(self):
+        if self.place_ids is not None and self.stops is not None:
+            raise ValueError("Give either place_ids or stops, not both")
+        if self.stops is not None:
+            place_ids = [stop.place_id for stop in self.stops]
+            if len(set(place_ids)) != len(place_ids):
+                raise ValueError("A place can only be one stop of an itinerary")
+        return self
+
+    def stop_list(self) -> Optional[List[ItineraryStopCreate]]:
+        """The stops in order, or None if neither field was given."""
+        if self.stops is not None:
+            return self.stops
+        if self.place_ids is not None:
+            return [
+                ItineraryStopCreate(place_id=place_id)
+                for place_id in dict.fromkeys(self.place_ids)
+            ]
+        return None
 
 
 # Properties to receive on creation
-class ItineraryCreate(ItineraryBase):
-    place_ids: List[int] = []  # List of place IDs to include in this itinerary
+class ItineraryCreate(ItineraryBase, _ItineraryStopsIn):
+    pass
 
 
 # Properties to receive on update
-class ItineraryUpdate(ItineraryBase):
-    place_ids: Optional[List[int]] = None  # Allow updating the list of places
+class ItineraryUpdate(ItineraryBase, _ItineraryStopsIn):
+    pass  # Stops are replaced if place_ids or stops are given
 
 
 # Properties shared by models stored in DB
@@ -35,10 +106,16 @@ class ItineraryInDBBase(ItineraryBase):
 
 # Additional properties to return to client
 class Itinerary(ItineraryInDBBase):
-    # places_in_itinerary: List[Place] = [] # Example: if returning nested places
-    pass
+    stops: List[ItineraryStop] = []
+
+
+# An itinerary with the places of its stops, so that clients can draw it
+# without fetching each place
+class ItineraryDetail(Itinerary):
+    stops: List[ItineraryStopWithPlace] = []
 
 
-# Forward ref solution for Place in Itinerary later if needed:
-# from .place import Place
-# Itinerary.model_rebuild()
+# An itinerary of GET /itineraries/my-itineraries, with the places of its
+# stops if `expand=places`
+class ItinerarySummary(Itinerary):
+    stops: List[ItineraryStopWithOptionalPlace] = []
@@ -1,5 +1,11 @@
 from pydantic import BaseModel
-from typing import Optional  # List removed
+from typing import Optional, Literal, List, Dict
+from datetime import datetime
+
+from .review import ReviewWithAuthor
+
+# Sort options accepted by GET /places, each backed by an index on `places`
+PlaceSort = Literal["best", "rating", "name", "newest", "distance"]
 
 # Forward declaration for Review and Itinerary schemas if they are included here.
 # from .review import Review # Example if Review schema is needed
@@ -31,6 +37,10 @@ class PlaceUpdate(PlaceBase):
 class PlaceInDBBase(PlaceBase):
     id: int
     average_rating: float = 0.0
+    rating_count: int = 0
+    rating_histogram: Dict[str, int] = {}  # Half-star buckets "0.5" .. "5.0"
+    ranking_score: float = 0.0  # Bayesian average, used by sort=best
+    created_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -46,3 +56,11 @@ class Place(PlaceInDBBase):
 # Properties stored in DB
 class PlaceInDB(PlaceInDBBase):
     pass
+
+
+# Everything the place screen needs in one response
+class PlaceSummary(BaseModel):
+    place: Place
+    review_count: int
+    rating_histogram: Dict[str, int]  # Half-star buckets "0.5" .. "5.0" -> count
+    latest_reviews: List[ReviewWithAuthor]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -15,6 +15,38 @@ class ReviewCreate(ReviewBase):
     # user_id will be taken from current authenticated user, not from payload
 
 
+# One review of a bulk import, by its author on the source platform
+class ReviewBulkItem(ReviewCreate):
+    author_id: str = Field(
+        ..., min_length=1, max_length=100, description="Author's id on the source"
+    )
+
+
+# Body of POST /reviews/bulk, e.g. a backfill of reviews from a partner platform
+class ReviewBulkCreate(BaseModel):
+    source: str = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        pattern=r"^[a-z0-9_-]+$",
+        description="Platform the reviews come from, e.g. 'tripadvisor'",
+    )
+    reviews: List[ReviewBulkItem] = Field(..., min_length=1, max_length=1000)
+
+
+# Outcome of one item of a bulk create, by its position in the request
+class ReviewBulkResult(BaseModel):
+    index: int
+    status: Literal["created", "conflict", "place_not_found"]
+    review_id: Optional[int] = None
+
+
+# Properties to receive when creating or replacing the current user's review of
+# a place (PUT /reviews/place/{place_id}); the place comes from the path
+class ReviewUpsert(ReviewBase):
+    pass
+
+
 # Properties to receive on update
 # Usually, reviews are not updated, or only the comment/rating part.
 # For simplicity, let's assume only comment can be updated.
@@ -32,6 +64,7 @@ class ReviewInDBBase(ReviewBase):
     place_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    duplicate_of_id: Optional[int] = None  # Flagged as a near-duplicate of it
 
     class Config:
         from_attributes = True
@@ -44,6 +77,20 @@ class Review(ReviewInDBBase):
     pass
 
 
+# Review with its author's public name, for place pages
+class ReviewWithAuthor(Review):
+    author_username: str
+
+
+# Entry of the recent reviews feed, with what the feed shows of the place.
+# `comment` may be truncated (RECENT_REVIEWS_COMMENT_CHARS).
+class RecentReview(ReviewWithAuthor):
+    place_name: str
+    place_category: Optional[str] = None
+    place_latitude: Optional[float] = None
+    place_longitude: Optional[float] = None
+
+
 # Schema for a review linked to a user, for User.reviews list perhaps
 # class ReviewForUser(ReviewBase):
 #     id: int
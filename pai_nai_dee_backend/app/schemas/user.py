@@ -34,6 +34,15 @@ class User(UserInDBBase):
     pass  # No extra fields for now, but can add related data here if needed
 
 
+# Public profile with the user's contribution counters
+class UserProfile(BaseModel):
+    id: int
+    username: str
+    review_count: int
+    itinerary_count: int
+    average_rating_given: Optional[float] = None  # None until the first review
+
+
 # Additional properties stored in DB
 class UserInDB(UserInDBBase):
     hashed_password: str
@@ -3,6 +3,7 @@
 
 from .user_service import UserService
 from .place_service import PlaceService
+from .place_catalog import PlaceCatalog
 
 # Add other services here as they are created
 # from .review_service import ReviewService
@@ -11,6 +12,7 @@ from .place_service import PlaceService
 __all__ = [
     "UserService",
     "PlaceService",
+    "PlaceCatalog",
     # "ReviewService",
     # "ItineraryService",
 ]
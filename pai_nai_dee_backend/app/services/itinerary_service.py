@@ -0,0 +1,107 @@
+import time
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..core.config import settings
+from ..crud.crud_itinerary import itinerary as crud_itinerary
+from ..crud.crud_place import place_distances
+from ..models.place import Place, itinerary_place_association
+from ..schemas.itinerary import ItineraryStopCreate
+from ..utils.geo import haversine_km
+from ..utils.routing import optimize_path
+
+
+def route_length_km(latitudes: np.ndarray, longitudes: np.ndarray) -> float:
+    """Length of the route through the points in order, skipping missing (NaN) ones."""
+    located = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    lat, lng = latitudes[located], longitudes[located]
+    return float(haversine_km(lat[:-1], lng[:-1], lat[1:], lng[1:]).sum())
+
+
+class ItineraryService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def optimize_stops(
+        self, itinerary_id: int, keep_start: bool = True, save: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Reorders the stops of an itinerary into a short route between their
+        places (see app.utils.routing.optimize_path), and saves the new order
+        unless `save` is False. The stops of each day stay together, days in
+        the order they first appear; with `keep_start` each day still starts
+        at its current first stop. Stops at places without coordinates go
+        last in their day. All days share ITINERARY_OPTIMIZE_TIME_BUDGET_MS.
+        """
+        deadline = (
+            time.perf_counter() + settings.ITINERARY_OPTIMIZE_TIME_BUDGET_MS / 1000
+        )
+        table = itinerary_place_association
+        stops = self.db.execute(
+            select(
+                table.c.place_id,
+                table.c.day,
+                table.c.notes,
+                Place.latitude,
+                Place.longitude,
+            )
+            .join(Place, Place.id == table.c.place_id)
+            .where(table.c.itinerary_id == itinerary_id)
+            .order_by(table.c.position)
+        ).all()
+        coordinates = np.array(
+            [(s.latitude, s.longitude) for s in stops], dtype=np.float64
+        ).reshape(-1, 2)
+        located = ~np.isnan(coordinates).any(axis=1)
+
+        days: Dict[Optional[int], List[int]] = {}
+        for i, stop in enumerate(stops):
+            days.setdefault(stop.day, []).append(i)
+        order: List[int] = []
+        converged = True
+        for indexes in days.values():
+            indexes = np.array(indexes)
+            with_place = indexes[located[indexes]]
+            if keep_start and not located[indexes[0]]:
+                order.append(int(indexes[0]))  # Stays first, not routed
+                indexes = indexes[1:]
+            path, done = optimize_path(
+                place_distances.matrix(
+                    [stops[i].place_id for i in with_place],
+                    coordinates[with_place, 0],
+                    coordinates[with_place, 1],
+                ),
+                keep_start=keep_start,
+                time_budget=max(deadline - time.perf_counter(), 0.0),
+            )
+            converged &= done
+            order += with_place[path].tolist()
+            order += [int(i) for i in indexes if not located[i]]
+
+        if save and order != list(range(len(stops))):
+            crud_itinerary.set_stops(
+                self.db,
+                itinerary_id,
+                [
+                    ItineraryStopCreate(
+                        place_id=stops[i].place_id,
+                        day=stops[i].day,
+                        notes=stops[i].notes,
+                    )
+                    for i in order
+                ],
+            )
+            self.db.commit()
+            crud_itinerary.invalidate_templates(itinerary_id)
+        return {
+            "stops": [
+                {"place_id": s.place_id, "day": s.day, "notes": s.notes}
+                for s in (stops[i] for i in order)
+            ],
+            "total_distance_km": route_length_km(*coordinates[order].T),
+            "previous_distance_km": route_length_km(*coordinates.T),
+            "converged": converged,
+        }
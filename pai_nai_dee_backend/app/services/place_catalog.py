@@ -0,0 +1,394 @@
+"""
+Read-only, memory-mapped snapshot of the place catalog.
+
+`build_snapshot` writes every place into one compact columnar file: fixed-width
+NumPy columns (ids, coordinates, ratings and rating histograms, category codes,
+string offsets and precomputed sort orders) followed by a UTF-8 string blob.
+`PlaceCatalog` maps the file and reads the columns as zero-copy arrays, so all
+worker processes on a host share the same page cache instead of each warming its
+own copy of the rows.
+
+The snapshot is a point-in-time copy: it is refreshed by rebuilding the file
+(`python -m app.services.place_catalog <path>`) and workers pick up the new file
+within PLACE_CATALOG_RELOAD_SECONDS. Place details stay served from the database.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.place import Place, RATING_HISTOGRAM_COLUMNS
+from ..utils.geo import KM_PER_DEGREE_LAT, equirectangular_sq_degrees
+from ..utils.ratings import RATING_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PNDCAT03"
+_ALIGNMENT = 8
+_STRING_FIELDS = ("name", "description", "address")
+
+# (column, dtype, length) where length is "n" (one per place), "h" (one histogram
+# row per place), "c" (one per category) or "blob". The file header stores the byte offset of each column.
+_COLUMNS = [
+    ("id", "<i8", "n"),
+    ("latitude", "<f8", "n"),  # NaN when unknown
+    ("longitude", "<f8", "n"),
+    ("average_rating", "<f8", "n"),
+    ("rating_count", "<i4", "n"),
+    ("ranking_score", "<f8", "n"),
+    ("rating_histogram", "<i4", "h"),  # RATING_BUCKETS counts, row-major
+    ("created_at_us", "<i8", "n"),  # Microseconds since the epoch, 0 when unknown
+    ("category_code", "<i4", "n"),  # Index into the category table, -1 for none
+    ("name_start", "<i8", "n"),
+    ("name_len", "<i4", "n"),  # -1 for NULL
+    ("description_start", "<i8", "n"),
+    ("description_len", "<i4", "n"),
+    ("address_start", "<i8", "n"),
+    ("address_len", "<i4", "n"),
+    ("order_best", "<i4", "n"),  # Row numbers in sort=best order
+    ("order_rating", "<i4", "n"),
+    ("order_name", "<i4", "n"),
+    ("order_newest", "<i4", "n"),
+    ("category_start", "<i8", "c"),
+    ("category_len", "<i4", "c"),
+    ("blob", "u1", "blob"),
+]
+_HEADER = struct.Struct("<8sQQQ" + "Q" * len(_COLUMNS))
+
+SUPPORTED_SORTS = (None, "best", "rating", "name", "newest", "distance")
+
+
+def build_snapshot(db: Session, path: str, batch_size: int = 10_000) -> int:
+    """
+    Writes the current place catalog to `path` and returns the number of places.
+    The file is written next to `path` and renamed over it, so readers never see
+    a partially written snapshot.
+    """
+    ids, lats, lngs, ratings, created, category_codes = [], [], [], [], [], []
+    rating_counts, scores, histograms = [], [], []
+    blob = bytearray()
+    strings: Dict[str, Dict[str, list]] = {
+        field: {"start": [], "len": []} for field in _STRING_FIELDS
+    }
+    categories: Dict[str, int] = {}
+    name_ranks = []
+
+    def add_string(field: str, value: Optional[str]) -> None:
+        if value is None:
+            strings[field]["start"].append(len(blob))
+            strings[field]["len"].append(-1)
+            return
+        encoded = value.encode("utf-8")
+        strings[field]["start"].append(len(blob))
+        strings[field]["len"].append(len(encoded))
+        blob.extend(encoded)
+
+    rows = (
+        db.query(
+            Place.id,
+            Place.name,
+            Place.description,
+            Place.address,
+            Place.category,
+            Place.latitude,
+            Place.longitude,
+            Place.average_rating,
+            Place.rating_count,
+            Place.ranking_score,
+            *(getattr(Place, column) for column in RATING_HISTOGRAM_COLUMNS),
+            Place.created_at,
+            # Position in sort=name order, by the database's collation like
+            # the ORDER BY of crud_place.build_places_query
+            func.row_number().over(order_by=(Place.name, Place.id)).label("name_rank"),
+        )
+        .order_by(Place.id)
+        .yield_per(batch_size)
+    )
+    for row in rows:
+        ids.append(row.id)
+        lats.append(np.nan if row.latitude is None else row.latitude)
+        lngs.append(np.nan if row.longitude is None else row.longitude)
+        ratings.append(row.average_rating or 0.0)
+        rating_counts.append(row.rating_count or 0)
+        scores.append(row.ranking_score or 0.0)
+        histograms.append([getattr(row, column) for column in RATING_HISTOGRAM_COLUMNS])
+        created.append(_to_epoch_us(row.created_at))
+        if row.category is None:
+            category_codes.append(-1)
+        else:
+            category_codes.append(categories.setdefault(row.category, len(categories)))
+        for field in _STRING_FIELDS:
+            add_string(field, getattr(row, field))
+        name_ranks.append(row.name_rank)
+
+    category_start, category_len = [], []
+    for category in categories:  # Insertion order == code order
+        encoded = category.encode("utf-8")
+        category_start.append(len(blob))
+        category_len.append(len(encoded))
+        blob.extend(encoded)
+
+    id_arr = np.asarray(ids, dtype="<i8")
+    rating_arr = np.asarray(ratings, dtype="<f8")
+    score_arr = np.asarray(scores, dtype="<f8")
+    created_arr = np.asarray(created, dtype="<i8")
+    columns = {
+        "id": id_arr,
+        "latitude": np.asarray(lats, dtype="<f8"),
+        "longitude": np.asarray(lngs, dtype="<f8"),
+        "average_rating": rating_arr,
+        "rating_count": np.asarray(rating_counts, dtype="<i4"),
+        "ranking_score": score_arr,
+        "rating_histogram": np.asarray(histograms, dtype="<i4").reshape(-1),
+        "created_at_us": created_arr,
+        "category_code": np.asarray(category_codes, dtype="<i4"),
+        # Same orderings as the ORDER BY clauses in crud_place.build_places_query
+        "order_best": np.lexsort((id_arr, -score_arr)).astype("<i4"),
+        "order_rating": np.lexsort((id_arr, -rating_arr)).astype("<i4"),
+        "order_name": np.argsort(np.asarray(name_ranks, dtype="<i8")).astype("<i4"),
+        "order_newest": np.lexsort((-id_arr, -created_arr)).astype("<i4"),
+        "category_start": np.asarray(category_start, dtype="<i8"),
+        "category_len": np.asarray(category_len, dtype="<i4"),
+        "blob": np.frombuffer(bytes(blob), dtype="u1"),
+    }
+    for field in _STRING_FIELDS:
+        columns[f"{field}_start"] = np.asarray(strings[field]["start"], dtype="<i8")
+        columns[f"{field}_len"] = np.asarray(strings[field]["len"], dtype="<i4")
+
+    offsets = []
+    position = _HEADER.size
+    for name, _, _ in _COLUMNS:
+        position += -position % _ALIGNMENT
+        offsets.append(position)
+        position += columns[name].nbytes
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(ids), len(categories), len(blob), *offsets))
+        for (name, _, _), offset in zip(_COLUMNS, offsets):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(columns[name].tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(ids)
+
+
+def _to_epoch_us(value: Optional[datetime]) -> int:
+    if value is None:
+        return 0
+    if value.tzinfo is None:  # SQLite returns naive UTC timestamps
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1_000_000)
+
+
+class PlaceCatalog:
+    """
+    Memory-mapped view of a snapshot written by `build_snapshot`.
+    Listing, filtering and nearby queries are evaluated over the mapped columns;
+    only the rows on the requested page are decoded into Python objects.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_places, n_categories, blob_size, *offsets = _HEADER.unpack_from(
+            self._mm, 0
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a place catalog snapshot")
+
+        lengths = {
+            "n": n_places,
+            "h": n_places * len(RATING_BUCKETS),
+            "c": n_categories,
+            "blob": blob_size,
+        }
+        self._cols: Dict[str, np.ndarray] = {}
+        for (name, dtype, length), offset in zip(_COLUMNS, offsets):
+            self._cols[name] = np.frombuffer(
+                self._mm, dtype=dtype, count=lengths[length], offset=offset
+            )
+        self._cols["rating_histogram"] = self._cols["rating_histogram"].reshape(
+            n_places, len(RATING_BUCKETS)
+        )
+        self._blob = self._cols["blob"]
+        self._category_names = [
+            self._string(start, length)
+            for start, length in zip(
+                self._cols["category_start"], self._cols["category_len"]
+            )
+        ]
+        self._category_codes: Dict[str, List[int]] = {}
+        for code, category in enumerate(self._category_names):
+            self._category_codes.setdefault(category.lower(), []).append(code)
+
+    def __len__(self) -> int:
+        return len(self._cols["id"])
+
+    def _string(self, start: int, length: int) -> Optional[str]:
+        if length < 0:
+            return None
+        return self._blob[start : start + length].tobytes().decode("utf-8")
+
+    def _row(self, i: int) -> Dict[str, Any]:
+        cols = self._cols
+        latitude = float(cols["latitude"][i])
+        longitude = float(cols["longitude"][i])
+        created_us = int(cols["created_at_us"][i])
+        code = int(cols["category_code"][i])
+        row = {
+            "id": int(cols["id"][i]),
+            "category": self._category_names[code] if code >= 0 else None,
+            "latitude": None if np.isnan(latitude) else latitude,
+            "longitude": None if np.isnan(longitude) else longitude,
+            "average_rating": float(cols["average_rating"][i]),
+            "rating_count": int(cols["rating_count"][i]),
+            "ranking_score": float(cols["ranking_score"][i]),
+            "rating_histogram": dict(
+                zip(RATING_BUCKETS, cols["rating_histogram"][i].tolist())
+            ),
+            "created_at": (
+                datetime.fromtimestamp(created_us / 1_000_000, tz=timezone.utc)
+                if created_us
+                else None
+            ),
+        }
+        for field in _STRING_FIELDS:
+            row[field] = self._string(
+                int(cols[f"{field}_start"][i]), int(cols[f"{field}_len"][i])
+            )
+        return row
+
+    def query(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        category: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        sort: Optional[str] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        radius_km: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Same filters and orderings as `crud_place.get_places`, returning plain
+        dicts shaped like the Place schema.
+        """
+        if sort not in SUPPORTED_SORTS:
+            raise ValueError(f"Unsupported sort for the place catalog: {sort}")
+        cols = self._cols
+        mask = np.ones(len(self), dtype=bool)
+        if category:
+            codes = self._category_codes.get(category.lower(), [])
+            mask &= np.isin(cols["category_code"], codes)
+        if min_rating is not None:
+            mask &= cols["average_rating"] >= min_rating
+
+        if sort == "distance" or radius_km is not None:
+            if lat is None or lng is None:
+                raise ValueError(
+                    "lat and lng are required to sort or filter by distance"
+                )
+            mask &= ~np.isnan(cols["latitude"]) & ~np.isnan(cols["longitude"])
+            candidates = np.flatnonzero(mask)
+            # The database's metric, so that both return the same places
+            distances = equirectangular_sq_degrees(
+                lat, lng, cols["latitude"][candidates], cols["longitude"][candidates]
+            )
+            if radius_km is not None:
+                keep = distances <= (radius_km / KM_PER_DEGREE_LAT) ** 2
+                candidates, distances = candidates[keep], distances[keep]
+            if sort == "distance":
+                # Partial sort: only the rows up to the end of the page are ordered
+                end = min(skip + limit, len(candidates))
+                if end < len(candidates):
+                    part = np.argpartition(distances, end - 1)[:end]
+                    candidates, distances = candidates[part], distances[part]
+                order = np.lexsort((cols["id"][candidates], distances))
+                page = candidates[order][skip : skip + limit]
+            else:
+                page = candidates[skip : skip + limit]
+        elif sort is None:
+            page = np.flatnonzero(mask)[skip : skip + limit]
+        else:
+            order = cols[f"order_{sort}"]
+            page = order[mask[order]][skip : skip + limit]
+
+        return [self._row(int(i)) for i in page]
+
+
+_catalog: Optional[PlaceCatalog] = None
+_catalog_identity = None
+_catalog_checked_at: Optional[float] = None
+_catalog_missing = False  # Warned that the snapshot file is missing
+_catalog_lock = threading.Lock()
+
+
+def get_place_catalog() -> Optional[PlaceCatalog]:
+    """
+    Returns this process's mapping of the snapshot at PLACE_CATALOG_PATH, or None
+    when no snapshot is configured or available (callers then use the database).
+    The file is checked again at most every PLACE_CATALOG_RELOAD_SECONDS, so a
+    rebuilt snapshot is re-mapped, and a missing one picked up, within that time.
+    """
+    global _catalog, _catalog_identity, _catalog_checked_at, _catalog_missing
+    path = settings.PLACE_CATALOG_PATH
+    if not path:
+        return None
+
+    now = time.monotonic()
+    if (
+        _catalog_checked_at is not None
+        and now - _catalog_checked_at < settings.PLACE_CATALOG_RELOAD_SECONDS
+    ):
+        return _catalog
+
+    with _catalog_lock:
+        _catalog_checked_at = now
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if _catalog is None and not _catalog_missing:
+                logger.warning(f"Place catalog snapshot {path} not found, using DB")
+                _catalog_missing = True
+            return _catalog
+        _catalog_missing = False
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity != _catalog_identity:
+            # The previous mapping is released once no request still uses it
+            _catalog = PlaceCatalog(path)
+            _catalog_identity = identity
+            logger.info(
+                f"Mapped place catalog snapshot {path} ({len(_catalog)} places)"
+            )
+        return _catalog
+
+
+if __name__ == "__main__":
+    import sys
+
+    from ..db.database import SessionLocal
+
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python -m app.services.place_catalog <snapshot path>")
+    session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        count = build_snapshot(session, sys.argv[1])
+        print(
+            f"Wrote {count} places to {sys.argv[1]} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+    finally:
+        session.close()
@@ -1,5 +1,13 @@
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Dict, Any, Optional
+
+from ..core.config import settings
+from ..crud.crud_place import place as crud_place, place_cache, ranking_score_expression
+from ..models.place import Place, PlaceRankingPrior
+from ..models.review import Review
+from .rating_reconciliation import empty_rating_aggregates, compute_rating_aggregates
 
 # from app import crud, models, schemas
 # from app.models.user import User as UserModel # For context like user preferences
@@ -39,26 +47,107 @@ class PlaceService:
 
     def update_place_average_rating(self, place_id: int) -> bool:
         """
-        Calculates and updates the average rating for a place based on its reviews.
-        This is a good candidate for a service method if it's not handled by triggers
-        or simple CRUD post-hooks.
+        Recomputes a place's rating aggregates and histogram from its reviews with
+        one grouped query. Review writes keep them up to date incrementally, so
+        this is only needed to repair a place after out-of-band changes to the
+        reviews table (see also rating_reconciliation for all places).
+        Returns False if the place does not exist.
         """
-        # place_model = crud.crud_place.get_place(self.db, place_id=place_id)
-        # if not place_model:
-        #     return False # Or raise exception
+        aggregates = compute_rating_aggregates(self.db, place_id, place_id)
+        values = aggregates.get(place_id) or empty_rating_aggregates()
+        values["ranking_score"] = ranking_score_expression(
+            values["rating_sum"], values["rating_count"]
+        )
+        updated = (
+            self.db.query(Place)
+            .filter(Place.id == place_id)
+            .update(values, synchronize_session=False)
+        )
+        self.db.commit()
+        crud_place.invalidate_cached_place(place_id)
+        return updated > 0
 
-        # reviews = crud.crud_review.get_reviews_by_place(self.db, place_id=place_id, limit=1000) # Get all reviews
+    def refresh_ranking_prior(
+        self, batch_size: int = 10_000, force: bool = False
+    ) -> bool:
+        """
+        Recomputes the global mean rating used as the prior of every place's
+        ranking_score. If it moved by at least RANKING_PRIOR_MIN_CHANGE (or with
+        `force`), all places are rescored in primary-key batches of one UPDATE
+        each, so no long transaction holds their row locks. Returns whether the
+        places were rescored.
+        """
+        total_sum, total_count = self.db.query(
+            func.sum(Place.rating_sum), func.sum(Place.rating_count)
+        ).one()
+        if not total_count:
+            return False
+        mean_rating = total_sum / total_count
 
-        # if not reviews:
-        #     new_average_rating = 0.0
-        # else:
-        #     new_average_rating = sum(r.rating for r in reviews) / len(reviews)
+        # Seeds the row on the first refresh; concurrent first refreshes (e.g.
+        # of several workers starting up) insert it once, the others lock it
+        dialect = (
+            postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        )
+        seeded = self.db.execute(
+            dialect.insert(PlaceRankingPrior)
+            .values(id=1, mean_rating=mean_rating)
+            .on_conflict_do_nothing(index_elements=["id"])
+            .returning(PlaceRankingPrior.id)
+        ).first()
+        if seeded is None:
+            prior = self.db.get(
+                PlaceRankingPrior, 1, with_for_update=True, populate_existing=True
+            )
+            if (
+                abs(prior.mean_rating - mean_rating) < settings.RANKING_PRIOR_MIN_CHANGE
+                and not force
+            ):
+                self.db.commit()
+                return False
+            prior.mean_rating = mean_rating
+            prior.updated_at = func.now()
+        self.db.commit()
 
-        # place_model.average_rating = round(new_average_rating, 2) # Round to 2 decimal places
-        # self.db.add(place_model)
-        # self.db.commit()
-        # return True
-        return False  # Placeholder implementation
+        max_id = self.db.query(func.max(Place.id)).scalar() or 0
+        score = ranking_score_expression(Place.rating_sum, Place.rating_count)
+        for first_id in range(1, max_id + 1, batch_size):
+            self.db.query(Place).filter(
+                Place.id.between(first_id, first_id + batch_size - 1)
+            ).update({Place.ranking_score: score}, synchronize_session=False)
+            self.db.commit()
+        place_cache.clear()  # Cached place details carry the old scores
+        return True
+
+    def get_place_summary(
+        self, place_id: int, reviews_limit: int = 5
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Builds the place screen payload in two queries: the place, whose stored
+        histogram is maintained by review writes, then the latest reviews with
+        their authors eager-loaded. Returns None if the place does not exist.
+        """
+        place = self.db.query(Place).filter(Place.id == place_id).first()
+        if place is None:
+            return None
+
+        latest_reviews = []
+        if reviews_limit > 0:
+            latest_reviews = (
+                self.db.query(Review)
+                .options(joinedload(Review.user))
+                .filter(Review.place_id == place_id)
+                .order_by(Review.created_at.desc(), Review.id.desc())
+                .limit(reviews_limit)
+                .all()
+            )
+
+        return {
+            "place": place,
+            "review_count": place.rating_count,
+            "rating_histogram": place.rating_histogram,
+            "latest_reviews": latest_reviews,
+        }
 
     # Placeholder for other complex place-related logic, e.g.,
     # - Advanced search considering proximity, opening hours, specific amenities
@@ -74,11 +163,3 @@ class PlaceService:
 # def get_recommendations(current_user: UserModel = Depends(get_current_active_user), db: Session = Depends(get_db)):
 #     place_service = PlaceService(db)
 #     return place_service.get_place_recommendations(user_id=current_user.id)
-#
-# @router.post("/reviews/", response_model=schemas.Review) # Example from review creation
-# def create_review_endpoint(review_in: schemas.ReviewCreate, ..., db: Session = Depends(get_db)):
-#     # ... create review using crud_review ...
-#     if new_review:
-#         place_service = PlaceService(db)
-#         place_service.update_place_average_rating(place_id=new_review.place_id)
-#     return new_review
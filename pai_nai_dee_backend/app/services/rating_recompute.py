@@ -0,0 +1,230 @@
+"""
+Vectorized recompute of the rating aggregates of every place, for use after bulk
+imports or data fixes:
+
+    python -m app.services.rating_recompute [--chunk-size N] [--batch-size N]
+
+`(place_id, rating)` pairs are streamed from `reviews` in place-id order (an
+index-only scan of ix_reviews_place_rating) into NumPy chunks. Each chunk is
+reduced with `np.add.reduceat` over its runs of equal place ids and a `bincount`
+for the histogram, then the results are written back with one bulk UPDATE per
+batch of places. The per-place `rating_reconciliation` job remains the tool for
+checking (and surgically repairing) a live database. Pending write-behind
+deltas are deleted in the same transaction, since the recomputed totals already
+count their review changes.
+"""
+
+import time
+from typing import Any, Dict
+
+import numpy as np
+from sqlalchemy import bindparam, select, text, update
+from sqlalchemy.orm import Session
+
+from ..crud.crud_place import (
+    place as crud_place,
+    place_cache,
+    ranking_score_expression,
+)
+from ..models.place import Place, RATING_HISTOGRAM_COLUMNS
+from ..models.review import Review
+
+N_BUCKETS = len(RATING_HISTOGRAM_COLUMNS)
+
+
+class RatingAccumulator:
+    """
+    Grouped sums, counts and half-star histograms of ratings per place id,
+    accumulated chunk by chunk. Arrays are indexed by place id and grow as needed.
+    """
+
+    def __init__(self, max_place_id: int = 0):
+        size = max_place_id + 1
+        self.sums = np.zeros(size, dtype=np.float64)
+        self.counts = np.zeros(size, dtype=np.int64)
+        self.histograms = np.zeros((size, N_BUCKETS), dtype=np.int64)
+        self.reviews = 0
+
+    def _grow(self, max_place_id: int) -> None:
+        size = max(max_place_id + 1, 2 * len(self.sums))
+        extra = size - len(self.sums)
+        self.sums = np.concatenate([self.sums, np.zeros(extra)])
+        self.counts = np.concatenate([self.counts, np.zeros(extra, dtype=np.int64)])
+        self.histograms = np.concatenate(
+            [self.histograms, np.zeros((extra, N_BUCKETS), dtype=np.int64)]
+        )
+
+    def add_chunk(self, place_ids: np.ndarray, ratings: np.ndarray) -> None:
+        """
+        Adds one chunk of reviews. `place_ids` must be sorted (runs of a place
+        may continue in the next chunk).
+        """
+        if len(place_ids) == 0:
+            return
+        if place_ids[-1] >= len(self.sums):
+            self._grow(int(place_ids[-1]))
+
+        starts = np.flatnonzero(np.r_[True, place_ids[1:] != place_ids[:-1]])
+        group_ids = place_ids[starts]
+        group_sizes = np.diff(np.r_[starts, len(place_ids)])
+        # Same rounding as utils.ratings.rating_bucket
+        buckets = np.clip(np.rint(ratings * 2).astype(np.int64) - 1, 0, N_BUCKETS - 1)
+        group_of_row = np.repeat(np.arange(len(group_ids)), group_sizes)
+
+        # group_ids are unique within the chunk, so fancy-indexed += is safe
+        self.sums[group_ids] += np.add.reduceat(ratings, starts)
+        self.counts[group_ids] += group_sizes
+        self.histograms[group_ids] += np.bincount(
+            group_of_row * N_BUCKETS + buckets, minlength=len(group_ids) * N_BUCKETS
+        ).reshape(-1, N_BUCKETS)
+        self.reviews += len(place_ids)
+
+    def averages(self) -> np.ndarray:
+        return np.divide(
+            self.sums,
+            self.counts,
+            out=np.zeros_like(self.sums),
+            where=self.counts > 0,
+        )
+
+
+def accumulate_ratings(
+    db: Session, max_place_id: int = 0, chunk_size: int = 1_000_000
+) -> RatingAccumulator:
+    """Streams every `(place_id, rating)` in place-id order into an accumulator."""
+    accumulator = RatingAccumulator(max_place_id)
+    # Core execution on the session's connection skips ORM row processing
+    result = db.connection().execute(
+        select(Review.place_id, Review.rating)
+        .order_by(Review.place_id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for rows in result.partitions():
+        place_ids, ratings = zip(*rows)
+        accumulator.add_chunk(
+            np.fromiter(place_ids, dtype=np.int64, count=len(rows)),
+            np.fromiter(ratings, dtype=np.float64, count=len(rows)),
+        )
+    return accumulator
+
+
+def _write_batch(db: Session, values: Dict[str, Any]) -> None:
+    columns = ["rating_sum", "rating_count", "average_rating"]
+    columns += RATING_HISTOGRAM_COLUMNS
+    if db.get_bind().dialect.name == "postgresql":
+        # One UPDATE ... FROM unnest(arrays) statement per batch
+        types = ["double precision", "integer", "double precision"]
+        types += ["integer"] * N_BUCKETS
+        unnest = ", ".join(
+            f"CAST(:{c} AS {t}[])"
+            for c, t in zip(["id"] + columns, ["integer"] + types)
+        )
+        assignments = ", ".join(f"{c} = v.{c}" for c in columns)
+        db.execute(
+            text(
+                f"UPDATE places AS p SET {assignments} "
+                f"FROM unnest({unnest}) AS v(id, {', '.join(columns)}) "
+                "WHERE p.id = v.id"
+            ),
+            values,
+        )
+    else:
+        # Executemany of one UPDATE by primary key
+        table = Place.__table__
+        new_columns = [f"new_{column}" for column in columns]
+        params = [
+            {"place_id": row[0], **dict(zip(new_columns, row[1:]))}
+            for row in zip(values["id"], *(values[c] for c in columns))
+        ]
+        db.connection().execute(
+            update(table)
+            .where(table.c.id == bindparam("place_id"))
+            .values({c: bindparam(n) for c, n in zip(columns, new_columns)}),
+            params,
+        )
+
+
+def recompute_place_ratings(
+    db: Session, chunk_size: int = 1_000_000, batch_size: int = 10_000
+) -> Dict[str, Any]:
+    """
+    Recomputes rating_sum, rating_count, average_rating, the histogram and the
+    ranking score of every place from the reviews table, and returns throughput
+    figures.
+    On PostgreSQL the reviews table is locked against writes (SHARE mode) for the
+    duration, so no review write can slip between the scan and the UPDATEs;
+    reads are not blocked. Pending write-behind deltas are discarded with the
+    same locking (see crud_place.lock_rating_deltas).
+    """
+    started = time.perf_counter()
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE reviews IN SHARE MODE"))
+    crud_place.lock_rating_deltas(db)
+    place_ids = np.fromiter(
+        db.execute(select(Place.id).order_by(Place.id)).scalars(), dtype=np.int64
+    )
+    max_place_id = int(place_ids[-1]) if len(place_ids) else 0
+    accumulator = accumulate_ratings(db, max_place_id, chunk_size=chunk_size)
+    scanned = time.perf_counter()
+
+    averages = accumulator.averages()
+    for start in range(0, len(place_ids), batch_size):
+        ids = place_ids[start : start + batch_size]
+        values: Dict[str, Any] = {
+            "id": ids.tolist(),
+            "rating_sum": accumulator.sums[ids].tolist(),
+            "rating_count": accumulator.counts[ids].tolist(),
+            "average_rating": averages[ids].tolist(),
+        }
+        histograms = accumulator.histograms[ids]
+        for bucket, column in enumerate(RATING_HISTOGRAM_COLUMNS):
+            values[column] = histograms[:, bucket].tolist()
+        _write_batch(db, values)
+    db.execute(
+        update(Place)
+        .values(
+            ranking_score=ranking_score_expression(Place.rating_sum, Place.rating_count)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    crud_place.discard_rating_deltas(db)
+    db.commit()
+    place_cache.clear()  # Every cached place detail may be out of date now
+    finished = time.perf_counter()
+
+    seconds = finished - started
+    return {
+        "reviews": accumulator.reviews,
+        "places": len(place_ids),
+        "scan_seconds": scanned - started,
+        "write_seconds": finished - scanned,
+        "seconds": seconds,
+        "reviews_per_second": accumulator.reviews / seconds if seconds > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from ..db.database import SessionLocal
+
+    parser = argparse.ArgumentParser(
+        description="Recompute the rating aggregates of every place."
+    )
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        result = recompute_place_ratings(
+            session, chunk_size=args.chunk_size, batch_size=args.batch_size
+        )
+        print(
+            f"Recomputed {result['places']} places from {result['reviews']} reviews "
+            f"in {result['seconds']:.2f}s (scan {result['scan_seconds']:.2f}s, "
+            f"write {result['write_seconds']:.2f}s, "
+            f"{result['reviews_per_second']:,.0f} reviews/s)"
+        )
+    finally:
+        session.close()
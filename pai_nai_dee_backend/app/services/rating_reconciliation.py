@@ -0,0 +1,186 @@
+"""
+Batch reconciliation of the denormalized rating aggregates on `places`
+(rating_sum, rating_count, average_rating and the half-star histogram) against
+the `reviews` table.
+
+The aggregates are maintained incrementally by the review writes, so they should
+never drift; this job verifies that, and with `repair=True` rewrites the places
+that did drift (e.g. after reviews were changed directly in the database):
+
+    python -m app.services.rating_reconciliation [--repair] [--batch-size N]
+
+Places are walked in primary-key batches, with one grouped query per batch over
+`reviews`, served by the ix_reviews_place_rating index. In write-behind mode a
+place's aggregates are compared after adding its pending deltas, and a repair
+deletes the deltas of the places it rewrites in the same transaction (their
+review changes are already in the rewritten totals).
+"""
+
+import logging
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from ..crud.crud_place import place as crud_place, ranking_score_expression
+from ..models.place import Place, RATING_HISTOGRAM_COLUMNS
+from ..models.review import Review
+from ..utils.ratings import rating_bucket
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_COLUMNS = ["rating_sum", "rating_count", "average_rating"]
+AGGREGATE_COLUMNS += RATING_HISTOGRAM_COLUMNS
+
+MAX_REPORTED_PLACE_IDS = 1000
+
+
+def empty_rating_aggregates() -> Dict[str, Any]:
+    aggregates: Dict[str, Any] = {"rating_sum": 0.0, "rating_count": 0}
+    aggregates.update((column, 0) for column in RATING_HISTOGRAM_COLUMNS)
+    aggregates["average_rating"] = 0.0
+    return aggregates
+
+
+def compute_rating_aggregates(
+    db: Session, first_place_id: int, last_place_id: int
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Computes the aggregate columns of every place in the id range from its
+    reviews, in one grouped query. Places without reviews are left out.
+    """
+    rows = (
+        db.query(Review.place_id, Review.rating, func.count(Review.id))
+        .filter(Review.place_id.between(first_place_id, last_place_id))
+        .group_by(Review.place_id, Review.rating)
+    )
+    result: Dict[int, Dict[str, Any]] = {}
+    for place_id, rating, count in rows:
+        aggregates = result.setdefault(place_id, empty_rating_aggregates())
+        aggregates["rating_sum"] += rating * count
+        aggregates["rating_count"] += count
+        aggregates[RATING_HISTOGRAM_COLUMNS[rating_bucket(rating)]] += count
+    for aggregates in result.values():
+        aggregates["average_rating"] = (
+            aggregates["rating_sum"] / aggregates["rating_count"]
+        )
+    return result
+
+
+def _with_pending(row: Any, delta: Optional[Sequence[float]]) -> Dict[str, Any]:
+    # The place's aggregates once its pending deltas (see
+    # crud_place.pending_rating_deltas) are applied
+    aggregates = {column: getattr(row, column) for column in AGGREGATE_COLUMNS}
+    if delta is not None:
+        columns = ["rating_sum", "rating_count", *RATING_HISTOGRAM_COLUMNS]
+        for column, value in zip(columns, delta):
+            aggregates[column] += value
+        count = aggregates["rating_count"]
+        aggregates["average_rating"] = (
+            aggregates["rating_sum"] / count if count > 0 else 0.0
+        )
+    return aggregates
+
+
+def _matches(current: Dict[str, Any], expected: Dict[str, Any]) -> bool:
+    return all(
+        math.isclose(current[column], value, abs_tol=1e-9)
+        for column, value in expected.items()
+    )
+
+
+def reconcile_place_ratings(
+    db: Session, batch_size: int = 1000, repair: bool = False
+) -> Dict[str, Any]:
+    """
+    Verifies the rating aggregates of every place against its reviews.
+    With `repair`, the place rows of each batch are locked (FOR UPDATE) while
+    they are checked, so review writes racing with the repair wait for it and
+    then apply their delta on top of the corrected values. In write-behind
+    mode, place_rating_deltas is locked instead for each batch (see
+    crud_place.lock_rating_deltas).
+    Returns counts of checked, mismatched and repaired places, plus (up to
+    MAX_REPORTED_PLACE_IDS of) the mismatched place ids.
+    """
+    report: Dict[str, Any] = {
+        "places_checked": 0,
+        "mismatched": 0,
+        "repaired": 0,
+        "mismatched_place_ids": [],
+    }
+    columns = [getattr(Place, column) for column in AGGREGATE_COLUMNS]
+    last_id = 0
+    while True:
+        query = (
+            db.query(Place.id, *columns)
+            .filter(Place.id > last_id)
+            .order_by(Place.id)
+            .limit(batch_size)
+        )
+        if repair:
+            query = query.with_for_update()
+        crud_place.lock_rating_deltas(db)
+        places = query.all()
+        if not places:
+            db.commit()
+            break
+
+        first_id, last_id = places[0].id, places[-1].id
+        expected = compute_rating_aggregates(db, first_id, last_id)
+        pending = crud_place.pending_rating_deltas(db, first_id, last_id)
+        repairs: List[Dict[str, Any]] = []
+        for row in places:
+            want = expected.get(row.id) or empty_rating_aggregates()
+            if not _matches(_with_pending(row, pending.get(row.id)), want):
+                report["mismatched"] += 1
+                if len(report["mismatched_place_ids"]) < MAX_REPORTED_PLACE_IDS:
+                    report["mismatched_place_ids"].append(row.id)
+                logger.warning(f"Rating aggregates of place {row.id} are out of date")
+                repairs.append({"id": row.id, **want})
+
+        if repair and repairs:
+            db.execute(update(Place), repairs)  # Bulk UPDATE by primary key
+            db.query(Place).filter(Place.id.in_([r["id"] for r in repairs])).update(
+                {
+                    Place.ranking_score: ranking_score_expression(
+                        Place.rating_sum, Place.rating_count
+                    )
+                },
+                synchronize_session=False,
+            )
+            crud_place.discard_rating_deltas(db, [r["id"] for r in repairs])
+        db.commit()  # One short transaction (and set of row locks) per batch
+        if repair:
+            for values in repairs:
+                crud_place.invalidate_cached_place(values["id"])
+            report["repaired"] += len(repairs)
+
+        report["places_checked"] += len(places)
+        last_id = places[-1].id
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from ..db.database import SessionLocal
+
+    parser = argparse.ArgumentParser(
+        description="Verify place rating aggregates against the reviews table."
+    )
+    parser.add_argument("--repair", action="store_true", help="Fix mismatches")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        result = reconcile_place_ratings(
+            session, batch_size=args.batch_size, repair=args.repair
+        )
+        print(
+            f"Checked {result['places_checked']} places: "
+            f"{result['mismatched']} mismatched, {result['repaired']} repaired"
+        )
+    finally:
+        session.close()
@@ -1,5 +1,11 @@
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 from fastapi import Depends  # Import Depends
+from typing import Any, Dict, Optional
+
+from ..models.itinerary import Itinerary
+from ..models.review import Review
+from ..models.user import User
 
 # from app import crud, schemas, models
 # from app.core.security import get_password_hash # Example import
@@ -24,18 +30,44 @@ class UserService:
     #
     #     return user
 
-    # Placeholder for future user-related business logic
-    def get_user_profile_details(self, user_id: int):
+    def get_user_profile_details(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Builds a user's public profile with their contribution counters. The
+        counters are stored on the user row and maintained by review and
+        itinerary writes, so this is a single primary-key lookup. Returns None
+        if the user does not exist.
+        """
+        user = self.db.get(User, user_id)
+        if user is None:
+            return None
+        return {
+            "id": user.id,
+            "username": user.username,
+            "review_count": user.review_count,
+            "itinerary_count": user.itinerary_count,
+            "average_rating_given": user.average_rating_given,
+        }
+
+    def recount_contributions(self) -> int:
         """
-        Example: Fetches user and formats a more complex profile,
-        potentially aggregating data from other services or models.
+        Recomputes every user's contribution counters from the reviews and
+        itineraries tables with one UPDATE, e.g. after adding the columns to an
+        existing database or a manual data fix. Returns the number of users.
         """
-        # user = crud.crud_user.get_user(self.db, user_id)
-        # if not user:
-        #     return None
-        # # ... more logic ...
-        # return {"username": user.username, "email": user.email, "total_reviews": len(user.reviews)}
-        pass
+        reviews = select(Review).where(Review.user_id == User.id)
+        result = self.db.execute(
+            update(User).values(
+                review_count=reviews.with_only_columns(func.count()).scalar_subquery(),
+                review_rating_sum=reviews.with_only_columns(
+                    func.coalesce(func.sum(Review.rating), 0.0)
+                ).scalar_subquery(),
+                itinerary_count=select(func.count())
+                .where(Itinerary.user_id == User.id)
+                .scalar_subquery(),
+            )
+        )
+        self.db.commit()
+        return result.rowcount
 
 
 def get_user_service(db: Session = Depends(lambda: None)) -> UserService:  # type: ignore
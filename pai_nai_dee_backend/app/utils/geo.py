@@ -0,0 +1,35 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """
+    Great-circle distance in kilometres between points given in degrees.
+    Arguments broadcast like NumPy arrays, so one point against an array of
+    points, or a column against a row (a full distance matrix), both work.
+    """
+    lat1, lng1, lat2, lng2 = (
+        np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2.0) ** 2
+    )
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def equirectangular_sq_degrees(lat, lng, lat2, lng2) -> np.ndarray:
+    """
+    Squared distance in degrees of latitude from the point (`lat`, `lng`) to
+    points given in degrees, on a plane tangent at `lat` (longitudes scaled by
+    its cosine). Accurate enough for ordering and filtering nearby places, and
+    the metric crud_place.build_places_query evaluates in SQL, so listings
+    served from the place catalog match the database. Compare it with
+    `(radius_km / KM_PER_DEGREE_LAT) ** 2`.
+    """
+    lng_scale = np.cos(np.radians(lat))
+    dy = np.asarray(lat2, dtype=np.float64) - lat
+    dx = (np.asarray(lng2, dtype=np.float64) - lng) * lng_scale
+    return dx * dx + dy * dy
@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Tuple
+
+# Response header carrying the cursor of the next page of a keyset-paginated list
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode(sort_key: List[Any]) -> str:
+    payload = json.dumps(sort_key, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> Any:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """
+    Opaque cursor for keyset pagination on (created_at DESC, id DESC): the sort
+    key of the last row of a page, which the next page starts after.
+    """
+    return _encode([created_at.isoformat(), id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of `encode_cursor`. Raises ValueError for malformed cursors."""
+    try:
+        created_at, id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(id)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+
+
+def encode_rank_cursor(rank: float, id: int) -> str:
+    """Like `encode_cursor`, for results ordered by (rank DESC, id DESC)."""
+    return _encode([rank, id])  # JSON keeps every bit of the float
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    """Inverse of `encode_rank_cursor`. Raises ValueError for malformed cursors."""
+    try:
+        rank, id = _decode(cursor)
+        return float(rank), int(id)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
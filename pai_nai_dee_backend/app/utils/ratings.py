@@ -0,0 +1,7 @@
+# Ratings go from 0.5 to 5.0 in half-star steps, i.e. ten histogram buckets
+RATING_BUCKETS = [f"{i / 2:.1f}" for i in range(1, 11)]
+
+
+def rating_bucket(rating: float) -> int:
+    """Index (0-9) of the half-star bucket a rating falls into."""
+    return min(max(int(round(rating * 2)) - 1, 0), len(RATING_BUCKETS) - 1)
@@ -0,0 +1,146 @@
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Longest run of consecutive points an Or-opt move relocates
+OR_OPT_MAX_SEGMENT = 3
+_EPSILON = 1e-9
+
+
+def path_length(distances: np.ndarray, order: List[int]) -> float:
+    """Length of the open path visiting `order` (indexes into `distances`)."""
+    if len(order) < 2:
+        return 0.0
+    return float(distances[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbor_path(distances: np.ndarray, start: int = 0) -> List[int]:
+    """Open path from `start` that always goes on to the nearest unvisited point."""
+    n = len(distances)
+    visited = np.zeros(n, dtype=bool)
+    order = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, distances[order[-1]])
+        order.append(int(row.argmin()))
+        visited[order[-1]] = True
+    return order
+
+
+def _best_two_opt(legs: np.ndarray, first: int) -> Tuple[float, int, int]:
+    # Best move reversing path[i..j] (first <= i < j), as (change of length,
+    # i, j). `legs` is the distance matrix in path order: legs[k, k + 1] is the
+    # k-th leg. After the reversal the leg into the segment goes to path[j]
+    # and the leg out of it comes from path[i]
+    n = len(legs)
+    leg_lengths = np.diagonal(legs, 1)
+    delta = np.zeros((n, n))
+    delta[1:, :] += legs[:-1, :] - leg_lengths[:, None]
+    delta[:, :-1] += legs[:, 1:] - leg_lengths[None, :]
+    delta[np.tril_indices(n)] = np.inf
+    delta[:first] = np.inf
+    i, j = divmod(int(delta.argmin()), n)
+    return float(delta[i, j]), i, j
+
+
+def _best_or_opt(
+    legs: np.ndarray, first: int, size: int
+) -> Tuple[float, int, int, bool]:
+    # Best move taking the `size` points path[s..s + size - 1] out and putting
+    # them back (reversed or not) elsewhere, as (change of length, s, k,
+    # reversed): between path[k] and path[k + 1], or after the last point for
+    # k = n - 1, or before the first point for k = -1
+    n = len(legs)
+    starts = np.arange(first, n - size + 1)
+    ends = starts + size - 1
+    if len(starts) == 0:
+        return np.inf, 0, 0, False
+    leg_lengths = np.diagonal(legs, 1)
+    # Length saved by taking the segment out, joining its neighbors
+    saved = np.zeros(len(starts))
+    has_prev = starts > 0
+    has_next = ends < n - 1
+    saved[has_prev] += leg_lengths[starts[has_prev] - 1]
+    saved[has_next] += leg_lengths[ends[has_next]]
+    both = has_prev & has_next
+    saved[both] -= legs[starts[both] - 1, ends[both] + 1]
+
+    best = (np.inf, 0, 0, False)
+    for reverse in (False, True):
+        head, tail = (ends, starts) if reverse else (starts, ends)
+        # Columns: legs k = 0 .. n - 2, then after the last point, then before
+        # the first point
+        added = np.full((len(starts), n + 1), np.inf)
+        added[:, : n - 1] = legs[:-1, head].T + legs[tail, 1:] - leg_lengths[None, :]
+        added[:, n - 1] = legs[n - 1, head]
+        if first == 0:
+            added[:, n] = legs[tail, 0]
+        # Legs touching the segment, and the ends it is already at
+        k = np.arange(n + 1)
+        touching = (k[None, :] >= starts[:, None] - 1) & (k[None, :] <= ends[:, None])
+        added[touching] = np.inf
+        added[~has_next, n - 1] = np.inf
+        added[~has_prev, n] = np.inf
+        delta = added - saved[:, None]
+        row, column = divmod(int(delta.argmin()), n + 1)
+        if delta[row, column] < best[0]:
+            k = -1 if column == n else column
+            best = (float(delta[row, column]), int(starts[row]), k, reverse)
+    return best
+
+
+def improve_path(
+    distances: np.ndarray,
+    order: List[int],
+    keep_start: bool = True,
+    deadline: Optional[float] = None,
+) -> Tuple[List[int], bool]:
+    """
+    Shortens the open path `order` with 2-opt moves (reversing a stretch of
+    it) and Or-opt moves (moving up to OR_OPT_MAX_SEGMENT consecutive points
+    elsewhere) until no move shortens it, or until time.perf_counter()
+    reaches `deadline`. Each round scores every possible move at once with
+    NumPy and applies the best one. Returns the path and whether no move was
+    left.
+    """
+    order = np.asarray(order)
+    n = len(order)
+    first = 1 if keep_start else 0
+    while n > 2:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return order.tolist(), False
+        legs = distances[np.ix_(order, order)]
+        delta, i, j = _best_two_opt(legs, first)
+        move = None
+        for size in range(1, min(OR_OPT_MAX_SEGMENT, n - first - 1) + 1):
+            or_delta, s, k, reverse = _best_or_opt(legs, first, size)
+            if or_delta < delta:
+                delta, move = or_delta, (s, size, k, reverse)
+        if delta >= -_EPSILON:
+            break
+        if move is None:
+            order[i : j + 1] = order[i : j + 1][::-1]
+            continue
+        s, size, k, reverse = move
+        segment = order[s : s + size][::-1] if reverse else order[s : s + size]
+        rest = np.concatenate((order[:s], order[s + size :]))
+        at = 0 if k == -1 else (k + 1 if k < s else k - size + 1)
+        order = np.concatenate((rest[:at], segment, rest[at:]))
+    return order.tolist(), True
+
+
+def optimize_path(
+    distances: np.ndarray, keep_start: bool = True, time_budget: float = 0.2
+) -> Tuple[List[int], bool]:
+    """
+    A short open path through all points of the square `distances` matrix:
+    nearest neighbor from point 0, then improve_path within `time_budget`
+    seconds. With `keep_start` the path starts at point 0. Returns the order
+    of the points and whether the improvement finished within the budget.
+    """
+    deadline = time.perf_counter() + time_budget
+    if len(distances) == 0:
+        return [], True
+    order = nearest_neighbor_path(distances)
+    return improve_path(distances, order, keep_start=keep_start, deadline=deadline)
@@ -0,0 +1,42 @@
+import re
+from typing import List, Optional
+
+# Runs of Thai script (letters and their combining vowel and tone marks), and
+# words of any other script
+_TOKEN = re.compile(r"[\u0E00-\u0E7F]+|[^\W\u0E00-\u0E7F]+")
+_THAI_BASE = 0x0E00
+_LETTERS = "abcdefghijklmnop"
+
+
+def _encode_thai(chars: str) -> str:
+    # Two letters a-p per character of the Thai block, so that full-text search
+    # parsers (PostgreSQL's, SQLite FTS5's) keep the token as a single word
+    return "th" + "".join(
+        _LETTERS[(ord(c) - _THAI_BASE) >> 4] + _LETTERS[(ord(c) - _THAI_BASE) & 15]
+        for c in chars
+    )
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Search tokens of `text`: lowercased words, and for Thai, which is written
+    without spaces between words, the overlapping three-character runs
+    (trigrams), so that a Thai query matches inside longer text. Thai queries
+    shorter than three characters only match the same short run.
+    """
+    tokens = []
+    for run in _TOKEN.findall(text.lower()):
+        if _THAI_BASE <= ord(run[0]) <= _THAI_BASE + 0x7F:
+            tokens.extend(
+                _encode_thai(run[i : i + 3]) for i in range(max(len(run) - 2, 1))
+            )
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def search_tokens(text: Optional[str]) -> Optional[str]:
+    """What the review search indexes for a comment: its tokens joined by spaces."""
+    if text is None:
+        return None
+    return " ".join(tokenize(text))
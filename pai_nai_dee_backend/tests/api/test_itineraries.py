@@ -0,0 +1,331 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ...app.core.config import settings
+from ...app.core.security import create_access_token
+from ...app.crud.crud_itinerary import template_cache
+from ...app.models.place import Place
+from ...app.models.user import User
+
+
+def _auth_headers(db: Session, username: str):
+    user = User(username=username, hashed_password="pw")
+    db.add(user)
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def _create_places(db: Session, n: int):
+    places = [Place(name=f"Stop {i}", latitude=18.7, longitude=98.9) for i in range(n)]
+    db.add_all(places)
+    db.commit()
+    return [place.id for place in places]
+
+
+class _StatementCounter:
+    def __init__(self, db: Session):
+        self.engine = db.get_bind().engine
+        self.statements = []
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self.statements
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+
+@pytest.mark.asyncio
+async def test_itinerary_place_validation_is_one_query(
+    client: AsyncClient, db: Session
+):
+    headers = _auth_headers(db, "trip_planner")
+    url = f"{settings.API_V1_STR}/itineraries/"
+
+    counts = []
+    for n in (3, 30):
+        place_ids = _create_places(db, n)
+        with _StatementCounter(db) as statements:
+            response = await client.post(
+                url,
+                json={"name": f"{n} stops", "place_ids": place_ids},
+                headers=headers,
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+        place_selects = [s for s in statements if s.startswith("SELECT places.")]
+        assert len(place_selects) == 1
+        counts.append(len(statements))
+
+        itinerary_id = response.json()["id"]
+        with _StatementCounter(db) as statements:
+            response = await client.put(
+                f"{url}{itinerary_id}",
+                json={"name": "Reversed", "place_ids": place_ids[::-1]},
+                headers=headers,
+            )
+        assert response.status_code == status.HTTP_200_OK
+        place_selects = [s for s in statements if s.startswith("SELECT places.")]
+        assert len(place_selects) == 1
+        assert [s["place_id"] for s in response.json()["stops"]] == place_ids[::-1]
+        counts.append(len(statements))
+    # The same number of statements whatever the number of stops
+    assert counts[:2] == counts[2:]
+
+
+@pytest.mark.asyncio
+async def test_itinerary_missing_places_reported_together(
+    client: AsyncClient, db: Session
+):
+    headers = _auth_headers(db, "careless_planner")
+    place_ids = _create_places(db, 2)
+    response = await client.post(
+        f"{settings.API_V1_STR}/itineraries/",
+        json={"name": "Typos", "place_ids": [999998, place_ids[0], 999999, 999998]},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert "[999998, 999999]" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_itinerary_stops_keep_their_order(client: AsyncClient, db: Session):
+    headers = _auth_headers(db, "day_planner")
+    place_ids = _create_places(db, 3)
+    url = f"{settings.API_V1_STR}/itineraries/"
+    stops = [
+        {"place_id": place_ids[2], "day": 1, "notes": "Sunrise"},
+        {"place_id": place_ids[0], "day": 1, "notes": None},
+        {"place_id": place_ids[1], "day": 2, "notes": "Night market"},
+    ]
+
+    response = await client.post(
+        url, json={"name": "Two days", "stops": stops}, headers=headers
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["stops"] == stops
+    itinerary_id = response.json()["id"]
+
+    stops = [stops[1], stops[2]]
+    response = await client.put(
+        f"{url}{itinerary_id}",
+        json={"name": "Two days", "stops": stops},
+        headers=headers,
+    )
+    assert response.json()["stops"] == stops
+    response = await client.get(f"{url}{itinerary_id}", headers=headers)
+    stops_read = response.json()["stops"]
+    assert [stop.pop("place")["id"] for stop in stops_read] == [
+        stop["place_id"] for stop in stops
+    ]
+    assert stops_read == stops
+
+    repeated = [stops[0], stops[0]]
+    response = await client.post(
+        url, json={"name": "Twice", "stops": repeated}, headers=headers
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_optimize_itinerary(client: AsyncClient, db: Session):
+    headers = _auth_headers(db, "zigzag_planner")
+    places = [
+        Place(name=f"Soi {i}", latitude=18.78, longitude=98.98 + i / 100)
+        for i in range(4)
+    ]
+    db.add_all(places)
+    db.commit()
+    place_ids = [places[i].id for i in (0, 2, 1, 3)]
+    url = f"{settings.API_V1_STR}/itineraries/"
+    response = await client.post(
+        url, json={"name": "Zigzag", "place_ids": place_ids}, headers=headers
+    )
+    itinerary_id = response.json()["id"]
+
+    response = await client.post(f"{url}{itinerary_id}/optimize", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    route = response.json()
+    assert [s["place_id"] for s in route["stops"]] == [p.id for p in places]
+    assert route["total_distance_km"] < route["previous_distance_km"]
+    response = await client.get(f"{url}{itinerary_id}", headers=headers)
+    assert [s["place_id"] for s in response.json()["stops"]] == [p.id for p in places]
+
+    other = _auth_headers(db, "nosy_planner")
+    response = await client.post(f"{url}{itinerary_id}/optimize", headers=other)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_itineraries_embed_places_in_fixed_queries(
+    client: AsyncClient, db: Session
+):
+    headers = _auth_headers(db, "collector")
+    url = f"{settings.API_V1_STR}/itineraries/"
+    itinerary_ids = []
+    for n in (2, 5, 8):
+        response = await client.post(
+            url,
+            json={"name": f"{n} stops", "place_ids": _create_places(db, n)},
+            headers=headers,
+        )
+        itinerary_ids.append(response.json()["id"])
+    db.expire_all()  # Nothing already in the session
+
+    counts = []
+    for itinerary_id in itinerary_ids:
+        with _StatementCounter(db) as statements:
+            response = await client.get(f"{url}{itinerary_id}", headers=headers)
+        stops = response.json()["stops"]
+        assert all(stop["place"]["id"] == stop["place_id"] for stop in stops)
+        counts.append(len(statements))
+    assert len(set(counts)) == 1
+
+    counts = []
+    for limit in (1, 3):
+        with _StatementCounter(db) as statements:
+            response = await client.get(
+                f"{url}my-itineraries",
+                params={"expand": "places", "limit": limit},
+                headers=headers,
+            )
+        itineraries = response.json()
+        assert len(itineraries) == limit
+        for itinerary in itineraries:
+            assert all(s["place"]["id"] == s["place_id"] for s in itinerary["stops"])
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+    response = await client.get(f"{url}my-itineraries", headers=headers)
+    assert [len(i["stops"]) for i in response.json()] == [2, 5, 8]
+    assert all(stop["place"] is None for stop in response.json()[2]["stops"])
+
+
+@pytest.mark.asyncio
+async def test_add_and_remove_itinerary_place(client: AsyncClient, db: Session):
+    headers = _auth_headers(db, "stop_editor")
+    place_ids = _create_places(db, 2)
+    url = f"{settings.API_V1_STR}/itineraries/"
+    response = await client.post(
+        url, json={"name": "Edited", "place_ids": place_ids[:1]}, headers=headers
+    )
+    stops_url = f"{url}{response.json()['id']}/places"
+
+    with _StatementCounter(db) as add_statements:
+        response = await client.post(f"{stops_url}/{place_ids[1]}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [s["place_id"] for s in response.json()["stops"]] == place_ids
+    response = await client.post(f"{stops_url}/{place_ids[1]}", headers=headers)
+    assert [s["place_id"] for s in response.json()["stops"]] == place_ids
+    with _StatementCounter(db) as remove_statements:
+        response = await client.delete(f"{stops_url}/{place_ids[0]}", headers=headers)
+    assert [s["place_id"] for s in response.json()["stops"]] == place_ids[1:]
+    response = await client.delete(f"{stops_url}/{place_ids[0]}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.post(f"{stops_url}/999999", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await client.post(f"{url}999999/places/{place_ids[0]}", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    other = _auth_headers(db, "stop_vandal")
+    response = await client.delete(f"{stops_url}/{place_ids[1]}", headers=other)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    # Returning the itinerary takes as many statements whatever its size
+    many_ids = _create_places(db, 31)
+    response = await client.post(
+        url, json={"name": "Long", "place_ids": many_ids[:30]}, headers=headers
+    )
+    stops_url = f"{url}{response.json()['id']}/places"
+    with _StatementCounter(db) as statements:
+        response = await client.post(f"{stops_url}/{many_ids[30]}", headers=headers)
+    assert [s["place_id"] for s in response.json()["stops"]] == many_ids
+    assert len(statements) == len(add_statements)
+    with _StatementCounter(db) as statements:
+        response = await client.delete(f"{stops_url}/{many_ids[0]}", headers=headers)
+    assert len(response.json()["stops"]) == 30
+    assert len(statements) == len(remove_statements)
+
+
+@pytest.mark.asyncio
+async def test_clone_itinerary_in_fixed_statements(client: AsyncClient, db: Session):
+    headers = _auth_headers(db, "copycat")
+    url = f"{settings.API_V1_STR}/itineraries/"
+
+    counts = []
+    for n in (2, 40):
+        stops = [
+            {"place_id": place_id, "day": 1 + i % 2, "notes": f"Stop {i}"}
+            for i, place_id in enumerate(_create_places(db, n))
+        ]
+        response = await client.post(
+            url, json={"name": f"{n} stops", "stops": stops}, headers=headers
+        )
+        itinerary_id = response.json()["id"]
+        with _StatementCounter(db) as statements:
+            response = await client.post(f"{url}{itinerary_id}/clone", headers=headers)
+        assert response.status_code == status.HTTP_201_CREATED
+        clone = response.json()
+        assert clone["id"] != itinerary_id
+        assert clone["name"] == f"{n} stops"
+        assert clone["stops"] == stops
+        counts.append(len(statements))
+    # The same number of statements whatever the number of stops
+    assert counts[0] == counts[1]
+
+    other = _auth_headers(db, "plagiarist")
+    response = await client.post(f"{url}{itinerary_id}/clone", headers=other)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = await client.post(f"{url}999999/clone", headers=other)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_itinerary_templates(client: AsyncClient, db: Session):
+    template_cache.clear()
+    author = _auth_headers(db, "template_author")
+    place_ids = _create_places(db, 3)
+    url = f"{settings.API_V1_STR}/itineraries/"
+    response = await client.post(
+        url,
+        json={"name": "Old City walk", "place_ids": place_ids, "is_template": True},
+        headers=author,
+    )
+    template_id = response.json()["id"]
+    await client.post(url, json={"name": "Private", "place_ids": []}, headers=author)
+
+    response = await client.get(f"{url}templates")
+    assert response.status_code == status.HTTP_200_OK
+    assert [t["id"] for t in response.json()] == [template_id]
+    stops = response.json()[0]["stops"]
+    assert [s["place"]["id"] for s in stops] == place_ids
+    with _StatementCounter(db) as statements:
+        response = await client.get(f"{url}templates")
+    assert statements == []  # Served from the cache
+    assert [t["id"] for t in response.json()] == [template_id]
+
+    # Anyone can clone a template; the copy is not one
+    headers = _auth_headers(db, "template_user")
+    response = await client.post(f"{url}{template_id}/clone", headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["is_template"] is False
+    assert [s["place_id"] for s in response.json()["stops"]] == place_ids
+
+    # Changes to a template show in the listing at once
+    response = await client.delete(
+        f"{url}{template_id}/places/{place_ids[0]}", headers=author
+    )
+    response = await client.get(f"{url}templates")
+    assert [s["place_id"] for s in response.json()[0]["stops"]] == place_ids[1:]
+    await client.put(
+        f"{url}{template_id}",
+        json={"name": "Old City walk", "is_template": False},
+        headers=author,
+    )
+    response = await client.get(f"{url}templates")
+    assert response.json() == []
@@ -0,0 +1,79 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ...app.core.config import settings
+from ...app.crud import crud_review
+from ...app.models.place import Place
+from ...app.models.user import User
+from ...app.schemas.review import ReviewCreate
+
+
+def _create_place_with_reviews(db: Session, ratings):
+    place = Place(name="Wat Phra Singh", category="Temple")
+    db.add(place)
+    db.commit()
+    for i, rating in enumerate(ratings):
+        user = User(username=f"summary_user_{i}", hashed_password="pw")
+        db.add(user)
+        db.commit()
+        crud_review.create_review(
+            db,
+            review_in=ReviewCreate(place_id=place.id, rating=rating),
+            user_id=user.id,
+        )
+    return place
+
+
+@pytest.mark.asyncio
+async def test_place_summary(client: AsyncClient, db: Session):
+    """
+    The summary returns the place, review count, histogram and latest reviews
+    with author usernames, using a fixed number of queries.
+    """
+    place_id = _create_place_with_reviews(db, [5.0, 4.5, 5.0, 1.0]).id
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        response = await client.get(
+            f"{settings.API_V1_STR}/places/{place_id}/summary?reviews_limit=3"
+        )
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert response.status_code == status.HTTP_200_OK
+    summary = response.json()
+    assert summary["place"]["id"] == place_id
+    assert summary["review_count"] == 4
+    assert summary["rating_histogram"]["5.0"] == 2
+    assert summary["rating_histogram"]["4.5"] == 1
+    assert summary["rating_histogram"]["1.0"] == 1
+    assert len(summary["latest_reviews"]) == 3
+    assert all(r["author_username"] for r in summary["latest_reviews"])
+    # One query for place + histogram, one for reviews with authors eager-loaded
+    assert len(statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_place_detail_includes_rating_histogram(client: AsyncClient, db: Session):
+    place_id = _create_place_with_reviews(db, [5.0, 4.5, 5.0]).id
+
+    response = await client.get(f"{settings.API_V1_STR}/places/{place_id}")
+
+    assert response.status_code == status.HTTP_200_OK
+    place = response.json()
+    assert place["rating_count"] == 3
+    assert place["average_rating"] == pytest.approx(14.5 / 3)
+    assert place["rating_histogram"]["5.0"] == 2
+    assert place["rating_histogram"]["4.5"] == 1
+    assert sum(place["rating_histogram"].values()) == 3
+
+
+@pytest.mark.asyncio
+async def test_place_summary_not_found(client: AsyncClient):
+    response = await client.get(f"{settings.API_V1_STR}/places/999999/summary")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
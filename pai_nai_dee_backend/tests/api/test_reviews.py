@@ -0,0 +1,438 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ...app.core.config import settings
+from ...app.core.security import create_access_token
+from ...app.crud import crud_review
+from ...app.crud.crud_review import (
+    DuplicateReviewError,
+    recent_reviews,
+    review_events,
+    review_fingerprints,
+)
+from ...app.models.place import Place
+from ...app.models.review import Review
+from ...app.models.user import User
+from ...app.schemas.review import ReviewCreate, ReviewUpdate
+
+
+def _create_reviews(db: Session, n: int):
+    """`n` reviews of one place, in pairs sharing a created_at (ties broken by id)."""
+    place = Place(name="Doi Suthep", category="Temple")
+    users = [User(username=f"paging_user_{i}", hashed_password="pw") for i in range(n)]
+    db.add_all([place, *users])
+    db.commit()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    reviews = [
+        Review(
+            place_id=place.id,
+            user_id=user.id,
+            rating=4.0,
+            created_at=start + timedelta(minutes=i // 2),
+        )
+        for i, user in enumerate(users)
+    ]
+    db.add_all(reviews)
+    db.commit()
+    newest_first = sorted(reviews, key=lambda r: (r.created_at, r.id), reverse=True)
+    return place.id, [r.id for r in newest_first]
+
+
+@pytest.mark.asyncio
+async def test_reviews_for_place_keyset_pages(client: AsyncClient, db: Session):
+    place_id, expected_ids = _create_reviews(db, 7)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get(
+            f"{settings.API_V1_STR}/reviews/place/{place_id}", params=params
+        )
+        assert response.status_code == status.HTTP_200_OK
+        seen += [review["id"] for review in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert seen == expected_ids
+    assert pages == 3
+
+
+@pytest.mark.asyncio
+async def test_reviews_for_place_deprecated_skip(client: AsyncClient, db: Session):
+    place_id, expected_ids = _create_reviews(db, 5)
+    url = f"{settings.API_V1_STR}/reviews/place/{place_id}"
+
+    response = await client.get(url, params={"skip": 2, "limit": 2})
+    assert [review["id"] for review in response.json()] == expected_ids[2:4]
+    cursor = response.headers["X-Next-Cursor"]
+
+    # Ignored once paging by cursor
+    response = await client.get(url, params={"skip": 2, "cursor": cursor})
+    assert [review["id"] for review in response.json()] == expected_ids[4:]
+
+
+@pytest.mark.asyncio
+async def test_reviews_for_place_invalid_cursor(client: AsyncClient, db: Session):
+    place_id, _ = _create_reviews(db, 1)
+    response = await client.get(
+        f"{settings.API_V1_STR}/reviews/place/{place_id}?cursor=not-a-cursor"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_upsert_review_for_place(client: AsyncClient, db: Session):
+    user = User(username="upserting_reviewer", hashed_password="pw")
+    place = Place(name="Nimman Cafe", category="Cafe")
+    db.add_all([user, place])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user.username})}"}
+    url = f"{settings.API_V1_STR}/reviews/place/{place.id}"
+
+    created = await client.put(url, json={"rating": 3.5}, headers=headers)
+    assert created.status_code == status.HTTP_201_CREATED
+    updated = await client.put(
+        url, json={"rating": 5.0, "comment": "Changed my mind"}, headers=headers
+    )
+    assert updated.status_code == status.HTTP_200_OK
+    assert updated.json()["id"] == created.json()["id"]
+    assert updated.json()["rating"] == 5.0
+
+    response = await client.get(f"{settings.API_V1_STR}/places/{place.id}")
+    assert response.json()["rating_count"] == 1
+    assert response.json()["average_rating"] == 5.0
+
+    missing = await client.put(
+        f"{settings.API_V1_STR}/reviews/place/999999",
+        json={"rating": 3.5},
+        headers=headers,
+    )
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_reviews_by_user_newest_first(db: Session):
+    place_id, _ = _create_reviews(db, 2)
+    user = User(username="prolific_reviewer", hashed_password="pw")
+    places = [Place(name=f"Reviewed Place {i}") for i in range(3)]
+    db.add_all([user, *places])
+    db.commit()
+    for i, place in enumerate(places):
+        db.add(
+            Review(
+                place_id=place.id,
+                user_id=user.id,
+                rating=5.0,
+                created_at=datetime(2024, 2, 1 + i, tzinfo=timezone.utc),
+            )
+        )
+    db.commit()
+
+    first = crud_review.get_reviews_by_user(db, user_id=user.id, limit=2)
+    assert [r.place_id for r in first] == [places[2].id, places[1].id]
+    rest = crud_review.get_reviews_by_user(
+        db, user_id=user.id, limit=2, before=(first[-1].created_at, first[-1].id)
+    )
+    assert [r.place_id for r in rest] == [places[0].id]
+
+
+@pytest.mark.asyncio
+async def test_recent_reviews_feed(client: AsyncClient, db: Session):
+    recent_reviews.clear()
+    temple = Place(
+        name="Wat Phra Singh", category="Temple", latitude=18.788, longitude=98.982
+    )
+    market = Place(
+        name="Chatuchak", category="Market", latitude=13.800, longitude=100.550
+    )
+    users = [User(username=f"feed_user_{i}", hashed_password="pw") for i in range(3)]
+    db.add_all([temple, market, *users])
+    db.commit()
+    reviews = [
+        crud_review.create_review(
+            db,
+            review_in=ReviewCreate(place_id=place.id, rating=4.0, comment="x" * 1000),
+            user_id=user.id,
+        )
+        for user, place in zip(users, [temple, market, temple])
+    ]
+    url = f"{settings.API_V1_STR}/reviews/recent"
+
+    response = await client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    feed = response.json()
+    assert [r["id"] for r in feed] == [r.id for r in reversed(reviews)]
+    assert feed[0]["place_name"] == "Wat Phra Singh"
+    assert feed[0]["author_username"] == "feed_user_2"
+    assert len(feed[0]["comment"]) == settings.RECENT_REVIEWS_COMMENT_CHARS
+
+    response = await client.get(url, params={"category": "temple", "limit": 1})
+    assert [r["id"] for r in response.json()] == [reviews[2].id]
+    # Within 50 km of Bangkok
+    response = await client.get(
+        url, params={"lat": 13.75, "lng": 100.5, "radius_km": 50}
+    )
+    assert [r["id"] for r in response.json()] == [reviews[1].id]
+    response = await client.get(url, params={"radius_km": 50})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    crud_review.delete_review(db, review_id=reviews[2].id)
+    response = await client.get(url)
+    assert [r["id"] for r in response.json()] == [reviews[1].id, reviews[0].id]
+
+
+def test_review_write_reloads_feed_entry_in_one_query(db: Session):
+    place = Place(name="Wat Chedi Luang", category="Temple")
+    user = User(username="one_query_reviewer", hashed_password="pw")
+    db.add_all([place, user])
+    db.commit()
+    review_in = ReviewCreate(place_id=place.id, rating=4.0)
+    user_id = user.id
+    selects = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    engine = db.get_bind().engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        review = crud_review.create_review(db, review_in=review_in, user_id=user_id)
+        created_selects = len(selects)
+        crud_review.update_review(
+            db, db_review=review, review_in=ReviewUpdate(comment="Quiet at dawn")
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    # The review, its place and its author, reloaded together after each commit;
+    # the update also locks the review row before changing it
+    assert created_selects == 1
+    assert len(selects) == created_selects + 2
+    assert recent_reviews.newest(1)[0].comment == "Quiet at dawn"
+    assert recent_reviews.newest(1)[0].author_username == "one_query_reviewer"
+
+
+def test_load_recent_reviews_from_database(db: Session):
+    recent_reviews.clear()
+    place_id, newest_first = _create_reviews(db, 3)
+
+    assert crud_review.load_recent_reviews(db) == 3
+    assert [r.id for r in crud_review.get_recent_reviews()] == sorted(
+        newest_first, reverse=True
+    )
+    assert crud_review.get_recent_reviews()[0].place_id == place_id
+
+
+def test_review_writes_are_streamed_to_place_subscribers(db: Session):
+    place = Place(name="Streamed Place")
+    user = User(username="streamed_reviewer", hashed_password="pw")
+    db.add_all([place, user])
+    db.commit()
+
+    async def scenario():
+        subscription = review_events.subscribe(place.id)
+        try:
+            review = crud_review.create_review(
+                db,
+                review_in=ReviewCreate(place_id=place.id, rating=4.0),
+                user_id=user.id,
+            )
+            crud_review.update_review(
+                db, db_review=review, review_in=ReviewUpdate(comment="Edited")
+            )
+            crud_review.delete_review(db, review_id=review.id)
+            return [await asyncio.wait_for(subscription.get(), 1) for _ in range(3)]
+        finally:
+            review_events.unsubscribe(subscription)
+
+    messages = asyncio.run(scenario())
+    events = [m.split("\n")[0] for m in messages]
+    assert events == [
+        "event: review_created",
+        "event: review_updated",
+        "event: review_deleted",
+    ]
+    data = json.loads(messages[1].split("data: ")[1])
+    assert data["comment"] == "Edited"
+    assert data["place_id"] == place.id
+
+
+@pytest.mark.asyncio
+async def test_review_stream_for_missing_place(client: AsyncClient, db: Session):
+    response = await client.get(f"{settings.API_V1_STR}/reviews/place/999999/stream")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reviews(client: AsyncClient, db: Session):
+    admin = User(username="partner_admin", hashed_password="pw", is_superuser=True)
+    user = User(username="not_an_admin", hashed_password="pw")
+    place = Place(name="Partner Reviewed Place")
+    db.add_all([admin, user, place])
+    db.commit()
+    url = f"{settings.API_V1_STR}/reviews/bulk"
+    body = {
+        "source": "partner",
+        "reviews": [
+            {"place_id": place.id, "rating": 4.0, "author_id": "1"},
+            {"place_id": place.id, "rating": 3.0, "author_id": "2"},
+            {"place_id": 999999, "rating": 4.0, "author_id": "1"},
+        ],
+    }
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user.username})}"}
+    response = await client.post(url, json=body, headers=headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    headers = {
+        "Authorization": f"Bearer {create_access_token({'sub': admin.username})}"
+    }
+    response = await client.post(url, json=body, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()
+    assert [r["status"] for r in results] == ["created", "created", "place_not_found"]
+    assert results[0]["review_id"] is not None
+
+    response = await client.post(
+        url, json={"source": "partner", "reviews": []}, headers=headers
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+SPAM_COMMENT = (
+    "Best massage in Chiang Mai, visit our shop on Nimman road for a discount"
+)
+
+
+def test_near_duplicate_reviews(db: Session, monkeypatch):
+    review_fingerprints.rebuild([])
+    places = [Place(name=f"Spammed Place {i}") for i in range(3)]
+    users = [User(username=f"spam_ring_{i}", hashed_password="pw") for i in range(3)]
+    db.add_all([*places, *users])
+    db.commit()
+    original = crud_review.create_review(
+        db,
+        review_in=ReviewCreate(place_id=places[0].id, rating=5.0, comment=SPAM_COMMENT),
+        user_id=users[0].id,
+    )
+    assert original.duplicate_of_id is None
+
+    # Flagged by default
+    near_copy = crud_review.create_review(
+        db,
+        review_in=ReviewCreate(
+            place_id=places[1].id,
+            rating=5.0,
+            comment=SPAM_COMMENT.replace("discount", "big discount!"),
+        ),
+        user_id=users[1].id,
+    )
+    assert near_copy.duplicate_of_id == original.id
+    edited = crud_review.update_review(
+        db, db_review=near_copy, review_in=ReviewUpdate(comment="Quiet, clean, lovely")
+    )
+    assert edited.duplicate_of_id is None
+
+    monkeypatch.setattr(settings, "REVIEW_DUPLICATE_ACTION", "reject")
+    with pytest.raises(DuplicateReviewError) as exc_info:
+        crud_review.create_review(
+            db,
+            review_in=ReviewCreate(
+                place_id=places[2].id, rating=5.0, comment=SPAM_COMMENT.upper()
+            ),
+            user_id=users[2].id,
+        )
+    assert exc_info.value.duplicate_of_id == original.id
+    assert db.query(Review).filter(Review.user_id == users[2].id).count() == 0
+
+    # Rebuilt from the database: the edited comment is too short to index
+    assert crud_review.load_review_fingerprints(db) == 1
+    assert [key for key, _ in review_fingerprints.query(SPAM_COMMENT, 0.9)] == [
+        original.id
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_reviews(client: AsyncClient, db: Session):
+    places = [Place(name="Warorot Market"), Place(name="Wat Chedi Luang")]
+    users = [User(username=f"searcher_{i}", hashed_password="pw") for i in range(6)]
+    db.add_all([*places, *users])
+    db.commit()
+    comments = [
+        "Easy parking, the parking lot is right behind the market",
+        "No parking nearby, take a songthaew",
+        "Great khao soi stall by the river",
+        "มีที่จอดรถกว้างขวาง สะดวกมาก",  # Plenty of parking, very convenient
+        "Parking was free on Sunday",
+        None,
+    ]
+    reviews = [
+        Review(place_id=places[i % 2].id, user_id=user.id, rating=4.0, comment=c)
+        for i, (user, c) in enumerate(zip(users, comments))
+    ]
+    db.add_all(reviews)
+    db.commit()
+    url = f"{settings.API_V1_STR}/reviews/search"
+
+    response = await client.get(url, params={"q": "PARKING"})
+    assert response.status_code == status.HTTP_200_OK
+    found = [review["id"] for review in response.json()]
+    assert sorted(found) == sorted(reviews[i].id for i in (0, 1, 4))
+    assert found[0] == reviews[0].id  # Mentions parking twice
+    response = await client.get(url, params={"q": "parking", "place_id": places[0].id})
+    assert sorted(r["id"] for r in response.json()) == [reviews[0].id, reviews[4].id]
+    response = await client.get(url, params={"q": "parking lot"})
+    assert [r["id"] for r in response.json()] == [reviews[0].id]
+
+    # Thai is written without spaces: the query matches inside the comment
+    response = await client.get(url, params={"q": "ที่จอดรถ"})
+    assert [r["id"] for r in response.json()] == [reviews[3].id]
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": "parking", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(url, params=params)
+        seen += [review["id"] for review in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == found
+
+    crud_review.update_review(
+        db, db_review=reviews[1], review_in=ReviewUpdate(comment="Took a songthaew")
+    )
+    crud_review.delete_review(db, review_id=reviews[4].id)
+    response = await client.get(url, params={"q": "parking"})
+    assert [r["id"] for r in response.json()] == [reviews[0].id]
+
+    response = await client.get(url, params={"q": "parking", "cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_reindex_search_tokens(db: Session):
+    place = Place(name="Tha Phae Gate")
+    user = User(username="legacy_reviewer", hashed_password="pw")
+    db.add_all([place, user])
+    db.commit()
+    review = Review(place_id=place.id, user_id=user.id, rating=3.0, comment="Pigeons")
+    db.add(review)
+    db.commit()
+    db.query(Review).filter(Review.id == review.id).update({"search_tokens": None})
+    db.commit()
+    assert crud_review.search_reviews(db, query="pigeons") == []
+
+    assert crud_review.reindex_search_tokens(db) == 1
+    assert [r.id for r, _ in crud_review.search_reviews(db, query="pigeons")] == [
+        review.id
+    ]
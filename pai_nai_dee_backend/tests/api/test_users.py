@@ -148,6 +148,30 @@ async def test_read_users_authenticated(client: AsyncClient, test_user_token: st
     assert isinstance(response.json(), list)
 
 
+@pytest.mark.asyncio
+async def test_read_user_profile(client: AsyncClient, db: Session):
+    """
+    Test the public profile with the user's contribution counters.
+    """
+    user = crud_user.create_user(
+        db=db,
+        user_in=UserCreate(username="profile_api_user", password="testpassword123"),
+    )
+
+    response = await client.get(f"{settings.API_V1_STR}/users/{user.id}/profile")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "id": user.id,
+        "username": "profile_api_user",
+        "review_count": 0,
+        "itinerary_count": 0,
+        "average_rating_given": None,
+    }
+
+    response = await client.get(f"{settings.API_V1_STR}/users/999999/profile")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 # TODO: Add more tests for other user endpoints (GET /user/{id}, PUT /user/{id}, DELETE /user/{id})
 # TODO: Add tests for Place, Review, Itinerary CRUD and API endpoints.
 # TODO: Test permission logic once fully implemented (e.g., user can only update self, admin can update any)
@@ -0,0 +1 @@
+# This file makes Python treat the `core` directory as a package.
@@ -0,0 +1,63 @@
+"""
+Tests for the in-process LRU+TTL cache used for place details.
+"""
+
+import time
+
+from ...app.core.cache import LRUTTLCache
+
+
+def test_hit_miss_and_invalidate():
+    cache = LRUTTLCache(max_bytes=1024, ttl_seconds=60)
+
+    assert cache.get(1) is None
+    cache.set(1, b'{"id": 1}')
+    assert cache.get(1) == b'{"id": 1}'
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["invalidations"] == 1
+    assert stats["entries"] == 0
+    assert stats["bytes"] == 0
+
+
+def test_size_limit_is_in_bytes_and_evicts_lru():
+    cache = LRUTTLCache(max_bytes=10, ttl_seconds=60)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+    # Entries larger than the whole cache are never stored
+    assert cache.set("huge", b"x" * 11) is False
+    assert cache.get("a") == b"aaaa"
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUTTLCache(max_bytes=1024, ttl_seconds=0.01)
+    cache.set(1, b"stale")
+    time.sleep(0.02)
+    assert cache.get(1) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_set_skipped_when_invalidated_during_load():
+    """
+    A reader that loaded a value before a concurrent write invalidated the key
+    must not put its stale copy back into the cache.
+    """
+    cache = LRUTTLCache(max_bytes=1024, ttl_seconds=60)
+    generation = cache.generation()
+    cache.invalidate(1)  # Write committed while the reader was loading
+    assert cache.set(1, b"stale", generation=generation) is False
+    assert cache.get(1) is None
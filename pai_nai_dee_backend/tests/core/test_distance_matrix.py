@@ -0,0 +1,87 @@
+"""
+Tests for the in-process cache of distances between places.
+"""
+
+import numpy as np
+import pytest
+
+from ...app.core.distance_matrix import DistanceMatrix
+from ...app.utils.geo import haversine_km
+
+LAT = np.array([18.79, 18.80, 18.77, 18.70, np.nan])
+LNG = np.array([98.98, 98.99, 99.01, 98.90, np.nan])
+IDS = [11, 12, 13, 14, 15]
+
+
+def _expected(rows, columns):
+    return haversine_km(
+        LAT[rows, None], LNG[rows, None], LAT[None, columns], LNG[None, columns]
+    )
+
+
+def test_blocks_are_computed_once_for_both_orders():
+    distances = DistanceMatrix(max_places=10)
+    rows, columns = [0, 1], [2, 3, 1]
+    block = distances.block(
+        [IDS[i] for i in rows],
+        LAT[rows],
+        LNG[rows],
+        [IDS[i] for i in columns],
+        LAT[columns],
+        LNG[columns],
+    )
+    assert block == pytest.approx(_expected(rows, columns), rel=1e-6)
+    assert distances.stats()["misses"] == 6
+
+    # Every pair of the first block, in the other order, is cached
+    block = distances.block(
+        [IDS[i] for i in columns],
+        LAT[columns],
+        LNG[columns],
+        [IDS[i] for i in rows],
+        LAT[rows],
+        LNG[rows],
+    )
+    assert block == pytest.approx(_expected(columns, rows), rel=1e-6)
+    assert distances.stats()["hits"] == 6
+    assert distances.stats()["misses"] == 6
+
+
+def test_matrix_with_unknown_coordinates():
+    distances = DistanceMatrix(max_places=10)
+    matrix = distances.matrix(IDS, LAT, LNG)
+    assert np.isnan(matrix[4]).all() and np.isnan(matrix[:, 4]).all()
+    assert matrix[:4, :4] == pytest.approx(_expected(range(4), range(4)), rel=1e-6)
+    assert np.array_equal(distances.matrix(IDS, LAT, LNG), matrix, equal_nan=True)
+    assert distances.stats()["hits"] == 16
+
+
+def test_moved_and_invalidated_places_are_recomputed():
+    distances = DistanceMatrix(max_places=10)
+    distances.matrix(IDS[:4], LAT[:4], LNG[:4])
+
+    distances.invalidate(IDS[0])
+    moved = LAT[:4].copy()
+    moved[1] += 0.1  # Moved without an invalidation, e.g. by another worker
+    matrix = distances.matrix(IDS[:4], moved, LNG[:4])
+    expected = haversine_km(moved[:, None], LNG[:4, None], moved[None], LNG[None, :4])
+    assert matrix == pytest.approx(expected, rel=1e-6)
+    # Only the pairs of the two other places were still cached
+    assert distances.stats()["hits"] == 4
+    assert distances.stats()["invalidations"] == 2
+
+
+def test_least_recently_used_places_are_evicted():
+    distances = DistanceMatrix(max_places=3)
+    distances.matrix(IDS[:2], LAT[:2], LNG[:2])
+    distances.matrix(IDS[2:4], LAT[2:4], LNG[2:4])  # Evicts IDS[0]
+    assert len(distances) == 3
+    assert distances.stats()["evictions"] == 1
+
+    hits = distances.stats()["hits"]
+    distances.matrix(IDS[1:3], LAT[1:3], LNG[1:3])
+    assert distances.stats()["hits"] == hits + 2  # Only the diagonal
+    # More places than it holds are computed without caching
+    matrix = distances.matrix(IDS[:4], LAT[:4], LNG[:4])
+    assert matrix == pytest.approx(_expected(range(4), range(4)), rel=1e-6)
+    assert len(distances) == 3
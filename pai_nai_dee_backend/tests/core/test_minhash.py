@@ -0,0 +1,67 @@
+from ...app.core.minhash import MinHashLSH
+
+COMMENT = (
+    "Great little cafe near the river, friendly staff and the best "
+    "mango sticky rice in town"
+)
+THAI_COMMENT = (
+    "ร้านอาหารอร่อยมาก ที่จอดรถกว้างขวาง พนักงานบริการดี ราคาไม่แพง แนะนำเลยค่ะ"
+)
+OTHER_COMMENT = (
+    "Long queue at the temple entrance but the view from the top is worth it"
+)
+
+
+def _keys(matches):
+    return [key for key, _ in matches]
+
+
+def test_minhash_finds_near_duplicates():
+    index = MinHashLSH(min_chars=20)
+    assert index.rebuild([(1, COMMENT), (2, THAI_COMMENT), (3, OTHER_COMMENT)]) == 3
+
+    edited = COMMENT.replace("friendly", "very friendly").upper() + "!!"
+    matches = index.query(edited, 0.6)
+    assert _keys(matches) == [1]
+    assert 0.6 <= matches[0][1] < 1.0
+    assert _keys(index.query(THAI_COMMENT.replace("ค่ะ", "ครับ"), 0.6)) == [2]
+    assert index.query("Clean rooms, free breakfast and a pool on the roof", 0.5) == []
+    assert index.query(COMMENT, 0.6, exclude=1) == []
+
+
+def test_minhash_ignores_short_texts():
+    index = MinHashLSH(min_chars=20)
+    assert index.add(1, "Nice!") is False
+    assert index.query("Nice!", 0.0) == []
+    assert len(index) == 0
+
+
+def test_minhash_add_and_remove_on_top_of_rebuild():
+    index = MinHashLSH()
+    index.rebuild([(1, COMMENT), (2, OTHER_COMMENT)])
+
+    index.add(3, THAI_COMMENT)
+    assert _keys(index.query(THAI_COMMENT, 0.9)) == [3]
+    index.remove(1)
+    assert index.query(COMMENT, 0.5) == []
+    index.add(2, COMMENT)  # Re-indexed with a new text
+    assert _keys(index.query(COMMENT, 0.9)) == [2]
+    assert index.query(OTHER_COMMENT, 0.5) == []
+    assert len(index) == 2
+
+
+def test_minhash_rebuild_keeps_writes_made_while_loading():
+    index = MinHashLSH()
+    index.rebuild([(1, COMMENT)])
+
+    def load():
+        yield 2, OTHER_COMMENT
+        index.add(3, THAI_COMMENT)  # Written while the rebuild reads
+        index.remove(2)
+        yield 4, COMMENT
+
+    index.rebuild(load())
+    assert _keys(index.query(THAI_COMMENT, 0.9)) == [3]
+    assert index.query(OTHER_COMMENT, 0.5) == []
+    assert _keys(index.query(COMMENT, 0.9)) == [4]
+    assert len(index) == 2
@@ -0,0 +1,34 @@
+import threading
+
+from ...app.core.periodic import PeriodicTask
+
+
+def test_periodic_task_runs_until_stopped():
+    ran = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        ran.set()
+
+    task = PeriodicTask(fn, interval_seconds=0.01, run_on_stop=True)
+    task.start()
+    assert ran.wait(timeout=5)
+    task.stop()
+    assert len(calls) >= 2  # At least one periodic run and the final one
+
+
+def test_periodic_task_runs_at_start_and_survives_errors():
+    second_call = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("transient failure")
+        second_call.set()
+
+    task = PeriodicTask(fn, interval_seconds=0.01, run_at_start=True)
+    task.start()
+    assert second_call.wait(timeout=5)
+    task.stop()
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from ...app.core.pubsub import PubSub
+
+
+def test_publish_from_another_thread_reaches_subscribers():
+    async def scenario():
+        hub = PubSub(max_queue=10)
+        first, second, other = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+
+        publisher = threading.Thread(target=hub.publish, args=(1, "hello"))
+        publisher.start()
+        publisher.join()
+
+        assert await asyncio.wait_for(first.get(), 1) == "hello"
+        assert await asyncio.wait_for(second.get(), 1) == "hello"
+        assert other.queue.empty()
+
+        hub.unsubscribe(first)
+        assert hub.publish(1, "again") == 1
+        assert hub.subscriber_count(1) == 1
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_dropped():
+    async def scenario():
+        hub = PubSub(max_queue=2)
+        slow, fast = hub.subscribe("topic"), hub.subscribe("topic")
+        for i in range(3):
+            hub.publish("topic", i)
+            await asyncio.sleep(0)  # Let the loop deliver
+            if i < 2:
+                assert await fast.get() == i
+
+        assert slow.dropped is True
+        assert await slow.get() is None
+        assert hub.dropped == 1
+        assert hub.subscriber_count("topic") == 1
+        assert await fast.get() == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+from collections import namedtuple
+
+from ...app.core.ring_buffer import RingBuffer
+
+Item = namedtuple("Item", ["id", "tag"])
+
+
+def _ids(items):
+    return [item.id for item in items]
+
+
+def test_ring_buffer_keeps_newest_items():
+    buffer = RingBuffer(3, key=lambda item: item.id)
+    for i in range(1, 6):
+        buffer.append(Item(i, "even" if i % 2 == 0 else "odd"))
+
+    assert len(buffer) == 3
+    assert _ids(buffer.newest()) == [5, 4, 3]
+    assert _ids(buffer.newest(2)) == [5, 4]
+    assert _ids(buffer.newest(5, lambda item: item.tag == "odd")) == [5, 3]
+
+
+def test_ring_buffer_replace_and_remove():
+    buffer = RingBuffer(3, key=lambda item: item.id)
+    buffer.append(Item(1, "a"))
+    buffer.append(Item(2, "b"))
+
+    assert buffer.replace(Item(1, "edited")) is True
+    assert buffer.replace(Item(9, "missing")) is False
+    assert buffer.newest() == [Item(2, "b"), Item(1, "edited")]
+    assert buffer.remove(2) is True
+    assert buffer.remove(2) is False
+    assert _ids(buffer.newest()) == [1]
+
+
+def test_ring_buffer_reload_keeps_items_newer_than_the_load():
+    buffer = RingBuffer(4, key=lambda item: item.id)
+    buffer.append(Item(7, "appended while loading"))
+    buffer.reload([Item(i, "loaded") for i in range(3, 7)])
+
+    # Capacity still applies: the oldest loaded item is dropped
+    assert _ids(buffer.newest()) == [7, 6, 5, 4]
+
+
+def test_ring_buffer_slot_of_removed_item_is_reused_on_wrap_around():
+    buffer = RingBuffer(3, key=lambda item: item.id)
+    for i in range(1, 4):
+        buffer.append(Item(i, "a"))
+    buffer.remove(2)
+    buffer.append(Item(4, "a"))  # Overwrites 1, the oldest
+
+    assert _ids(buffer.newest()) == [4, 3]
+    assert buffer.replace(Item(1, "evicted")) is False
+    buffer.append(Item(5, "a"))  # Takes the slot 2 left empty
+    assert _ids(buffer.newest()) == [5, 4, 3]
+    assert len(buffer) == 3
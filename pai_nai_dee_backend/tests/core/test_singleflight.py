@@ -0,0 +1,66 @@
+"""
+Tests for request coalescing (single-flight) of concurrent reads.
+"""
+
+import threading
+import time
+
+import pytest
+
+from ...app.core.singleflight import SingleFlight
+
+
+def _run_concurrently(n_callers, target):
+    barrier = threading.Barrier(n_callers)
+    results = [None] * n_callers
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as exc:  # Collected and asserted by the caller
+            results[i] = exc
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+@pytest.mark.parametrize("n_callers", [1, 10, 100])
+def test_concurrent_calls_with_same_key_run_once(n_callers):
+    flight = SingleFlight()
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        time.sleep(0.2)  # Long enough for every caller to join the flight
+        return {"id": 42}
+
+    results = _run_concurrently(n_callers, lambda: flight.do("place:42", slow_load))
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [{"id": 42}] * n_callers
+    assert sum(1 for _, shared in results if not shared) == 1  # Exactly one leader
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    def failing_load():
+        time.sleep(0.1)
+        raise ValueError("db down")
+
+    results = _run_concurrently(5, lambda: flight.do("k", failing_load))
+    assert all(isinstance(result, ValueError) for result in results)
+
+    # The failed flight is gone, the next call runs again
+    assert flight.do("k", lambda: "ok") == ("ok", False)
@@ -0,0 +1,17 @@
+"""
+Helpers shared by the database tests.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.orm import Query, Session
+
+
+def explain(db: Session, query: Query) -> str:
+    """PostgreSQL's EXPLAIN output for `query`, one plan node per line."""
+    compiled = query.statement.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    # Tables are tiny in tests; stop the planner from preferring a sequential scan
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    rows = db.execute(text(f"EXPLAIN {compiled}")).fetchall()
+    return "\n".join(row[0] for row in rows)
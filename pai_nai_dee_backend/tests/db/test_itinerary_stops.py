@@ -0,0 +1,150 @@
+"""
+Tests for ordered itinerary stops: the positions planned for a new order of
+stops (crud_itinerary.plan_positions), and the rows that updating the stops of
+an itinerary writes.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ...app.crud import crud_itinerary
+from ...app.crud.crud_itinerary import POSITION_STEP, plan_positions
+from ...app.models.place import Place
+from ...app.models.user import User
+from ...app.schemas.itinerary import (
+    ItineraryCreate,
+    ItineraryStopCreate,
+    ItineraryUpdate,
+)
+
+
+def test_plan_positions_moves_few_stops():
+    current = {place_id: place_id * POSITION_STEP for place_id in range(50)}
+    # Move stop 10 to the end: only it gets a new position
+    order = [p for p in range(50) if p != 10] + [10]
+    positions = plan_positions(current, order)
+    assert {p for p in order if positions[p] != current.get(p)} == {10}
+    assert sorted(order, key=positions.get) == order
+
+    # Move stop 40 between 3 and 4, and insert new stops 100 and 101 before 0
+    order = [100, 101, 0, 1, 2, 3, 40, *[p for p in range(4, 50) if p != 40]]
+    positions = plan_positions(current, order)
+    assert {p for p in order if positions[p] != current.get(p)} == {100, 101, 40}
+    assert sorted(order, key=positions.get) == order
+
+    # No room between two adjacent positions: everything is renumbered
+    positions = plan_positions({1: 0, 2: 1}, [1, 3, 2])
+    assert positions == {1: 0, 3: POSITION_STEP, 2: 2 * POSITION_STEP}
+
+
+def test_update_writes_only_changed_stops(db: Session):
+    places = [Place(name=f"Stop {i}") for i in range(51)]
+    user = User(username="stop_shuffler", hashed_password="pw")
+    db.add_all([*places, user])
+    db.commit()
+    *place_ids, new_place_id = [place.id for place in places]
+    itinerary = crud_itinerary.create_itinerary(
+        db,
+        itinerary_in=ItineraryCreate(name="Fifty stops", place_ids=place_ids),
+        user_id=user.id,
+    )
+    assert [stop.place_id for stop in itinerary.stops] == place_ids
+
+    writes = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.split()[0].upper()
+        if verb in ("INSERT", "UPDATE", "DELETE"):
+            writes.append((verb, len(parameters) if executemany else 1))
+
+    def update_stops(stops):
+        writes.clear()
+        engine = db.get_bind().engine
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            crud_itinerary.update_itinerary(
+                db,
+                db_itinerary=itinerary,
+                itinerary_in=ItineraryUpdate(name=itinerary.name, stops=stops),
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        return [(stop.place_id, stop.day, stop.notes) for stop in itinerary.stops]
+
+    # Reorder one stop: one row updated
+    order = place_ids[:10] + place_ids[11:] + [place_ids[10]]
+    stops = [ItineraryStopCreate(place_id=p) for p in order]
+    assert update_stops(stops) == [(p, None, None) for p in order]
+    assert writes == [("UPDATE", 1)]
+
+    # Drop two stops, add a new one, and annotate another
+    stops = [s for s in stops if s.place_id not in place_ids[20:22]]
+    stops[5] = ItineraryStopCreate(place_id=stops[5].place_id, day=2, notes="Lunch")
+    stops.insert(30, ItineraryStopCreate(place_id=new_place_id, day=2))
+    assert update_stops(stops) == [(s.place_id, s.day, s.notes) for s in stops]
+    assert writes == [("DELETE", 1), ("INSERT", 1), ("UPDATE", 1)]
+
+    # The same stops again: nothing to write
+    update_stops(stops)
+    assert writes == []
+
+
+def test_add_and_remove_place_are_one_statement(db: Session):
+    places = [Place(name=f"Market {i}") for i in range(42)]
+    owner = User(username="market_hopper", hashed_password="pw")
+    other = User(username="itinerary_snoop", hashed_password="pw")
+    db.add_all([*places, owner, other])
+    db.commit()
+    *place_ids, new_place_id = [place.id for place in places]
+    small = crud_itinerary.create_itinerary(
+        db, itinerary_in=ItineraryCreate(name="Small", place_ids=[]), user_id=owner.id
+    )
+    large = crud_itinerary.create_itinerary(
+        db,
+        itinerary_in=ItineraryCreate(name="Large", place_ids=place_ids),
+        user_id=owner.id,
+    )
+
+    owner_id, itinerary_ids = owner.id, [small.id, large.id]
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    engine = db.get_bind().engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        for itinerary_id in itinerary_ids:
+            statements.clear()
+            assert crud_itinerary.add_place_to_itinerary(
+                db, itinerary_id, new_place_id, user_id=owner_id
+            )
+            assert statements == ["INSERT"]
+            statements.clear()
+            assert crud_itinerary.remove_place_from_itinerary(
+                db, itinerary_id, place_ids[0], user_id=owner_id
+            ) == (itinerary_id == itinerary_ids[1])
+            assert statements == ["DELETE"]
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    db.expire_all()
+    assert [s.place_id for s in small.stops] == [new_place_id]
+    assert [s.place_id for s in large.stops] == [*place_ids[1:], new_place_id]
+    # Already a stop, not the owner, no such place: nothing changes
+    assert not crud_itinerary.add_place_to_itinerary(
+        db, large.id, new_place_id, user_id=owner.id
+    )
+    assert not crud_itinerary.add_place_to_itinerary(
+        db, small.id, place_ids[0], user_id=other.id
+    )
+    assert not crud_itinerary.remove_place_from_itinerary(
+        db, large.id, new_place_id, user_id=other.id
+    )
+    assert not crud_itinerary.add_place_to_itinerary(
+        db, small.id, 999999, user_id=owner.id
+    )
+    db.expire_all()
+    assert [s.place_id for s in small.stops] == [new_place_id]
+    assert len(large.stops) == len(place_ids)
@@ -0,0 +1,57 @@
+"""
+Query-plan tests for the `sort` options of GET /places.
+Each sorted page must be read from its composite index, not produced by a full sort.
+"""
+
+import pytest
+from sqlalchemy.orm import Session
+
+from ...app.crud import crud_place
+from .conftest import explain
+
+
+@pytest.mark.parametrize(
+    "sort, category, expected_index",
+    [
+        ("best", None, "ix_places_best"),
+        ("best", "Temple", "ix_places_category_best"),
+        ("rating", None, "ix_places_rating"),
+        ("rating", "Temple", "ix_places_category_rating"),
+        ("name", None, "ix_places_name"),
+        ("name", "Temple", "ix_places_category_name"),
+        ("newest", None, "ix_places_newest"),
+        ("newest", "Temple", "ix_places_category_newest"),
+    ],
+)
+def test_sorted_places_use_index_without_sort_node(
+    db: Session, sort, category, expected_index
+):
+    query = crud_place.build_places_query(db, category=category, sort=sort)
+    plan = explain(db, query.limit(20))
+
+    assert expected_index in plan, plan
+    assert "Sort" not in plan, plan
+
+
+def test_sorted_places_with_min_rating_use_category_index(db: Session):
+    query = crud_place.build_places_query(
+        db, category="Temple", min_rating=4.0, sort="rating"
+    )
+    plan = explain(db, query.limit(20))
+
+    assert "ix_places_category_rating" in plan, plan
+    assert "Sort" not in plan, plan
+
+
+def test_distance_sort_prefilters_with_lat_lng_index(db: Session):
+    """
+    Distance ordering depends on the query point, so it cannot come from a btree;
+    the radius bounding box must still be served by ix_places_lat_lng so only
+    nearby rows are sorted.
+    """
+    query = crud_place.build_places_query(
+        db, sort="distance", lat=18.79, lng=98.98, radius_km=5
+    )
+    plan = explain(db, query.limit(20))
+
+    assert "ix_places_lat_lng" in plan, plan
@@ -0,0 +1,228 @@
+"""
+Tests for the denormalized rating aggregates on places (rating_sum, rating_count,
+average_rating, the half-star histogram and the ranking score), maintained by the
+review CRUD writes.
+"""
+
+import pytest
+from sqlalchemy.orm import Session
+
+from ...app.core.config import settings
+from ...app.crud import crud_place, crud_review
+from ...app.models.place import Place, PlaceRankingPrior
+from ...app.models.review import Review
+from ...app.models.user import User
+from ...app.schemas.place import PlaceCreate
+from ...app.schemas.review import ReviewCreate, ReviewUpdate
+from ...app.services.place_service import PlaceService
+
+
+def _create_users(db: Session, n: int):
+    users = [User(username=f"rating_user_{i}", hashed_password="pw") for i in range(n)]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _aggregates(db: Session, place_id: int):
+    db.expire_all()
+    place = db.query(Place).filter(Place.id == place_id).one()
+    return place.rating_sum, place.rating_count, place.average_rating
+
+
+def _histogram(db: Session, place_id: int):
+    place = db.query(Place).filter(Place.id == place_id).one()
+    return {bucket: n for bucket, n in place.rating_histogram.items() if n}
+
+
+def test_review_writes_maintain_place_rating(db: Session):
+    place = Place(name="Wat Arun", category="Temple")
+    db.add(place)
+    db.commit()
+    place_id = place.id
+    users = _create_users(db, 3)
+
+    assert _aggregates(db, place_id) == (0.0, 0, 0.0)
+
+    reviews = [
+        crud_review.create_review(
+            db,
+            review_in=ReviewCreate(place_id=place_id, rating=rating),
+            user_id=user.id,
+        )
+        for user, rating in zip(users, [5.0, 4.0, 1.5])
+    ]
+    assert _aggregates(db, place_id) == (10.5, 3, pytest.approx(3.5))
+    assert _histogram(db, place_id) == {"1.5": 1, "4.0": 1, "5.0": 1}
+
+    crud_review.update_review(
+        db, db_review=reviews[2], review_in=ReviewUpdate(rating=4.5)
+    )
+    assert _aggregates(db, place_id) == (13.5, 3, pytest.approx(4.5))
+    assert _histogram(db, place_id) == {"4.0": 1, "4.5": 1, "5.0": 1}
+
+    # Comment-only edits leave the aggregates alone
+    crud_review.update_review(
+        db, db_review=reviews[2], review_in=ReviewUpdate(comment="Even better")
+    )
+    assert _aggregates(db, place_id) == (13.5, 3, pytest.approx(4.5))
+
+    crud_review.delete_review(db, review_id=reviews[0].id)
+    assert _aggregates(db, place_id) == (8.5, 2, pytest.approx(4.25))
+
+    for review in reviews[1:]:
+        crud_review.delete_review(db, review_id=review.id)
+    assert _aggregates(db, place_id) == (0.0, 0, 0.0)
+    assert _histogram(db, place_id) == {}
+
+
+def test_deleting_a_review_twice_subtracts_it_once(db: Session):
+    place = Place(name="Twice Deleted")
+    users = [
+        User(username=f"twice_deleted_{i}", hashed_password="pw") for i in range(2)
+    ]
+    db.add_all([place, *users])
+    db.commit()
+    place_id = place.id
+    kept, deleted = [
+        crud_review.create_review(
+            db,
+            review_in=ReviewCreate(place_id=place_id, rating=rating),
+            user_id=user.id,
+        )
+        for user, rating in zip(users, [4.0, 2.0])
+    ]
+    deleted_id = deleted.id
+
+    assert crud_review.delete_review(db, review_id=deleted_id).rating == 2.0
+    # E.g. a second request that read the review before the first deleted it
+    assert crud_review.delete_review(db, review_id=deleted_id) is None
+    assert (
+        crud_review.update_review(
+            db, db_review=deleted, review_in=ReviewUpdate(rating=5.0)
+        )
+        is None
+    )
+
+    assert _aggregates(db, place_id) == (4.0, 1, pytest.approx(4.0))
+    assert _histogram(db, place_id) == {"4.0": 1}
+    db.expire_all()
+    assert (users[1].review_count, users[1].review_rating_sum) == (0, 0.0)
+
+
+def test_min_rating_filter_uses_maintained_average(db: Session):
+    good = Place(name="Good Market", category="Market")
+    poor = Place(name="Poor Market", category="Market")
+    db.add_all([good, poor])
+    db.commit()
+    user = _create_users(db, 1)[0]
+    for place, rating in [(good, 4.5), (poor, 2.0)]:
+        crud_review.create_review(
+            db,
+            review_in=ReviewCreate(place_id=place.id, rating=rating),
+            user_id=user.id,
+        )
+
+    places = crud_place.get_places(db, category="Market", min_rating=4.0)
+    assert [p.name for p in places] == ["Good Market"]
+
+
+def test_update_place_average_rating_recomputes_from_reviews(db: Session):
+    place = Place(name="Chatuchak", category="Market")
+    db.add(place)
+    db.commit()
+    users = _create_users(db, 2)
+    # Written behind the CRUD layer's back, so the aggregates are out of date
+    db.add_all(
+        [
+            Review(place_id=place.id, user_id=users[0].id, rating=3.0),
+            Review(place_id=place.id, user_id=users[1].id, rating=4.0),
+        ]
+    )
+    db.commit()
+    assert _aggregates(db, place.id) == (0.0, 0, 0.0)
+
+    assert PlaceService(db).update_place_average_rating(place.id) is True
+    assert _aggregates(db, place.id) == (7.0, 2, pytest.approx(3.5))
+    assert _histogram(db, place.id) == {"3.0": 1, "4.0": 1}
+
+    assert PlaceService(db).update_place_average_rating(999999) is False
+
+
+def test_write_behind_applies_summed_deltas_on_flush(db: Session, monkeypatch):
+    monkeypatch.setattr(settings, "RATING_WRITE_BEHIND", True)
+    place = Place(name="Viral Cafe", category="Cafe")
+    db.add(place)
+    db.commit()
+    place_id = place.id
+    users = _create_users(db, 4)
+
+    reviews = [
+        crud_review.create_review(
+            db,
+            review_in=ReviewCreate(place_id=place_id, rating=rating),
+            user_id=user.id,
+        )
+        for user, rating in zip(users, [5.0, 4.0, 3.0, 5.0])
+    ]
+    crud_review.delete_review(db, review_id=reviews[2].id)
+    # Nothing applied yet: the place row was not touched by the review writes
+    assert _aggregates(db, place_id) == (0.0, 0, 0.0)
+
+    assert crud_place.flush_rating_deltas(db) == 1
+    assert _aggregates(db, place_id) == (14.0, 3, pytest.approx(14.0 / 3))
+    assert _histogram(db, place_id) == {"4.0": 1, "5.0": 2}
+    assert crud_place.flush_rating_deltas(db) == 0
+
+
+def _ranking_score(db: Session, place_id: int) -> float:
+    db.expire_all()
+    return db.query(Place.ranking_score).filter(Place.id == place_id).scalar()
+
+
+def test_ranking_score_shrinks_towards_the_prior(db: Session, monkeypatch):
+    monkeypatch.setattr(settings, "RANKING_PRIOR_DEFAULT_MEAN", 3.0)
+    monkeypatch.setattr(settings, "RANKING_PRIOR_WEIGHT", 10.0)
+    one_review = crud_place.create_place(
+        db, place_in=PlaceCreate(name="One Perfect Review", category="Cafe")
+    )
+    many_reviews = crud_place.create_place(
+        db, place_in=PlaceCreate(name="Many Good Reviews", category="Cafe")
+    )
+    assert _ranking_score(db, one_review.id) == pytest.approx(3.0)
+
+    users = _create_users(db, 30)
+    crud_review.create_review(
+        db,
+        review_in=ReviewCreate(place_id=one_review.id, rating=5.0),
+        user_id=users[0].id,
+    )
+    for user in users:
+        crud_review.create_review(
+            db,
+            review_in=ReviewCreate(place_id=many_reviews.id, rating=4.5),
+            user_id=user.id,
+        )
+
+    # (3.0 * 10 + 5.0) / 11 and (3.0 * 10 + 4.5 * 30) / 40
+    assert _ranking_score(db, one_review.id) == pytest.approx(35.0 / 11)
+    assert _ranking_score(db, many_reviews.id) == pytest.approx(165.0 / 40)
+    best = crud_place.get_places(db, category="Cafe", sort="best")
+    assert [p.id for p in best] == [many_reviews.id, one_review.id]
+
+
+def test_refresh_ranking_prior_rescores_places(db: Session, monkeypatch):
+    monkeypatch.setattr(settings, "RANKING_PRIOR_WEIGHT", 10.0)
+    monkeypatch.setattr(settings, "RANKING_PRIOR_MIN_CHANGE", 0.01)
+    place = Place(name="Rescored", rating_sum=9.0, rating_count=2)
+    db.add(place)
+    db.commit()
+    service = PlaceService(db)
+
+    assert service.refresh_ranking_prior(batch_size=1) is True
+    prior = db.get(PlaceRankingPrior, 1)
+    mean = prior.mean_rating
+    assert _ranking_score(db, place.id) == pytest.approx((mean * 10 + 9.0) / 12)
+
+    # Unchanged prior: nothing to rescore
+    assert service.refresh_ranking_prior() is False
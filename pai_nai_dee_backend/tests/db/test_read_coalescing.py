@@ -0,0 +1,156 @@
+"""
+Load test for single-flight coalescing of hot reads in crud_place and crud_review.
+Concurrent identical lookups must share one in-flight query, so the number of
+queries reaching the database stays flat as concurrency grows.
+"""
+
+import threading
+import time
+
+import pytest
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .. import conftest
+from ...app.crud import crud_place, crud_review
+from ...app.crud.crud_place import place_reads
+from ...app.models.place import Place
+from ...app.models.review import Review
+from ...app.models.user import User
+
+
+@pytest.fixture(scope="function")
+def committed_place(session_test_db) -> int:
+    """
+    A place with one review, committed so that every worker connection sees it.
+    (The `db` fixture rolls back, its rows are invisible to other connections.)
+    """
+    with Session(bind=conftest.test_db_engine) as session:
+        user = User(username="coalescing_user", hashed_password="pw")
+        place = Place(name="Trending Temple", category="Temple")
+        session.add_all([user, place])
+        session.commit()
+        session.add(Review(place_id=place.id, user_id=user.id, rating=5.0))
+        session.commit()
+        return place.id
+
+
+def _count_concurrent_queries(n_callers, read):
+    """
+    Runs `read(session)` from `n_callers` threads at once, each with its own session,
+    and returns how many SELECTs reached the database. Every query is slowed down so
+    that all callers overlap with the first one.
+    """
+    engine = conftest.test_db_engine
+    executed = []
+
+    def slow_select(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            executed.append(statement)
+            time.sleep(0.3)
+
+    event.listen(engine, "after_cursor_execute", slow_select)
+    barrier = threading.Barrier(n_callers)
+    results = []
+
+    def worker():
+        with Session(bind=engine) as session:
+            barrier.wait()
+            results.append(read(session))
+
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(n_callers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        event.remove(engine, "after_cursor_execute", slow_select)
+
+    assert len(results) == n_callers
+    return len(executed), results
+
+
+@pytest.mark.parametrize("n_callers", [1, 10, 50, 100])
+def test_place_detail_query_count_is_flat(committed_place, n_callers):
+    n_queries, results = _count_concurrent_queries(
+        n_callers, lambda s: crud_place.get_place(s, place_id=committed_place).name
+    )
+    assert n_queries == 1
+    assert set(results) == {"Trending Temple"}
+
+
+@pytest.mark.parametrize("n_callers", [1, 10, 50, 100])
+def test_place_listing_query_count_is_flat(committed_place, n_callers):
+    n_queries, results = _count_concurrent_queries(
+        n_callers,
+        lambda s: [p.id for p in crud_place.get_places(s, category="Temple")],
+    )
+    assert n_queries == 1
+    assert all(ids == [committed_place] for ids in results)
+
+
+@pytest.mark.parametrize("n_callers", [1, 10, 50, 100])
+def test_reviews_by_place_query_count_is_flat(committed_place, n_callers):
+    n_queries, results = _count_concurrent_queries(
+        n_callers,
+        lambda s: [
+            r.rating for r in crud_review.get_reviews_by_place(s, committed_place)
+        ],
+    )
+    assert n_queries == 1
+    assert all(ratings == [5.0] for ratings in results)
+
+
+def test_coalesced_reads_get_instances_of_their_own_session(committed_place):
+    def read(session):
+        place = crud_place.get_place(session, place_id=committed_place)
+        # Usable, and modifiable, like any object loaded by the session itself
+        place.name = "Renamed Temple"
+        session.flush()
+        return place, inspect(place).session is session
+
+    _, results = _count_concurrent_queries(10, read)
+    assert len({id(place) for place, _ in results}) == 10
+    assert all(own_session for _, own_session in results)
+
+
+def test_session_with_pending_changes_is_not_coalesced(committed_place):
+    # Another request's read of the place stays in flight until released
+    release = threading.Event()
+    leader = threading.Thread(
+        target=place_reads.do, args=(("place", committed_place), release.wait)
+    )
+    leader.start()
+    try:
+        with Session(bind=conftest.test_db_engine) as session:
+            place = session.get(Place, committed_place)
+            place.name = "Unsaved Name"
+            # Runs its own query instead of waiting for (and sharing) the other read
+            assert crud_place.get_place(session, place_id=committed_place) is place
+            assert not release.is_set()
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_session_with_flushed_changes_is_not_coalesced(committed_place):
+    release = threading.Event()
+    leader = threading.Thread(
+        target=place_reads.do, args=(("place", committed_place), release.wait)
+    )
+    leader.start()
+    try:
+        with Session(bind=conftest.test_db_engine) as session:
+            place = session.get(Place, committed_place)
+            place.name = "Flushed Name"
+            session.flush()
+            assert not session.dirty
+            # Still in the same transaction, so the uncommitted name must not
+            # be shared with (or replaced by) another request's read
+            loaded = crud_place.get_place(session, place_id=committed_place)
+            assert loaded is place and loaded.name == "Flushed Name"
+            assert not release.is_set()
+    finally:
+        release.set()
+        leader.join()
@@ -0,0 +1,122 @@
+"""
+Tests for bulk review creation (crud_review.create_reviews_bulk): per-item
+results, the number of statements it takes, and the place rating aggregates.
+"""
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ...app.core.config import settings
+from ...app.crud import crud_review
+from ...app.models.place import Place
+from ...app.models.review import Review
+from ...app.models.user import User
+from ...app.schemas.review import ReviewBulkItem
+
+
+def test_bulk_create_reports_each_item(db: Session, monkeypatch):
+    monkeypatch.setattr(settings, "REVIEW_BULK_INSERT_BATCH_SIZE", 2)
+    places = [Place(name=f"Partner Place {i}") for i in range(5)]
+    db.add_all(places)
+    db.commit()
+    already_reviewed = places[0]
+    crud_review.create_reviews_bulk(
+        db,
+        source="partner",
+        reviews_in=[
+            ReviewBulkItem(place_id=already_reviewed.id, rating=2.0, author_id="a1")
+        ],
+    )
+    items = [
+        ReviewBulkItem(
+            place_id=places[1].id, rating=5.0, comment="Imported", author_id="a1"
+        ),
+        ReviewBulkItem(place_id=already_reviewed.id, rating=4.0, author_id="a1"),
+        ReviewBulkItem(place_id=999999, rating=4.0, author_id="a1"),
+        ReviewBulkItem(place_id=places[2].id, rating=3.5, author_id="a1"),
+        ReviewBulkItem(place_id=places[1].id, rating=1.0, author_id="a1"),  # Again
+        ReviewBulkItem(place_id=places[1].id, rating=4.0, author_id="a2"),
+        ReviewBulkItem(place_id=places[3].id, rating=4.5, author_id="a2"),
+        ReviewBulkItem(place_id=places[4].id, rating=4.5, author_id="a3"),
+    ]
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    engine = db.get_bind().engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        results = crud_review.create_reviews_bulk(
+            db, source="partner", reviews_in=items
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert [r.status for r in results] == [
+        "created",
+        "conflict",
+        "place_not_found",
+        "created",
+        "conflict",
+        "created",
+        "created",
+        "created",
+    ]
+    assert [r.index for r in results] == list(range(len(items)))
+    # One place lookup, one INSERT and one SELECT of the authors,
+    # ceil(6 new rows / 2) INSERTs (one conflicting row does nothing), one
+    # executemany UPDATE of the aggregates, one of the contribution counters
+    assert statements == [
+        "SELECT",
+        "INSERT",
+        "SELECT",
+        "INSERT",
+        "INSERT",
+        "INSERT",
+        "UPDATE",
+        "UPDATE",
+    ]
+
+    created = db.get(Review, results[0].review_id)
+    assert (created.place_id, created.rating) == (places[1].id, 5.0)
+    assert created.comment == "Imported"
+    author = db.get(User, created.user_id)
+    assert (author.username, author.source, author.external_id) == (
+        "partner:a1",
+        "partner",
+        "a1",
+    )
+    assert db.get(Review, results[5].review_id).user_id != author.id
+    db.expire_all()
+    assert (places[1].rating_sum, places[1].rating_count) == (9.0, 2)
+    assert places[1].average_rating == pytest.approx(4.5)
+    assert (places[1].rating_hist_4_0, places[1].rating_hist_5_0) == (1, 1)
+    assert (already_reviewed.rating_sum, already_reviewed.rating_count) == (2.0, 1)
+    assert (author.review_count, author.review_rating_sum) == (3, 10.5)
+
+    # Importing the same reviews again creates nothing
+    again = crud_review.create_reviews_bulk(db, source="partner", reviews_in=items)
+    assert {r.status for r in again} == {"conflict", "place_not_found"}
+
+
+def test_bulk_create_keeps_authors_of_sources_apart(db: Session):
+    place = Place(name="Reviewed On Two Platforms")
+    taken = User(username="other:a1", hashed_password="pw")
+    db.add_all([place, taken])
+    db.commit()
+
+    results = [
+        crud_review.create_reviews_bulk(
+            db,
+            source=source,
+            reviews_in=[ReviewBulkItem(place_id=place.id, rating=4.0, author_id="a1")],
+        )[0]
+        for source in ("partner", "other")
+    ]
+
+    # "other:a1" signed up on its own, it is not that author
+    assert [r.status for r in results] == ["created", "conflict"]
+    assert taken.review_count == 0
@@ -0,0 +1,33 @@
+"""
+Query-plan tests for the keyset-paginated review listings.
+Any page, including one deep into a popular place's reviews, must be an index
+range scan of the matching composite index, without a sort.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.orm import Session
+
+from ...app.crud import crud_review
+from ...app.models.review import Review
+from .conftest import explain
+
+
+@pytest.mark.parametrize(
+    "column, expected_index",
+    [
+        (Review.place_id, "ix_reviews_place_newest"),
+        (Review.user_id, "ix_reviews_user_newest"),
+    ],
+)
+@pytest.mark.parametrize("deep_page", [False, True])
+def test_review_pages_use_index_without_sort_node(
+    db: Session, column, expected_index, deep_page
+):
+    before = (datetime(2024, 1, 1, tzinfo=timezone.utc), 50_000) if deep_page else None
+    query = crud_review._newest_first(db.query(Review).filter(column == 1), before)
+    plan = explain(db, query.limit(21))
+
+    assert expected_index in plan, plan
+    assert "Sort" not in plan, plan
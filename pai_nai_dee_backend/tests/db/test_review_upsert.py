@@ -0,0 +1,101 @@
+"""
+Tests for the one-review-per-user-and-place upsert (crud_review.upsert_review) and
+its effect on the place's rating aggregates.
+"""
+
+import threading
+
+import pytest
+from sqlalchemy.orm import Session
+
+from .. import conftest
+from ...app.crud import crud_review
+from ...app.models.place import Place
+from ...app.models.review import Review
+from ...app.models.user import User
+from ...app.schemas.review import ReviewUpsert
+
+
+def test_upsert_review_inserts_then_updates(db: Session):
+    place = Place(name="Wat Rong Khun", category="Temple")
+    user = User(username="upsert_user", hashed_password="pw")
+    db.add_all([place, user])
+    db.commit()
+
+    review, created = crud_review.upsert_review(
+        db, place_id=place.id, review_in=ReviewUpsert(rating=3.0), user_id=user.id
+    )
+    assert created is True
+    again, created = crud_review.upsert_review(
+        db,
+        place_id=place.id,
+        review_in=ReviewUpsert(rating=4.5, comment="Better on a second visit"),
+        user_id=user.id,
+    )
+    assert created is False
+    assert again.id == review.id
+    assert again.comment == "Better on a second visit"
+
+    db.expire_all()
+    assert db.query(Review).filter(Review.place_id == place.id).count() == 1
+    place = db.get(Place, place.id)
+    assert (place.rating_sum, place.rating_count) == (4.5, 1)
+    assert {b: n for b, n in place.rating_histogram.items() if n} == {"4.5": 1}
+
+
+def test_upsert_review_for_missing_place(db: Session):
+    user = User(username="upsert_nowhere_user", hashed_password="pw")
+    db.add(user)
+    db.commit()
+
+    result = crud_review.upsert_review(
+        db, place_id=999999, review_in=ReviewUpsert(rating=4.0), user_id=user.id
+    )
+    assert result is None
+    assert db.query(Review).filter(Review.user_id == user.id).count() == 0
+
+
+@pytest.fixture(scope="function")
+def committed_user_and_place(session_test_db):
+    """Committed, so that every worker connection sees them."""
+    with Session(bind=conftest.test_db_engine) as session:
+        user = User(username="double_submit_user", hashed_password="pw")
+        place = Place(name="Double Submit Cafe", category="Cafe")
+        session.add_all([user, place])
+        session.commit()
+        return user.id, place.id
+
+
+def test_concurrent_double_submits_keep_one_review(committed_user_and_place):
+    user_id, place_id = committed_user_and_place
+    ratings = [1.0, 2.0, 3.0, 4.0, 5.0] * 2
+    barrier = threading.Barrier(len(ratings))
+    errors = []
+
+    def submit(rating):
+        with Session(bind=conftest.test_db_engine) as session:
+            barrier.wait()
+            try:
+                crud_review.upsert_review(
+                    session,
+                    place_id=place_id,
+                    review_in=ReviewUpsert(rating=rating),
+                    user_id=user_id,
+                )
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+
+    threads = [threading.Thread(target=submit, args=(r,)) for r in ratings]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with Session(bind=conftest.test_db_engine) as session:
+        reviews = session.query(Review).filter(Review.place_id == place_id).all()
+        place = session.get(Place, place_id)
+        assert len(reviews) == 1
+        # The aggregates hold exactly the surviving review
+        assert (place.rating_sum, place.rating_count) == (reviews[0].rating, 1)
+        assert sum(place.rating_histogram.values()) == 1
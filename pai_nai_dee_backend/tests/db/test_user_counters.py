@@ -0,0 +1,114 @@
+"""
+Tests for the denormalized user contribution counters (review_count,
+review_rating_sum, itinerary_count) kept in step by the review and itinerary
+CRUD writes, and for UserService.recount_contributions.
+"""
+
+import pytest
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from ...app.crud import crud_itinerary, crud_review
+from ...app.models.place import Place
+from ...app.models.user import User
+from ...app.schemas.itinerary import ItineraryCreate
+from ...app.schemas.review import ReviewCreate, ReviewUpdate, ReviewUpsert
+from ...app.services.user_service import UserService
+
+
+def _counters(db: Session, user: User):
+    db.expire_all()
+    return user.review_count, user.review_rating_sum, user.itinerary_count
+
+
+def test_review_and_itinerary_writes_maintain_counters(db: Session):
+    places = [Place(name=f"Counter Place {i}") for i in range(3)]
+    user = User(username="counter_user", hashed_password="pw")
+    db.add_all([*places, user])
+    db.commit()
+    assert _counters(db, user) == (0, 0.0, 0)
+    assert user.average_rating_given is None
+
+    first = crud_review.create_review(
+        db, review_in=ReviewCreate(place_id=places[0].id, rating=4.0), user_id=user.id
+    )
+    crud_review.upsert_review(
+        db, place_id=places[1].id, review_in=ReviewUpsert(rating=2.0), user_id=user.id
+    )
+    assert _counters(db, user) == (2, 6.0, 0)
+    assert user.average_rating_given == pytest.approx(3.0)
+
+    crud_review.update_review(db, db_review=first, review_in=ReviewUpdate(rating=5.0))
+    crud_review.upsert_review(
+        db, place_id=places[1].id, review_in=ReviewUpsert(rating=3.0), user_id=user.id
+    )
+    assert _counters(db, user) == (2, 8.0, 0)
+
+    crud_review.delete_review(db, first.id)
+    assert _counters(db, user) == (1, 3.0, 0)
+
+    itinerary = crud_itinerary.create_itinerary(
+        db, itinerary_in=ItineraryCreate(name="Weekend"), user_id=user.id
+    )
+    crud_itinerary.create_itinerary(
+        db, itinerary_in=ItineraryCreate(name="Holiday"), user_id=user.id
+    )
+    crud_itinerary.delete_itinerary(db, itinerary.id)
+    assert _counters(db, user) == (1, 3.0, 1)
+
+
+def test_profile_is_one_primary_key_lookup(db: Session):
+    place = Place(name="Profile Place")
+    user = User(username="profile_user", hashed_password="pw")
+    db.add_all([place, user])
+    db.commit()
+    crud_review.create_review(
+        db, review_in=ReviewCreate(place_id=place.id, rating=4.5), user_id=user.id
+    )
+    user_id = user.id
+    db.expunge_all()
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_bind().engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        profile = UserService(db).get_user_profile_details(user_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert "FROM users" in statements[0]
+    assert profile == {
+        "id": user_id,
+        "username": "profile_user",
+        "review_count": 1,
+        "itinerary_count": 0,
+        "average_rating_given": pytest.approx(4.5),
+    }
+    assert UserService(db).get_user_profile_details(999999) is None
+
+
+def test_recount_contributions_repairs_drift(db: Session):
+    place = Place(name="Recount Place")
+    user = User(username="recount_user", hashed_password="pw")
+    db.add_all([place, user])
+    db.commit()
+    crud_review.create_review(
+        db, review_in=ReviewCreate(place_id=place.id, rating=3.5), user_id=user.id
+    )
+    crud_itinerary.create_itinerary(
+        db, itinerary_in=ItineraryCreate(name="Trip"), user_id=user.id
+    )
+    db.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(review_count=7, review_rating_sum=1.0, itinerary_count=0)
+    )
+    db.commit()
+
+    assert UserService(db).recount_contributions() >= 1
+    assert _counters(db, user) == (1, 3.5, 1)
@@ -0,0 +1 @@
+# This file makes Python treat the `services` directory as a package.
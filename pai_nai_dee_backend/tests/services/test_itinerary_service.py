@@ -0,0 +1,112 @@
+"""
+Tests for reordering itinerary stops into a short route
+(ItineraryService.optimize_stops and the heuristic in app.utils.routing).
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from ...app.crud import crud_itinerary, crud_place
+from ...app.crud.crud_place import place_distances
+from ...app.models.place import Place
+from ...app.models.user import User
+from ...app.schemas.itinerary import ItineraryCreate, ItineraryStopCreate
+from ...app.schemas.place import PlaceUpdate
+from ...app.services.itinerary_service import ItineraryService
+from ...app.utils.geo import haversine_km
+from ...app.utils.routing import optimize_path, path_length
+
+
+@pytest.mark.parametrize("keep_start", [True, False])
+def test_optimize_path_is_near_optimal(keep_start):
+    rng = np.random.default_rng(3)
+    for _ in range(10):
+        lat, lng = 18.7 + rng.random(7) * 0.2, 98.9 + rng.random(7) * 0.2
+        distances = haversine_km(lat[:, None], lng[:, None], lat[None, :], lng[None, :])
+        order, converged = optimize_path(distances, keep_start=keep_start)
+        assert converged
+        assert sorted(order) == list(range(7))
+        first = [0] if keep_start else []
+        best = min(
+            path_length(distances, [*first, *rest])
+            for rest in itertools.permutations(range(len(first), 7))
+        )
+        assert path_length(distances, order) <= best * 1.05
+        if keep_start:
+            assert order[0] == 0
+
+
+def test_optimize_stops(db: Session):
+    # Places along a road, 1 km apart, and one without coordinates
+    places = [
+        Place(name=f"Km {i}", latitude=18.7 + i / 111.195, longitude=98.9)
+        for i in range(8)
+    ]
+    unknown = Place(name="Somewhere")
+    user = User(username="route_planner", hashed_password="pw")
+    db.add_all([*places, unknown, user])
+    db.commit()
+    stops = [ItineraryStopCreate(place_id=places[i].id, day=1) for i in (0, 3, 1, 2)]
+    stops.insert(2, ItineraryStopCreate(place_id=unknown.id, day=1, notes="Lunch"))
+    stops += [ItineraryStopCreate(place_id=places[i].id, day=2) for i in (5, 7, 6)]
+    itinerary = crud_itinerary.create_itinerary(
+        db, itinerary_in=ItineraryCreate(name="Road trip", stops=stops), user_id=user.id
+    )
+    service = ItineraryService(db)
+
+    preview = service.optimize_stops(itinerary.id, save=False)
+    # Each day keeps its first stop, and the stop without a place goes last
+    expected = [places[i].id for i in (0, 1, 2, 3)] + [unknown.id]
+    expected += [places[i].id for i in (5, 6, 7)]
+    assert [s["place_id"] for s in preview["stops"]] == expected
+    assert [s["day"] for s in preview["stops"]] == [1] * 5 + [2] * 3
+    assert preview["stops"][4]["notes"] == "Lunch"
+    assert preview["total_distance_km"] == pytest.approx(7.0, rel=1e-3)
+    assert preview["previous_distance_km"] == pytest.approx(12.0, rel=1e-3)
+    assert preview["converged"]
+    db.expire_all()
+    assert [s.place_id for s in itinerary.stops] == [s.place_id for s in stops]
+
+    assert service.optimize_stops(itinerary.id) == preview
+    db.expire_all()
+    assert [s.place_id for s in itinerary.stops] == expected
+
+
+def test_optimize_stops_after_a_place_moves(db: Session):
+    places = [
+        Place(name=f"Km {i}", latitude=18.7 + i / 111.195, longitude=98.9)
+        for i in range(4)
+    ]
+    user = User(username="moving_planner", hashed_password="pw")
+    db.add_all([*places, user])
+    db.commit()
+    itinerary = crud_itinerary.create_itinerary(
+        db,
+        itinerary_in=ItineraryCreate(
+            name="Moving", place_ids=[place.id for place in places]
+        ),
+        user_id=user.id,
+    )
+    service = ItineraryService(db)
+    route = service.optimize_stops(itinerary.id, save=False)
+    assert [s["place_id"] for s in route["stops"]] == [p.id for p in places]
+    hits = place_distances.stats()["hits"]
+    assert service.optimize_stops(itinerary.id, save=False) == route
+    assert place_distances.stats()["hits"] == hits + 16
+
+    # Km 1 moves past Km 3: its cached distances are dropped
+    invalidations = place_distances.stats()["invalidations"]
+    crud_place.update_place(
+        db,
+        db_place=places[1],
+        place_in=PlaceUpdate(name="Km 1", latitude=18.7 + 4 / 111.195),
+    )
+    assert place_distances.stats()["invalidations"] == invalidations + 1
+    route = service.optimize_stops(itinerary.id, save=False)
+    assert [s["place_id"] for s in route["stops"]] == [
+        places[i].id for i in (0, 2, 3, 1)
+    ]
+    assert route["total_distance_km"] == pytest.approx(4.0, rel=1e-3)
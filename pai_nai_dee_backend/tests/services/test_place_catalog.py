@@ -0,0 +1,135 @@
+"""
+Tests for the memory-mapped place catalog snapshot.
+"""
+
+import pytest
+from sqlalchemy.orm import Session
+
+from ...app.crud import crud_place
+from ...app.models.place import Place
+from ...app.schemas.place import Place as PlaceSchema
+from ...app.core.config import settings
+from ...app.services import place_catalog
+from ...app.services.place_catalog import PlaceCatalog, build_snapshot
+
+
+@pytest.fixture(scope="function")
+def catalog(db: Session, tmp_path) -> PlaceCatalog:
+    db.add_all(
+        [
+            Place(
+                name="Wat Chedi Luang",
+                category="Temple",
+                latitude=18.787,
+                longitude=98.986,
+                average_rating=4.5,
+                rating_sum=9.0,
+                rating_count=2,
+                rating_hist_4_0=1,
+                rating_hist_5_0=1,
+                ranking_score=3.25,
+            ),
+            Place(
+                name="Wat Pho",
+                category="temple",
+                latitude=13.746,
+                longitude=100.493,
+                average_rating=4.8,
+                ranking_score=3.5,
+                address="Bangkok",
+            ),
+            Place(
+                name="ตลาดวโรรส",
+                category="Market",
+                latitude=18.790,
+                longitude=99.000,
+                average_rating=4.5,
+            ),
+            Place(name="No Coordinates Cafe", category="Cafe", average_rating=3.0),
+            Place(name="Uncategorized", average_rating=0.0, description=""),
+        ]
+    )
+    db.commit()
+    path = tmp_path / "places.cat"
+    assert build_snapshot(db, str(path)) == 5
+    return PlaceCatalog(str(path))
+
+
+def _ids(places):
+    return [p["id"] if isinstance(p, dict) else p.id for p in places]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"sort": "best"},
+        {"sort": "rating"},
+        {"sort": "name"},
+        {"sort": "newest"},
+        {"category": "TEMPLE", "sort": "rating"},
+        {"min_rating": 4.5, "sort": "name"},
+        {"sort": "rating", "skip": 1, "limit": 2},
+        {"sort": "distance", "lat": 18.788, "lng": 98.99},
+        {"sort": "rating", "lat": 18.788, "lng": 98.99, "radius_km": 5},
+    ],
+)
+def test_listing_matches_database(db: Session, catalog: PlaceCatalog, filters):
+    assert _ids(catalog.query(**filters)) == _ids(crud_place.get_places(db, **filters))
+
+
+def test_rows_round_trip_as_place_schema(db: Session, catalog: PlaceCatalog):
+    from_db = {p.id: p for p in crud_place.get_places(db)}
+    for row in catalog.query():
+        expected = PlaceSchema.model_validate(from_db[row["id"]]).model_dump(
+            exclude={"created_at"}
+        )
+        assert (
+            PlaceSchema.model_validate(row).model_dump(exclude={"created_at"})
+            == expected
+        )
+
+
+def test_rating_histogram(catalog: PlaceCatalog):
+    by_name = {p["name"]: p for p in catalog.query()}
+    histogram = by_name["Wat Chedi Luang"]["rating_histogram"]
+    assert histogram["4.0"] == histogram["5.0"] == 1
+    assert sum(histogram.values()) == by_name["Wat Chedi Luang"]["rating_count"]
+
+
+def test_nearby(catalog: PlaceCatalog):
+    nearby = catalog.query(sort="distance", lat=18.788, lng=98.99, radius_km=5)
+    assert [p["name"] for p in nearby] == ["Wat Chedi Luang", "ตลาดวโรรส"]
+
+    with pytest.raises(ValueError):
+        catalog.query(sort="distance")
+
+
+def test_missing_snapshot_is_checked_once_per_reload_interval(
+    db: Session, tmp_path, monkeypatch
+):
+    path = tmp_path / "places.cat"
+    monkeypatch.setattr(settings, "PLACE_CATALOG_PATH", str(path))
+    monkeypatch.setattr(settings, "PLACE_CATALOG_RELOAD_SECONDS", 60)
+    monkeypatch.setattr(place_catalog, "_catalog", None)
+    monkeypatch.setattr(place_catalog, "_catalog_identity", None)
+    monkeypatch.setattr(place_catalog, "_catalog_checked_at", None)
+    monkeypatch.setattr(place_catalog, "_catalog_missing", False)
+    stats, warnings = [], []
+    monkeypatch.setattr(place_catalog.logger, "warning", warnings.append)
+    real_stat = place_catalog.os.stat
+    monkeypatch.setattr(
+        place_catalog.os, "stat", lambda p: stats.append(p) or real_stat(p)
+    )
+
+    for _ in range(3):
+        assert place_catalog.get_place_catalog() is None
+    assert len(stats) == 1
+    assert len(warnings) == 1
+
+    # Built later: mapped once the interval has passed
+    db.add(Place(name="Late Snapshot"))
+    db.commit()
+    build_snapshot(db, str(path))
+    monkeypatch.setattr(place_catalog, "_catalog_checked_at", -60.0)
+    assert place_catalog.get_place_catalog() is not None
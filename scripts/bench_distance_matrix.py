@@ -0,0 +1,82 @@
+"""
+Benchmark for the cached distances between places (app.core.distance_matrix,
+as used by ItineraryService.optimize_stops through crud_place.place_distances):
+latency of the distance matrix of an itinerary's stops, cached or computed
+with haversine_km every time, for itineraries drawing their stops from a
+catalog of places where a few are much more popular than the rest, and for
+the same itinerary asked again (e.g. optimized once more after an edit).
+
+Run from the repository root:
+    PYTHONPATH=pai_nai_dee_backend python scripts/bench_distance_matrix.py \
+        --stops 10 50 200
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.distance_matrix import DistanceMatrix
+from app.utils.geo import haversine_km
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stops", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--places", type=int, default=20_000)
+    parser.add_argument("--itineraries", type=int, default=2000)
+    parser.add_argument(
+        "--max-places", type=int, default=settings.PLACE_DISTANCE_CACHE_MAX_PLACES
+    )
+    parser.add_argument("--zipf", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # Within about 30 km of the old city
+    lat = 18.79 + rng.normal(0.0, 0.1, args.places)
+    lng = 98.99 + rng.normal(0.0, 0.1, args.places)
+    popularity = 1.0 / np.arange(1, args.places + 1) ** args.zipf
+    popularity /= popularity.sum()
+    print(
+        f"{args.places:,} places (Zipf {args.zipf}), cache of {args.max_places:,} "
+        f"places, {args.itineraries:,} itineraries per size"
+    )
+
+    for n in args.stops:
+        distances = DistanceMatrix(max_places=args.max_places)
+        timings = {"haversine": [], "cached": [], "again": []}
+        for _ in range(args.itineraries):
+            ids = rng.choice(args.places, n, replace=False, p=popularity).tolist()
+            started = time.perf_counter()
+            expected = haversine_km(
+                lat[ids, None], lng[ids, None], lat[None, ids], lng[None, ids]
+            )
+            timings["haversine"].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            matrix = distances.matrix(ids, lat[ids], lng[ids])
+            timings["cached"].append(time.perf_counter() - started)
+            assert np.allclose(matrix, expected, rtol=1e-6, atol=1e-6)
+            started = time.perf_counter()
+            distances.matrix(ids, lat[ids], lng[ids])
+            timings["again"].append(time.perf_counter() - started)
+
+        stats = distances.stats()
+        # Of the first request of each itinerary (asking again always hits)
+        misses = stats["misses"]
+        hit_rate = 1 - misses / (args.itineraries * n * n)
+        summary = ", ".join(
+            "{} p50 {:.3f} ms p99 {:.3f} ms".format(
+                name, *np.percentile(np.array(values) * 1000, [50, 99])
+            )
+            for name, values in timings.items()
+        )
+        print(
+            f"{n} stops: {summary}; {hit_rate:.1%} of pairs cached, "
+            f"{stats['evictions']:,} evictions, matrix {stats['bytes'] / 2**20:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark for the vectorized place rating recompute (app.services.rating_recompute).
+
+Measures the in-memory reduce over synthetic `(place_id, rating)` chunks and,
+with --sqlite N, the full recompute (scan, reduce and bulk UPDATEs) against a
+temporary SQLite database holding N generated reviews.
+
+Run from the repository root:
+    PYTHONPATH=pai_nai_dee_backend python scripts/bench_rating_recompute.py
+    PYTHONPATH=pai_nai_dee_backend python scripts/bench_rating_recompute.py \
+        --reviews 10000000 --places 200000 --sqlite 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.db.database import Base
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+from app.services.rating_recompute import RatingAccumulator, recompute_place_ratings
+
+
+def synthetic_reviews(n_reviews: int, n_places: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    place_ids = np.sort(rng.integers(1, n_places + 1, size=n_reviews))
+    ratings = rng.integers(1, 11, size=n_reviews) / 2.0
+    return place_ids, ratings
+
+
+def bench_reduce(n_reviews: int, n_places: int, chunk_size: int) -> None:
+    place_ids, ratings = synthetic_reviews(n_reviews, n_places)
+    started = time.perf_counter()
+    accumulator = RatingAccumulator(n_places)
+    for start in range(0, n_reviews, chunk_size):
+        end = start + chunk_size
+        accumulator.add_chunk(place_ids[start:end], ratings[start:end])
+    accumulator.averages()
+    seconds = time.perf_counter() - started
+    print(
+        f"reduce: {n_reviews:,} reviews over {n_places:,} places in {seconds:.2f}s "
+        f"({n_reviews / seconds:,.0f} reviews/s, chunks of {chunk_size:,})"
+    )
+
+
+def bench_sqlite(n_reviews: int, n_places: int, chunk_size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        place_ids, ratings = synthetic_reviews(n_reviews, n_places)
+        # One review per user and place: user n writes the n-th review of a place
+        first_of_place = np.flatnonzero(np.r_[True, place_ids[1:] != place_ids[:-1]])
+        run_lengths = np.diff(np.r_[first_of_place, n_reviews])
+        user_ids = np.arange(n_reviews) - np.repeat(first_of_place, run_lengths) + 1
+        with Session(engine) as db:
+            db.execute(
+                insert(User),
+                [
+                    {"username": f"bench_{i}", "hashed_password": "x"}
+                    for i in range(int(run_lengths.max()))
+                ],
+            )
+            db.execute(insert(Place), [{"name": f"Place {i}"} for i in range(n_places)])
+            for start in range(0, n_reviews, 100_000):
+                db.execute(
+                    insert(Review),
+                    [
+                        {"place_id": p, "user_id": u, "rating": r}
+                        for p, u, r in zip(
+                            place_ids[start : start + 100_000].tolist(),
+                            user_ids[start : start + 100_000].tolist(),
+                            ratings[start : start + 100_000].tolist(),
+                        )
+                    ],
+                )
+            db.commit()
+
+            report = recompute_place_ratings(db, chunk_size=chunk_size)
+        print(
+            f"sqlite: {report['reviews']:,} reviews, {report['places']:,} places "
+            f"in {report['seconds']:.2f}s (scan {report['scan_seconds']:.2f}s, "
+            f"write {report['write_seconds']:.2f}s, "
+            f"{report['reviews_per_second']:,.0f} reviews/s)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reviews", type=int, default=10_000_000)
+    parser.add_argument("--places", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument(
+        "--sqlite", type=int, default=0, help="Reviews for the end-to-end run"
+    )
+    args = parser.parse_args()
+
+    bench_reduce(args.reviews, args.places, args.chunk_size)
+    if args.sqlite:
+        bench_sqlite(args.sqlite, min(args.places, args.sqlite), args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark for near-duplicate review detection (app.core.minhash.MinHashLSH, as
+used by crud_review.review_fingerprints): rebuild throughput and memory of the
+index over synthetic review comments, and lookup latency, recall and false
+positives for near-copies (a few words changed) and unrelated comments.
+
+Run from the repository root:
+    PYTHONPATH=pai_nai_dee_backend python scripts/bench_review_duplicates.py \
+        --comments 2000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.minhash import MinHashLSH, normalize
+
+
+def make_comments(n: int, rng: np.random.Generator, vocabulary: np.ndarray):
+    lengths = rng.integers(12, 30, n)
+    words = rng.integers(0, len(vocabulary), lengths.sum())
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return [" ".join(vocabulary[words[s : s + k]]) for s, k in zip(starts, lengths)]
+
+
+def edit(comment: str, rng: np.random.Generator, vocabulary: np.ndarray) -> str:
+    words = comment.split()
+    for i in rng.choice(len(words), 2, replace=False):
+        words[i] = vocabulary[rng.integers(len(vocabulary))]
+    return " ".join(words)
+
+
+def jaccard(a: str, b: str, size: int = 5) -> float:
+    a, b = normalize(a), normalize(b)
+    a = {a[i : i + size] for i in range(len(a) - size + 1)}
+    b = {b[i : i + size] for i in range(len(b) - size + 1)}
+    return len(a & b) / len(a | b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--comments", type=int, default=2_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument(
+        "--threshold", type=float, default=settings.REVIEW_DUPLICATE_THRESHOLD
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vocabulary = np.array(
+        [
+            "".join(rng.choice(list("abcdefghijklmnopqrstuvwxyz"), rng.integers(2, 9)))
+            for _ in range(20_000)
+        ]
+    )
+    started = time.perf_counter()
+    comments = make_comments(args.comments, rng, vocabulary)
+    print(
+        f"Generated {len(comments):,} comments in {time.perf_counter() - started:.1f} s"
+    )
+
+    index = MinHashLSH(min_chars=30)
+    started = time.perf_counter()
+    indexed = index.rebuild(enumerate(comments))
+    elapsed = time.perf_counter() - started
+    print(
+        f"Rebuilt the index of {indexed:,} comments in {elapsed:.1f} s "
+        f"({indexed / elapsed:,.0f} comments/s), arrays hold "
+        f"{index.nbytes / 2**20:,.0f} MiB ({index.nbytes / max(indexed, 1):.0f} B each)"
+    )
+
+    targets = rng.integers(0, len(comments), args.queries)
+    near_copies = [edit(comments[i], rng, vocabulary) for i in targets]
+    unrelated = make_comments(args.queries, rng, vocabulary)
+    similarities = np.array(
+        [jaccard(comments[i], text) for i, text in zip(targets, near_copies)]
+    )
+    timings = []
+    found = np.zeros(args.queries, dtype=bool)
+    false_positives = 0
+    for n, (target, text) in enumerate(zip(targets, near_copies)):
+        started = time.perf_counter()
+        matches = index.query(text, args.threshold)
+        timings.append(time.perf_counter() - started)
+        found[n] = any(key == target for key, _ in matches)
+    for text in unrelated:
+        started = time.perf_counter()
+        matches = index.query(text, args.threshold)
+        timings.append(time.perf_counter() - started)
+        false_positives += bool(matches)
+
+    p50, p99 = np.percentile(np.array(timings) * 1000, [50, 99])
+    print(f"{len(timings):,} lookups: p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+    above = similarities >= args.threshold
+    print(
+        f"Near-copies (2 words changed, median Jaccard "
+        f"{np.median(similarities):.2f}): {found.mean():.1%} flagged; "
+        f"{found[above].mean():.1%} of those at or above the threshold "
+        f"{args.threshold}, {found[~above].mean():.1%} of those below"
+    )
+    print(f"Unrelated comments flagged: {false_positives / args.queries:.2%}")
+
+
+if __name__ == "__main__":
+    main()
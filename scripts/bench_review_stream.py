@@ -0,0 +1,77 @@
+"""
+Benchmark for the review event fan-out behind GET /reviews/place/{id}/stream
+(app.core.pubsub.PubSub): memory held per idle subscriber, and how long one
+review write takes to reach every subscriber of a place when it is published
+from a worker thread, as the sync review endpoints do.
+
+Run from the repository root:
+    PYTHONPATH=pai_nai_dee_backend python scripts/bench_review_stream.py \
+        --subscribers 10000
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from app.core.pubsub import PubSub
+
+
+async def run(n_subscribers: int, n_events: int) -> None:
+    hub = PubSub(max_queue=64)
+    received = 0
+    all_received = asyncio.Event()
+
+    async def subscriber():
+        nonlocal received
+        subscription = hub.subscribe("place")
+        while await subscription.get() is not None:
+            received += 1
+            if received == n_subscribers * n_events:
+                all_received.set()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tasks = [asyncio.create_task(subscriber()) for _ in range(n_subscribers)]
+    await asyncio.sleep(0)  # Let every subscriber reach its idle wait
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    held = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    print(
+        f"{n_subscribers:,} idle subscribers hold {held / 1024:,.0f} KiB "
+        f"({held / n_subscribers:,.0f} bytes each)"
+    )
+
+    message = "event: review_created\nid: 1\ndata: {}\n\n"
+    started = time.perf_counter()
+
+    def publish():
+        for _ in range(n_events):
+            hub.publish("place", message)
+
+    publisher = threading.Thread(target=publish)
+    publisher.start()
+    publisher.join()
+    published = time.perf_counter()
+    await all_received.wait()
+    delivered = time.perf_counter()
+    print(
+        f"{n_events} events: publish {1000 * (published - started) / n_events:.2f} ms "
+        f"each in the writer thread, all {n_subscribers:,} subscribers had them "
+        f"after {1000 * (delivered - started):.1f} ms"
+    )
+    for task in tasks:
+        task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.events))
+
+
+if __name__ == "__main__":
+    main()